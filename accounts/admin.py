@@ -1,13 +1,17 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import User, Project, Todo, DailyUpdate, WorkingHoursSummary
+from .leave_approvals import decidable_leaves, set_leave_status
+from .models import User, Project, Todo, DailyUpdate, Leave, LeaveEntitlement, WorkingHoursSummary, EmailOutbox
+from .search import FullTextSearchMixin
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(FullTextSearchMixin, BaseUserAdmin):
     """Custom User Admin"""
     list_display = ('email', 'get_full_name_display', 'role', 'is_verified', 'is_active', 'created_by_display', 'date_joined')
+    list_select_related = ('created_by',)
     list_filter = ('role', 'is_verified', 'is_staff', 'is_superuser', 'is_active')
     search_fields = ('email', 'first_name', 'last_name')
     ordering = ('-date_joined',)
@@ -43,11 +47,13 @@ class UserAdmin(BaseUserAdmin):
 
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(FullTextSearchMixin, admin.ModelAdmin):
     """Project Admin"""
     list_display = ('name', 'created_by', 'created_at', 'updated_at')
+    list_select_related = ('created_by',)
     list_filter = ('created_at', 'updated_at')
     search_fields = ('name', 'description', 'created_by__email')
+    fts_related = ('created_by',)
     date_hierarchy = 'created_at'
     readonly_fields = ('created_at', 'updated_at')
     
@@ -63,11 +69,13 @@ class ProjectAdmin(admin.ModelAdmin):
 
 
 @admin.register(Todo)
-class TodoAdmin(admin.ModelAdmin):
+class TodoAdmin(FullTextSearchMixin, admin.ModelAdmin):
     """Todo Admin"""
     list_display = ('title', 'employee', 'status', 'date', 'created_at')
+    list_select_related = ('employee',)
     list_filter = ('status', 'date', 'created_at')
     search_fields = ('title', 'description', 'employee__email')
+    fts_related = ('employee',)
     date_hierarchy = 'date'
     readonly_fields = ('created_at', 'updated_at')
     
@@ -92,11 +100,13 @@ class TodoAdmin(admin.ModelAdmin):
 
 
 @admin.register(DailyUpdate)
-class DailyUpdateAdmin(admin.ModelAdmin):
+class DailyUpdateAdmin(FullTextSearchMixin, admin.ModelAdmin):
     """Daily Update Admin"""
     list_display = ('employee', 'date', 'working_hours', 'update_preview', 'created_at')
+    list_select_related = ('employee',)
     list_filter = ('date', 'created_at')
     search_fields = ('employee__email', 'update_text')
+    fts_related = ('employee',)
     date_hierarchy = 'date'
     readonly_fields = ('created_at', 'updated_at')
     
@@ -127,10 +137,57 @@ class DailyUpdateAdmin(admin.ModelAdmin):
         return qs.none()
 
 
+@admin.register(Leave)
+class LeaveAdmin(admin.ModelAdmin):
+    """Leave Admin"""
+    list_display = ('employee', 'leave_type', 'start_date', 'end_date', 'total_days', 'status', 'approved_by')
+    list_select_related = ('employee', 'approved_by')
+    list_filter = ('status', 'leave_type', 'start_date')
+    search_fields = ('employee__email',)
+    date_hierarchy = 'start_date'
+    actions = ['approve', 'reject']
+
+    def decidable(self, request, queryset):
+        """The selected leaves the user may decide on (a staff employee sees their own)"""
+        if request.user.is_superuser:
+            return queryset
+        return queryset & decidable_leaves(request.user)
+
+    def approve(self, request, queryset):
+        """Approve in bulk; the leave balance ledger is updated in the same statements"""
+        count = set_leave_status(self.decidable(request, queryset), 'APPROVED', decided_by=request.user)
+        self.message_user(request, f'{count} leaves approved')
+    approve.short_description = 'Approve selected leaves'
+    approve.allowed_permissions = ('change',)
+
+    def reject(self, request, queryset):
+        count = set_leave_status(self.decidable(request, queryset), 'REJECTED', decided_by=request.user)
+        self.message_user(request, f'{count} leaves rejected')
+    reject.short_description = 'Reject selected leaves'
+    reject.allowed_permissions = ('change',)
+
+    def get_queryset(self, request):
+        """Filter leaves based on user role"""
+        qs = super().get_queryset(request)
+        if request.user.is_superuser:
+            return qs
+        if request.user.role == 'EMPLOYEE':
+            return qs.filter(employee=request.user)
+        return qs & decidable_leaves(request.user)
+
+
+@admin.register(LeaveEntitlement)
+class LeaveEntitlementAdmin(admin.ModelAdmin):
+    """Leave days per leave type, shown against each employee's balance"""
+    list_display = ('leave_type', 'days')
+    list_editable = ('days',)
+
+
 @admin.register(WorkingHoursSummary)
 class WorkingHoursSummaryAdmin(admin.ModelAdmin):
     """Working Hours Summary Admin"""
     list_display = ('employee', 'pm', 'total_hours_display', 'last_updated')
+    list_select_related = ('employee', 'pm')
     list_filter = ('pm', 'last_updated')
     search_fields = ('employee__email', 'pm__email')
     readonly_fields = ('employee', 'pm', 'total_hours', 'last_updated')
@@ -165,4 +222,21 @@ class WorkingHoursSummaryAdmin(admin.ModelAdmin):
             return qs
         if request.user.role == 'PM':
             return qs.filter(pm=request.user)
-        return qs.none()
\ No newline at end of file
+        return qs.none()
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    """Email Outbox Admin"""
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('to_email', 'subject')
+    readonly_fields = ('to_email', 'subject', 'body', 'attempts', 'claim_token', 'last_error', 'created_at', 'sent_at')
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        """Put failed or waiting emails back at the front of the queue"""
+        count = queryset.exclude(status='SENT').update(status='PENDING', next_attempt_at=timezone.now(), claim_token='')
+        self.message_user(request, f'{count} emails queued for retry')
+    retry_now.short_description = 'Retry selected emails now'
+
@@ -0,0 +1,94 @@
+"""
+Team availability: who is off on each day of a month.
+
+Leaves overlapping the month come from one range query on the
+(employee, end_date, start_date) index; team_days() then sweeps their
+start and end events once, so counting who is off costs O(leaves + days)
+however long each leave is, instead of expanding every leave into its
+days.
+"""
+
+import datetime
+from collections import namedtuple
+
+from .models import Leave, User
+
+
+# `off`: employees on approved leave that day; `pending`: on leave awaiting approval
+TeamDay = namedtuple('TeamDay', ['date', 'off', 'pending'])
+
+
+# Months a calendar may show: the previous / next month links stay within datetime.date
+CALENDAR_YEARS = range(datetime.MINYEAR + 1, datetime.MAXYEAR)
+
+
+def month_bounds(value, today):
+    """First and last day of the month `value` ('YYYY-MM'), or of today's month if it isn't one"""
+    try:
+        start = datetime.datetime.strptime(value or '', '%Y-%m').date()
+    except ValueError:
+        start = today.replace(day=1)
+    if start.year not in CALENDAR_YEARS:
+        start = today.replace(day=1)
+    end = (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1) - datetime.timedelta(days=1)
+    return start, end
+
+
+def team_employees(user):
+    """Employees whose leave `user` may see: a PM's team, or everyone for admins"""
+    employees = User.objects.filter(role='EMPLOYEE')
+    if user.role == 'PM':
+        employees = employees.filter(created_by=user)
+    return employees
+
+
+def overlapping_leaves(employees, start, end):
+    """Approved and pending leaves of `employees` with any day in start..end"""
+    return (
+        Leave.objects.filter(
+            employee__in=employees, status__in=('APPROVED', 'PENDING'),
+            start_date__lte=end, end_date__gte=start,
+        )
+        .select_related('employee')
+        .only(
+            'start_date', 'end_date', 'status', 'leave_type',
+            'employee__email', 'employee__first_name', 'employee__last_name',
+        )
+        .order_by('start_date', 'employee_id')
+    )
+
+
+def team_days(leaves, start, end):
+    """
+    A TeamDay for every date in start..end.
+
+    Each leave, clipped to the range, adds its employee on its first day
+    and removes them the day after its last; overlapping leaves of one
+    employee count them once.
+    """
+    days = (end - start).days + 1
+    starting = [[] for _ in range(days + 1)]
+    ending = [[] for _ in range(days + 1)]
+    for leave in leaves:
+        first = max((leave.start_date - start).days, 0)
+        last = min((leave.end_date - start).days, days - 1)
+        if first > last:
+            continue
+        starting[first].append(leave)
+        ending[last + 1].append(leave)
+
+    # status -> {employee_id: [employee, open leaves]}, in the order they went off
+    active = {'APPROVED': {}, 'PENDING': {}}
+    for offset in range(days):
+        for leave in ending[offset]:
+            entry = active[leave.status][leave.employee_id]
+            entry[1] -= 1
+            if not entry[1]:
+                del active[leave.status][leave.employee_id]
+        for leave in starting[offset]:
+            active[leave.status].setdefault(leave.employee_id, [leave.employee, 0])[1] += 1
+        yield TeamDay(
+            start + datetime.timedelta(days=offset),
+            [employee for employee, _ in active['APPROVED'].values()],
+            [employee for employee, _ in active['PENDING'].values()],
+        )
@@ -0,0 +1,115 @@
+"""
+Pre-sized avatar variants of User.profile_image.
+
+Uploads are stored as-is (often multi-megabyte photos) while the pages
+show them as 30-50px circles. generate_variants() makes square WebP
+copies at AVATAR_SIZES in the same storage and records them on the user
+as {'source': <original name>, 'sizes': {'<px>': <variant name>}}. The
+{% avatar %} tag only uses variants whose source is the current image,
+so a replaced photo shows its original until its own variants exist.
+That mismatch is also the work queue: the profile save only stores the
+upload, and the generate_avatar_variants task (scheduled via
+CELERY_BEAT_SCHEDULE) or generate_avatars picks up stale_users().
+Stored files may be shared between users (the storage deduplicates),
+so nothing is deleted here; gc_media removes unreferenced ones.
+"""
+
+import logging
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.db.models import F, Q
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .dashboard_cache import invalidate
+from .models import User
+
+
+logger = logging.getLogger(__name__)
+
+AVATAR_SIZES = (48, 128, 512)
+WEBP_QUALITY = 80
+VARIANTS_DIR = 'profiles/variants'
+# Users per generate_stale_variants() run
+BATCH_SIZE = 50
+
+
+def variant_name(name, size):
+    """profiles/me.jpg -> profiles/variants/me_128.webp (the storage may rename it)"""
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    return posixpath.join(VARIANTS_DIR, f'{stem}_{size}.webp')
+
+
+def current_variants(user):
+    """{px: variant name} for the user's current image; empty until they are generated"""
+    variants = user.profile_image_variants or {}
+    if not user.profile_image or variants.get('source') != user.profile_image.name:
+        return {}
+    return {int(size): name for size, name in variants.get('sizes', {}).items()}
+
+
+def stale_users():
+    """Users with a profile image whose variants are missing or were made from an earlier image"""
+    return User.objects.exclude(profile_image='').exclude(profile_image__isnull=True).filter(
+        Q(profile_image_variants__source__isnull=True) | ~Q(profile_image_variants__source=F('profile_image'))
+    )
+
+
+def _record(user, source, written):
+    """Store the variants of `source`, unless the image was replaced meanwhile; True if stored"""
+    return bool(User.objects.filter(pk=user.pk, profile_image=source).update(
+        profile_image_variants={'source': source, 'sizes': {str(size): name for size, name in written.items()}},
+    ))
+
+
+def _encode(image, size):
+    square = ImageOps.fit(image, (size, size), method=Image.Resampling.LANCZOS)
+    buffer = ContentFile(b'')
+    square.save(buffer, format='WEBP', quality=WEBP_QUALITY, method=6)
+    return buffer
+
+
+def generate_variants(user):
+    """
+    Write the WebP variants of the user's current image and record them;
+    returns {px: name}. Sizes larger than the photo are not upscaled:
+    the largest variant is then the photo's own short side.
+    """
+    field = user.profile_image
+    if not field:
+        return {}
+    source = field.name
+    storage = field.storage
+    try:
+        with storage.open(source, 'rb') as fileobj:
+            image = Image.open(fileobj)
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    except (OSError, UnidentifiedImageError):
+        logger.exception('Cannot read profile image %s of user %s', source, user.pk)
+        # No sizes: the original is served, and the image is not retried every run
+        _record(user, source, {})
+        return {}
+
+    short_side = min(image.size)
+    sizes = sorted({min(size, short_side) for size in AVATAR_SIZES})
+    written = {}
+    for size in sizes:
+        written[size] = storage.save(variant_name(source, size), _encode(image, size))
+
+    # A replacement uploaded meanwhile stays stale and gets its own run
+    if not _record(user, source, written):
+        return {}
+    # Cached PM dashboards hold the user row
+    invalidate(pm_ids=[user.created_by_id])
+    return written
+
+
+def generate_stale_variants(batch_size=None):
+    """Generate the variants of up to `batch_size` stale_users(); returns how many got variants"""
+    batch_size = batch_size or BATCH_SIZE
+    generated = 0
+    for user in stale_users().order_by('pk')[:batch_size]:
+        if generate_variants(user):
+            generated += 1
+    return generated
@@ -0,0 +1,257 @@
+"""Per-view benchmarks: every accounts route through the test client, as the right role"""
+
+import logging
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+
+from celery.backends.cache import CacheBackend
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from . import urls as accounts_urls
+from .models import DailyUpdate, Project, Todo, User
+from .scale import SCALE_EMAIL_DOMAIN
+from .tasks import purge_user_task
+
+
+# kwargs maps URL kwargs to fixture names (see benchmark_fixtures)
+Route = namedtuple('Route', 'name role kwargs query', defaults=({}, ''))
+
+ROUTES = (
+    Route('login', None),
+    Route('verify_email', None, {'token': 'token'}),
+    Route('dashboard', 'ADMIN'),
+    Route('dashboard', 'PM'),
+    Route('dashboard', 'EMPLOYEE'),
+    Route('admin_users_list', 'ADMIN'),
+    Route('admin_users_list', 'ADMIN', query='role=EMPLOYEE'),
+    Route('admin_user_detail', 'ADMIN', {'user_id': 'pm'}),
+    Route('admin_user_detail', 'ADMIN', {'user_id': 'employee'}),
+    Route('admin_user_update', 'ADMIN', {'user_id': 'employee'}),
+    Route('admin_user_delete', 'ADMIN', {'user_id': 'employee'}),
+    Route('admin_purge_status', 'ADMIN', {'task_id': 'task_id'}),
+    Route('pm_create', 'ADMIN'),
+    Route('admin_create_employee', 'ADMIN'),
+    Route('admin_projects_list', 'ADMIN'),
+    Route('admin_updates_list', 'ADMIN'),
+    Route('admin_import_updates', 'ADMIN'),
+    Route('admin_stats', 'ADMIN'),
+    Route('timesheet_export', 'ADMIN', query='kind=updates&format=csv'),
+    Route('timesheet_export', 'PM', query='kind=todos&format=csv'),
+    Route('project_create', 'PM'),
+    Route('project_update', 'PM', {'pk': 'project'}),
+    Route('project_delete', 'PM', {'pk': 'project'}),
+    Route('project_team_view', 'ADMIN', {'project_id': 'project'}),
+    Route('employee_create', 'PM'),
+    Route('employee_bulk_onboard', 'PM'),
+    Route('employee_update', 'PM', {'pk': 'employee'}),
+    Route('employee_delete', 'PM', {'pk': 'employee'}),
+    Route('pm_team_view', 'PM'),
+    Route('team_calendar', 'PM'),
+    Route('team_calendar', 'ADMIN'),
+    Route('leave_requests', 'PM'),
+    Route('leave_requests', 'ADMIN'),
+    Route('todo_create', 'EMPLOYEE'),
+    Route('todo_update', 'EMPLOYEE', {'pk': 'todo'}),
+    Route('todo_delete', 'EMPLOYEE', {'pk': 'todo'}),
+    Route('daily_update_create', 'EMPLOYEE'),
+    Route('daily_update_update', 'EMPLOYEE', {'pk': 'update'}),
+    Route('daily_update_delete', 'EMPLOYEE', {'pk': 'update'}),
+    Route('profile_update', 'EMPLOYEE'),
+    Route('search', 'ADMIN', query='q=dashboard'),
+    Route('search', 'PM', query='q=fixed+reg'),
+    Route('search', 'EMPLOYEE', query='q=dashboard'),
+    # Last: it ends the session
+    Route('logout', 'EMPLOYEE'),
+)
+
+
+# A cache of the benchmarks' own: they clear it between requests, which must
+# not empty the shared cache of a running server
+PRIVATE_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmarks'},
+}
+
+
+def private_cache():
+    """Context manager / decorator: the default cache is PRIVATE_CACHES' while it is active"""
+    return override_settings(CACHES=PRIVATE_CACHES)
+
+
+@contextmanager
+def task_results_in_memory():
+    """Read purge task results from an in-process backend, so admin_purge_status needs no Redis"""
+    previous = purge_user_task._backend
+    purge_user_task.backend = CacheBackend(app=purge_user_task.app, backend='memory')
+    try:
+        yield
+    finally:
+        purge_user_task.backend = previous
+
+
+def route_label(route):
+    """Unique, stable name for a route benchmark (results are compared by it)"""
+    label = f"{route.name} [{route.role or 'anonymous'}]"
+    if route.kwargs:
+        label += ' ' + ' '.join(f'{key}={value}' for key, value in route.kwargs.items())
+    return f'{label} ?{route.query}' if route.query else label
+
+
+def uncovered_routes():
+    """Named accounts routes that have no benchmark yet"""
+    covered = {route.name for route in ROUTES}
+    return sorted({pattern.name for pattern in accounts_urls.urlpatterns if pattern.name} - covered)
+
+
+def benchmark_fixtures():
+    """Representative rows from seed_scale data: the first PM, one of their employees and so on"""
+    scale_users = User.objects.filter(email__endswith=f'@{SCALE_EMAIL_DOMAIN}').order_by('pk')
+    pm = scale_users.filter(role='PM').first()
+    if pm is None:
+        raise ValueError('No seed_scale data found; run seed_scale first')
+    employee = scale_users.filter(role='EMPLOYEE', created_by=pm).first()
+    return {
+        'ADMIN': scale_users.filter(role='ADMIN').first(),
+        'PM': pm,
+        'EMPLOYEE': employee,
+        'pm': pm.pk,
+        'employee': employee.pk,
+        'project': Project.objects.filter(created_by=pm).order_by('pk').values_list('pk', flat=True).first(),
+        'todo': Todo.objects.filter(employee=employee).order_by('pk').values_list('pk', flat=True).first(),
+        'update': DailyUpdate.objects.filter(employee=employee).order_by('pk').values_list('pk', flat=True).first(),
+        'token': 'benchmark-unknown-token',
+        'task_id': 'benchmark-unknown-task',
+    }
+
+
+def admin_changelists():
+    """(url name, url) for the Django admin changelist of every registered accounts model"""
+    names = [
+        f'{model._meta.app_label}_{model._meta.model_name}_changelist'
+        for model in admin.site._registry
+        if model._meta.app_label == 'accounts'
+    ]
+    return [(name, reverse(f'admin:{name}')) for name in sorted(names)]
+
+
+def budget_requests(fixtures):
+    """(label, url name, url, user) for every route and admin changelist that has a query budget"""
+    requests = [
+        (
+            route_label(route),
+            route.name,
+            reverse(route.name, kwargs={key: fixtures[value] for key, value in route.kwargs.items()})
+            + (f'?{route.query}' if route.query else ''),
+            fixtures[route.role] if route.role else None,
+        )
+        for route in ROUTES
+    ]
+    for name, url in admin_changelists():
+        requests.append((f'{name} [ADMIN]', name, url, fixtures['ADMIN']))
+        # The search box: the full-text index, or icontains where there is none
+        requests.append((f'{name} [ADMIN] ?q=fix', name, f'{url}?q=fix', fixtures['ADMIN']))
+    return requests
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def fetch_url(client, url):
+    response = client.get(url)
+    # Streaming responses (CSV export) do their work while being consumed
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    response.close()
+    return response
+
+
+def bench_route(route, fixtures, iterations=20, warmup=2, measure_memory=True):
+    url = reverse(route.name, kwargs={key: fixtures[value] for key, value in route.kwargs.items()})
+    if route.query:
+        url = f'{url}?{route.query}'
+    client = Client()
+    user = fixtures[route.role] if route.role else None
+
+    timings, query_counts, status = [], [], None
+    for i in range(warmup + iterations):
+        if user is not None:
+            client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = fetch_url(client, url)
+            elapsed = time.perf_counter() - started
+        status = response.status_code
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            query_counts.append(len(queries))
+
+    peak_kib = None
+    if measure_memory:
+        # Separate pass: tracemalloc slows everything down and would skew the timings
+        if user is not None:
+            client.force_login(user)
+        tracemalloc.start()
+        try:
+            fetch_url(client, url)
+            peak_kib = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'route': route.name,
+        'label': route_label(route),
+        'role': route.role,
+        'url': url,
+        'status': status,
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'queries': max(query_counts),
+        'peak_kib': peak_kib,
+    }
+
+
+def run_benchmarks(iterations=20, warmup=2, names=None, measure_memory=True):
+    """
+    Benchmark every route (or those named in `names`) against the seeded
+    data. Warm-up requests are not measured, so cached pages are measured warm.
+    """
+    cache.clear()
+    fixtures = benchmark_fixtures()
+    # Expected 404s/403s would otherwise log a warning per request
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    try:
+        with task_results_in_memory():
+            return [
+                bench_route(route, fixtures, iterations, warmup, measure_memory)
+                for route in ROUTES
+                if not names or route.name in names
+            ]
+    finally:
+        request_logger.setLevel(level)
+
+
+def compare_results(old, new):
+    """[(label, old result, new result)] for labels present in both runs"""
+    previous = {result['label']: result for result in old['results']}
+    return [
+        (result['label'], previous[result['label']], result)
+        for result in new['results']
+        if result['label'] in previous
+    ]
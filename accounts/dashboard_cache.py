@@ -0,0 +1,140 @@
+"""Per-user cache for the employee and PM dashboard contexts"""
+
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+from django.db.models import Sum
+
+from .hours import period_totals
+from .leave_balances import leave_balances
+from .models import DailyUpdate, Project, Todo, User, WorkingHoursSummary
+from .todo_stats import todo_counts
+
+
+KINDS = ('employee', 'pm')
+
+# Hit / miss counters when the cache can't keep them (see _counts_shared)
+_local_counts = Counter()
+_local_counts_lock = threading.Lock()
+
+
+def cache_key(kind, user_id):
+    return f'dashboard:{kind}:{user_id}'
+
+
+def _counter_key(kind, outcome):
+    return f'dashboard:stats:{kind}:{outcome}'
+
+
+def _counts_shared():
+    # Only Redis increments atomically (and cheaply): on the file backend
+    # concurrent workers would lose counts, and every set() scans the cache
+    # directory, so a hit would cost a scan and two file writes
+    return isinstance(caches[DEFAULT_CACHE_ALIAS], RedisCache)
+
+
+def _count(kind, outcome):
+    if not _counts_shared():
+        with _local_counts_lock:
+            _local_counts[kind, outcome] += 1
+        return
+    key = _counter_key(kind, outcome)
+    # add() is a no-op when the counter exists; incr() needs it to
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+def cache_stats():
+    """
+    {kind: {'hits': n, 'misses': n}} since the last reset: of every process
+    with Redis as the cache, of this process otherwise
+    """
+    if not _counts_shared():
+        with _local_counts_lock:
+            return {
+                kind: {outcome: _local_counts[kind, outcome] for outcome in ('hits', 'misses')}
+                for kind in KINDS
+            }
+    keys = [_counter_key(kind, outcome) for kind in KINDS for outcome in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    return {
+        kind: {outcome: values.get(_counter_key(kind, outcome), 0) for outcome in ('hits', 'misses')}
+        for kind in KINDS
+    }
+
+
+def reset_cache_stats():
+    if not _counts_shared():
+        with _local_counts_lock:
+            _local_counts.clear()
+        return
+    cache.delete_many([_counter_key(kind, outcome) for kind in KINDS for outcome in ('hits', 'misses')])
+
+
+def _cached(kind, user_id, build):
+    key = cache_key(kind, user_id)
+    context = cache.get(key)
+    if context is not None:
+        _count(kind, 'hits')
+        return context
+    _count(kind, 'misses')
+    context = build(user_id)
+    cache.set(key, context, settings.DASHBOARD_CACHE_TIMEOUT)
+    return context
+
+
+def _build_employee_context(user_id):
+    counts = todo_counts(user_id)
+    # Lists, not querysets: what goes in the cache must already be evaluated
+    return {
+        'todos': list(Todo.objects.filter(employee_id=user_id).order_by('-date')[:10]),
+        'updates': list(DailyUpdate.objects.filter(employee_id=user_id).order_by('-date')[:10]),
+        'total_hours': DailyUpdate.objects.filter(employee_id=user_id).aggregate(
+            total=Sum('working_hours')
+        )['total'] or 0,
+        'pending_todos': counts['pending'],
+        'completed_todos': counts['completed'],
+        'leave_balances': leave_balances(user_id),
+    }
+
+
+def _build_pm_context(user_id):
+    projects = list(Project.objects.filter(created_by_id=user_id).order_by('-created_at'))
+    employees = list(User.objects.filter(created_by_id=user_id, role='EMPLOYEE'))
+    return {
+        'projects': projects,
+        'employees': employees,
+        'hours_summary': list(WorkingHoursSummary.objects.filter(pm_id=user_id).select_related('employee')),
+        'total_projects': len(projects),
+        'total_employees': len(employees),
+        'team_hours': period_totals([user_id], 'PM')[user_id],
+    }
+
+
+def employee_dashboard_context(user_id):
+    return _cached('employee', user_id, _build_employee_context)
+
+
+def pm_dashboard_context(user_id):
+    return _cached('pm', user_id, _build_pm_context)
+
+
+def invalidate(employee_ids=(), pm_ids=()):
+    """
+    Drop the cached dashboards once the current transaction commits.
+
+    Deleting at commit (not before) means a dashboard rebuilt from the old
+    committed rows in the meantime is thrown away too.
+    """
+    keys = [cache_key('employee', pk) for pk in employee_ids if pk is not None]
+    keys += [cache_key('pm', pk) for pk in pm_ids if pk is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm as BaseUserCreationForm
-from .models import User, Project, Todo, DailyUpdate
+from .leave_approvals import decidable_leaves
+from .models import User, Project, Todo, DailyUpdate, Leave
 
 
 class LoginForm(forms.Form):
@@ -179,4 +180,123 @@ class DailyUpdateForm(forms.ModelForm):
     
     class Meta:
         model = DailyUpdate
-        fields = ['update_text', 'working_hours', 'date']
\ No newline at end of file
+        fields = ['update_text', 'working_hours', 'date']
+
+class DailyUpdateFilterForm(forms.Form):
+    """GET filters for the admin daily updates list"""
+
+    employee = forms.ModelChoiceField(
+        queryset=User.objects.filter(role='EMPLOYEE').only('id', 'email').order_by('email'),
+        required=False,
+        empty_label='All Employees',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    date_from = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
+    date_to = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
+
+class TimesheetExportForm(forms.Form):
+    """Filters for the CSV/XLSX timesheet export"""
+
+    kind = forms.ChoiceField(
+        choices=[('updates', 'Daily Updates'), ('todos', 'Todos')],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    format = forms.ChoiceField(
+        choices=[('csv', 'CSV'), ('xlsx', 'Excel (XLSX)')],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    pm = forms.ModelChoiceField(
+        queryset=User.objects.filter(role='PM').only('id', 'email').order_by('email'),
+        required=False,
+        empty_label='All PMs',
+        label='PM',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    employee = forms.ModelChoiceField(
+        queryset=User.objects.filter(role='EMPLOYEE').only('id', 'email').order_by('email'),
+        required=False,
+        empty_label='All Employees',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    date_from = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
+    date_to = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # PMs only ever export their own team
+        if user is not None and user.role == 'PM':
+            del self.fields['pm']
+            self.fields['employee'].queryset = self.fields['employee'].queryset.filter(created_by=user)
+
+
+class DailyUpdateImportForm(forms.Form):
+    """CSV upload for backfilling daily updates"""
+
+    file = forms.FileField(
+        widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'}),
+        help_text='CSV with columns: employee (email), date (YYYY-MM-DD), working_hours, update_text'
+    )
+
+
+class BulkOnboardForm(forms.Form):
+    """CSV upload for onboarding a whole team at once"""
+
+    file = forms.FileField(
+        widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'}),
+        help_text='CSV with columns: email, first_name, last_name, password'
+    )
+    pm = forms.ModelChoiceField(
+        queryset=User.objects.filter(role='PM').only('id', 'email').order_by('email'),
+        required=False,
+        empty_label='Me',
+        label='Project Manager',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    is_verified = forms.BooleanField(
+        required=False,
+        label='Email Already Verified',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        help_text='Check this if the users have already verified their email (no verification emails will be sent)'
+    )
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # PMs always onboard into their own team
+        if user is not None and user.role == 'PM':
+            del self.fields['pm']
+
+
+class LeaveDecisionForm(forms.Form):
+    """Approve or reject the selected pending leave requests"""
+
+    status = forms.ChoiceField(choices=[('APPROVED', 'Approve'), ('REJECTED', 'Reject')])
+
+    leaves = forms.ModelMultipleChoiceField(
+        queryset=Leave.objects.none(),
+        error_messages={'required': 'Select at least one leave request.'},
+    )
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only pending requests the user may decide on
+        self.fields['leaves'].queryset = decidable_leaves(user).filter(status='PENDING')
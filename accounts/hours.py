@@ -0,0 +1,268 @@
+"""
+Incremental bookkeeping for WorkingHoursSummary and HoursRollup.
+
+Every DailyUpdate write adjusts the summary and the day/week/month rollup
+buckets by the difference between the old and the new hours instead of
+re-summing the employee's whole history.
+"""
+
+import datetime
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, F, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import DailyUpdate, HoursRollup, User, WorkingHoursSummary
+from .sql import upsert_increment
+
+
+logger = logging.getLogger(__name__)
+
+# Per-employee day totals are the DailyUpdate rows themselves
+ROLLUP_PERIODS = {
+    'EMPLOYEE': ('WEEK', 'MONTH'),
+    'PM': ('DAY', 'WEEK', 'MONTH'),
+}
+
+
+def bucket_start(period, date):
+    """First day of the DAY / WEEK (ISO, Monday) / MONTH bucket containing `date`"""
+    if period == 'WEEK':
+        return date - datetime.timedelta(days=date.weekday())
+    if period == 'MONTH':
+        return date.replace(day=1)
+    return date
+
+
+def pm_id_for(employee_id):
+    return User.objects.filter(pk=employee_id).values_list('created_by_id', flat=True).first()
+
+
+def apply_hours_delta(employee_id, pm_id, date, delta):
+    """Add `delta` (may be negative) to the summary and every rollup bucket covering `date`"""
+    if not delta:
+        return
+
+    with transaction.atomic():
+        _bump_summary(employee_id, pm_id, delta)
+        for scope, user_id in (('EMPLOYEE', employee_id), ('PM', pm_id)):
+            if user_id is None:
+                continue
+            for period in ROLLUP_PERIODS[scope]:
+                _bump_rollup(user_id, scope, period, bucket_start(period, date), delta)
+
+
+def apply_upsert_delta(employee_id, pm_id, date, working_hours):
+    """
+    Bookkeeping for an upsert of the employee's `date` row to `working_hours`.
+
+    Must run in the same transaction, just *before* the upsert: the delta is
+    computed in SQL against whatever row is stored now, so there is no SELECT
+    round-trip. All rollup buckets are written with one INSERT ... ON CONFLICT
+    statement, the summary with one UPDATE (seeded from history the first
+    time, as on the signal path).
+    """
+    connection = transaction.get_connection()
+    delta = RawSQL(
+        f'%s - COALESCE((SELECT {connection.ops.quote_name("working_hours")} '
+        f'FROM {connection.ops.quote_name(DailyUpdate._meta.db_table)} '
+        f'WHERE {connection.ops.quote_name("employee_id")} = %s AND {connection.ops.quote_name("date")} = %s), 0)',
+        (
+            connection.ops.adapt_decimalfield_value(working_hours, 10, 2),
+            employee_id,
+            connection.ops.adapt_datefield_value(date),
+        ),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+    rollups = [
+        {'user_id': user_id, 'scope': scope, 'period': period,
+         'bucket': bucket_start(period, date), 'total_hours': delta}
+        for scope, user_id in (('EMPLOYEE', employee_id), ('PM', pm_id)) if user_id is not None
+        for period in ROLLUP_PERIODS[scope]
+    ]
+    upsert_increment(
+        HoursRollup, rollups,
+        unique_fields=['user', 'scope', 'period', 'bucket'], increment_fields=['total_hours'],
+    )
+    if pm_id is not None:
+        summary = WorkingHoursSummary.objects.filter(employee_id=employee_id)
+        if not summary.update(total_hours=F('total_hours') + delta, last_updated=timezone.now()):
+            # History doesn't have this upsert in it yet: seed, then apply it
+            _seed_summary(employee_id, pm_id)
+            summary.update(total_hours=F('total_hours') + delta, last_updated=timezone.now())
+
+
+def _seed_summary(employee_id, pm_id):
+    """
+    Create the employee's missing summary row from their DailyUpdate
+    history. False if another writer created it first.
+    """
+    total = DailyUpdate.objects.filter(employee_id=employee_id).aggregate(
+        total=Sum('working_hours')
+    )['total'] or 0
+    try:
+        # Savepoint so a concurrent insert of the same row doesn't
+        # poison the surrounding transaction
+        with transaction.atomic():
+            WorkingHoursSummary.objects.create(employee_id=employee_id, pm_id=pm_id, total_hours=total)
+    except IntegrityError:
+        return False
+    return True
+
+
+def _bump_summary(employee_id, pm_id, delta):
+    updated = WorkingHoursSummary.objects.filter(employee_id=employee_id).update(
+        total_hours=F('total_hours') + delta,
+        last_updated=timezone.now(),
+    )
+    # Never create rows on the way down: a negative delta on a missing row
+    # happens during cascade deletes, where the employee is going away too.
+    if updated or delta < 0 or pm_id is None:
+        return
+
+    # First write for this employee (or the row was lost): seed it from history once
+    if not _seed_summary(employee_id, pm_id):
+        # Another writer created the row first; only our own change is missing from it
+        WorkingHoursSummary.objects.filter(employee_id=employee_id, pm_id=pm_id).update(
+            total_hours=F('total_hours') + delta,
+            last_updated=timezone.now(),
+        )
+
+
+def _bump_rollup(user_id, scope, period, bucket, delta):
+    lookup = {'user_id': user_id, 'scope': scope, 'period': period, 'bucket': bucket}
+    if HoursRollup.objects.filter(**lookup).update(total_hours=F('total_hours') + delta):
+        return
+    if delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            HoursRollup.objects.create(total_hours=delta, **lookup)
+    except IntegrityError:
+        HoursRollup.objects.filter(**lookup).update(total_hours=F('total_hours') + delta)
+
+
+def period_totals(user_ids, scope, date=None):
+    """
+    {user_id: {'WEEK': .., 'MONTH': .., ...}} for the buckets containing
+    `date` (default today), read straight from the rollup table.
+    """
+    date = date or timezone.localdate()
+    buckets = {period: bucket_start(period, date) for period in ROLLUP_PERIODS[scope]}
+    totals = {user_id: dict.fromkeys(buckets, 0) for user_id in user_ids}
+    rows = HoursRollup.objects.filter(
+        user_id__in=totals, scope=scope, period__in=buckets, bucket__in=set(buckets.values())
+    ).values_list('user_id', 'period', 'bucket', 'total_hours')
+    for user_id, period, bucket, total in rows:
+        if buckets[period] == bucket:
+            totals[user_id][period] = total
+    return totals
+
+
+def recompute_employee_hours(employee_ids):
+    """Rebuild summary rows for the given employees from their DailyUpdate history"""
+    employees = User.objects.filter(pk__in=employee_ids, created_by__isnull=False).values_list(
+        'pk', 'created_by_id'
+    )
+    totals = dict(
+        DailyUpdate.objects.filter(employee_id__in=employee_ids)
+        .order_by()
+        .values_list('employee_id')
+        .annotate(total=Sum('working_hours'))
+    )
+
+    for employee_id, pm_id in employees:
+        total = totals.get(employee_id) or 0
+        with transaction.atomic():
+            updated = WorkingHoursSummary.objects.filter(employee_id=employee_id, pm_id=pm_id).update(
+                total_hours=total, last_updated=timezone.now()
+            )
+            if updated:
+                continue
+            try:
+                with transaction.atomic():
+                    WorkingHoursSummary.objects.create(employee_id=employee_id, pm_id=pm_id, total_hours=total)
+            except IntegrityError:
+                WorkingHoursSummary.objects.filter(employee_id=employee_id, pm_id=pm_id).update(
+                    total_hours=total, last_updated=timezone.now()
+                )
+
+
+def _bucketed_totals(queryset, owner_field, period):
+    """(owner_id, bucket, total) rows for `period` over a DailyUpdate queryset"""
+    if period == 'WEEK':
+        queryset = queryset.annotate(bucket=TruncWeek('date'))
+    elif period == 'MONTH':
+        queryset = queryset.annotate(bucket=TruncMonth('date'))
+    else:
+        queryset = queryset.annotate(bucket=F('date'))
+    return (
+        queryset.order_by()
+        .values_list(owner_field, 'bucket')
+        .annotate(total=Sum('working_hours'))
+    )
+
+
+def _rebuild_rollups(scope, owner_ids, queryset, owner_field, batch_size=1000):
+    with transaction.atomic():
+        HoursRollup.objects.filter(scope=scope, user_id__in=owner_ids).delete()
+        for period in ROLLUP_PERIODS[scope]:
+            HoursRollup.objects.bulk_create(
+                (
+                    HoursRollup(user_id=owner_id, scope=scope, period=period, bucket=bucket, total_hours=total)
+                    for owner_id, bucket, total in _bucketed_totals(queryset, owner_field, period)
+                ),
+                batch_size=batch_size,
+            )
+
+
+def rebuild_employee_rollups(employee_ids):
+    """Regenerate the EMPLOYEE-scope rollups of the given employees"""
+    _rebuild_rollups(
+        'EMPLOYEE', employee_ids,
+        DailyUpdate.objects.filter(employee_id__in=employee_ids), 'employee_id',
+    )
+
+
+def rebuild_team_rollups(pm_ids):
+    """Regenerate the PM-scope rollups of the given PMs from their current team"""
+    _rebuild_rollups(
+        'PM', pm_ids,
+        DailyUpdate.objects.filter(employee__created_by_id__in=pm_ids), 'employee__created_by_id',
+    )
+
+
+def recompute_hours(employee_ids):
+    """Recount summaries and rollups for the given employees (and their PMs' teams)"""
+    employee_ids = list(employee_ids)
+    pm_ids = set(
+        User.objects.filter(pk__in=employee_ids, created_by__isnull=False)
+        .values_list('created_by_id', flat=True)
+    )
+    with transaction.atomic():
+        recompute_employee_hours(employee_ids)
+        rebuild_employee_rollups(employee_ids)
+        rebuild_team_rollups(pm_ids)
+
+
+def move_employee_hours(employee_id, old_pm_id, new_pm_id):
+    """Re-home an employee's summary row and team rollups after their PM (created_by) changed"""
+    with transaction.atomic():
+        if new_pm_id is None:
+            WorkingHoursSummary.objects.filter(employee_id=employee_id).delete()
+        else:
+            # Drop any stale row already keyed to the new PM, then carry the running total over
+            WorkingHoursSummary.objects.filter(employee_id=employee_id, pm_id=new_pm_id).delete()
+            moved = WorkingHoursSummary.objects.filter(employee_id=employee_id).update(
+                pm_id=new_pm_id, last_updated=timezone.now()
+            )
+            if not moved:
+                recompute_employee_hours([employee_id])
+
+        # Reassignments are rare; recounting both teams keeps the day buckets exact
+        rebuild_team_rollups([pm_id for pm_id in (old_pm_id, new_pm_id) if pm_id is not None])
+    logger.debug('Moved hours for employee %s from PM %s to PM %s', employee_id, old_pm_id, new_pm_id)
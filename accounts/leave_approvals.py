@@ -0,0 +1,59 @@
+"""
+Approving and rejecting leave requests, one at a time or in bulk.
+
+set_leave_status() changes any number of leaves with one UPDATE and
+applies the leave balance ledger change with one INSERT ... SELECT ...
+GROUP BY, so a PM approving a month of requests costs a few statements
+instead of a save() (and signal bookkeeping) per leave.
+"""
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .dashboard_cache import invalidate
+from .leave_balances import leave_days
+from .models import Leave, LeaveBalance
+from .sql import upsert_increment_select
+
+
+def decidable_leaves(user):
+    """Leaves `user` may approve or reject: a PM's team's, or everyone's for admins"""
+    if user.role == 'ADMIN':
+        return Leave.objects.all()
+    if user.role == 'PM':
+        return Leave.objects.filter(employee__created_by=user)
+    return Leave.objects.none()
+
+
+def set_leave_status(leaves, status, decided_by=None):
+    """
+    Move `leaves` (a Leave queryset) to `status`; leaves already in it are
+    left alone. Returns the number of leaves changed.
+    """
+    changing = Leave.objects.filter(pk__in=leaves.values('pk')).exclude(status=status)
+    # The ledger counts approved leaves only: approving adds every changing leave,
+    # anything else takes back the ones that were approved
+    if status == 'APPROVED':
+        counted, sign = changing, 1
+    else:
+        counted, sign = changing.filter(status='APPROVED'), -1
+
+    with transaction.atomic():
+        employee_ids = set(changing.values_list('employee_id', flat=True))
+        if not employee_ids:
+            return 0
+        # Ledger first: on SQLite its write lock keeps other writers from
+        # changing these statuses before the UPDATE below
+        upsert_increment_select(
+            LeaveBalance,
+            counted.order_by().values('employee_id', 'leave_type').annotate(used_days=sign * Sum(leave_days())),
+            unique_fields=['employee', 'leave_type'], increment_fields=['used_days'],
+        )
+        count = changing.update(
+            status=status,
+            approved_by=decided_by if status != 'PENDING' else None,
+            updated_at=timezone.now(),
+        )
+        invalidate(employee_ids=employee_ids)
+    return count
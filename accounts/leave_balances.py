@@ -0,0 +1,129 @@
+"""
+Leave balance ledger: approved leave days per employee and leave type
+(leave_balances), against the days per type in leave_entitlements.
+
+Single saves and deletes apply the change in days through signals; bulk
+approve / reject goes through accounts.leave_approvals, which updates the
+ledger in SQL without loading the leaves.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Leave, LeaveBalance, LeaveEntitlement
+from .sql import upsert_increment
+
+
+class LeaveDays(Func):
+    """end_date - start_date + 1 in SQL: the days a leave covers, as Leave.total_days"""
+    arity = 2
+    template = '(%(expressions)s + 1)'
+    arg_joiner = ' - '
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) + 1 AS INTEGER)', arg_joiner=') - julianday(',
+            **extra_context
+        )
+
+
+def leave_days():
+    return LeaveDays('end_date', 'start_date')
+
+
+def _apply(deltas):
+    """Add {(employee_id, leave_type): days} to the ledger"""
+    added = [
+        {'employee_id': employee_id, 'leave_type': leave_type, 'used_days': days}
+        for (employee_id, leave_type), days in deltas.items() if days > 0
+    ]
+    upsert_increment(LeaveBalance, added, unique_fields=['employee', 'leave_type'], increment_fields=['used_days'])
+    for (employee_id, leave_type), days in deltas.items():
+        if days < 0:
+            # Never creates a row: the employee may be getting deleted in this transaction
+            LeaveBalance.objects.filter(employee_id=employee_id, leave_type=leave_type).update(
+                used_days=F('used_days') + days
+            )
+
+
+def leave_changed(old, new):
+    """
+    Apply one leave going from `old` to `new`, each (employee_id,
+    leave_type, status, days) or None for a leave that didn't / doesn't exist.
+    """
+    deltas = Counter()
+    for state, sign in ((old, -1), (new, 1)):
+        if state is not None and state[2] == 'APPROVED':
+            deltas[state[:2]] += sign * state[3]
+    _apply({key: days for key, days in deltas.items() if days})
+
+
+def count_used_days(employee_ids=None):
+    """{(employee_id, leave_type): days} of approved leave, straight from the leaves table"""
+    queryset = Leave.objects.filter(status='APPROVED')
+    if employee_ids is not None:
+        queryset = queryset.filter(employee_id__in=employee_ids)
+    rows = queryset.order_by().values_list('employee_id', 'leave_type').annotate(days=Sum(leave_days()))
+    return {(employee_id, leave_type): days for employee_id, leave_type, days in rows}
+
+
+def recount_leave_balances(employee_ids=None):
+    """
+    Overwrite the ledger from the leaves table (all employees when None).
+    Returns {(employee_id, leave_type): days} for the rows written.
+    """
+    used = count_used_days(employee_ids)
+    rows = [
+        {'employee_id': employee_id, 'leave_type': leave_type, 'used_days': days}
+        for (employee_id, leave_type), days in used.items()
+    ]
+    stale = LeaveBalance.objects.exclude(used_days=0)
+    if employee_ids is not None:
+        stale = stale.filter(employee_id__in=employee_ids)
+    with transaction.atomic():
+        # Balances with no approved leave left go to zero rather than keeping a stale count
+        stale.update(used_days=0)
+        for start in range(0, len(rows), 500):
+            upsert_increment(
+                LeaveBalance, rows[start:start + 500], unique_fields=['employee', 'leave_type'],
+                increment_fields=[], update_fields=['used_days'],
+            )
+    return used
+
+
+def leave_balances_queryset(employee_id):
+    """(leave_type, entitled days, used days) per entitlement; a unique-index lookup per type"""
+    used = LeaveBalance.objects.filter(employee_id=employee_id, leave_type=OuterRef('leave_type')).values('used_days')
+    return LeaveEntitlement.objects.annotate(used=Coalesce(Subquery(used), Value(0))).values_list(
+        'leave_type', 'days', 'used'
+    )
+
+
+def leave_balances(employee_id):
+    """[{'leave_type', 'label', 'entitled', 'used', 'remaining'}] for every leave type with an entitlement"""
+    rows = leave_balances_queryset(employee_id)
+    labels = dict(Leave.LEAVE_TYPE_CHOICES)
+    return [
+        {'leave_type': leave_type, 'label': labels[leave_type], 'entitled': days, 'used': used, 'remaining': days - used}
+        for leave_type, days, used in rows
+    ]
+
+
+def remaining_days(employee_ids):
+    """{(employee_id, leave_type): days left} for the employees, for every leave type with an entitlement"""
+    entitled = dict(LeaveEntitlement.objects.values_list('leave_type', 'days'))
+    used = dict(
+        ((employee_id, leave_type), days)
+        for employee_id, leave_type, days in LeaveBalance.objects.filter(
+            employee_id__in=employee_ids, leave_type__in=entitled,
+        ).values_list('employee_id', 'leave_type', 'used_days')
+    )
+    return {
+        (employee_id, leave_type): days - used.get((employee_id, leave_type), 0)
+        for employee_id in employee_ids for leave_type, days in entitled.items()
+    }
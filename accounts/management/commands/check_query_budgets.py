@@ -0,0 +1,88 @@
+import logging
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from accounts.benchmarks import (
+    benchmark_fixtures, budget_requests, fetch_url, private_cache, task_results_in_memory,
+)
+from accounts.querybudget import QUERY_BUDGETS, QueryRecorder, budget_problems
+from accounts.replicas import mirror_primary
+from accounts.scale import clear_scale_data, seed_scale
+
+
+def record_queries(scale, seed):
+    """{label: (url name, recorder)} for every route and admin changelist, each on a cold cache"""
+    clear_scale_data()
+    seed_scale(scale=scale, seed=seed)
+    requests = budget_requests(benchmark_fixtures())
+
+    recorded = {}
+    client = Client()
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    try:
+        for label, name, url, user in requests:
+            client.logout()
+            if user is not None:
+                client.force_login(user)
+            cache.clear()
+            with QueryRecorder() as recorder:
+                fetch_url(client, url)
+            recorded[label] = (name, recorder)
+    finally:
+        request_logger.setLevel(level)
+    return recorded
+
+
+class Command(BaseCommand):
+    help = (
+        'Request every accounts route (and admin changelist) at two seed_scale sizes in a throwaway '
+        'test database; fail if a view is over its QUERY_BUDGETS entry, repeats a query shape (N+1) '
+        'or runs more queries on the larger data set'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1, help='Base seed_scale multiplier (default: 1)')
+        parser.add_argument('--factor', type=int, default=10, help='Second run is scale * factor (default: 10)')
+        parser.add_argument('--seed', type=int, default=0, help='seed_scale random seed (default: 0)')
+
+    def handle(self, *args, **options):
+        scales = (options['scale'], options['scale'] * options['factor'])
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # Reporting views must not read a real replica of the real database
+        mirror_primary()
+        try:
+            with private_cache(), task_results_in_memory():
+                runs = [record_queries(scale, options['seed']) for scale in scales]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        small, large = runs
+        failures = 0
+        self.stdout.write(f"{'route':<58} {'budget':>6} {f'x{scales[0]}':>6} {f'x{scales[1]}':>6}")
+        for label, (name, recorder) in small.items():
+            large_recorder = large[label][1]
+            budget = QUERY_BUDGETS.get(name)
+            problems = budget_problems(large_recorder, budget)
+            if len(large_recorder) != len(recorder):
+                problems.append(f'query count grows with data ({len(recorder)} -> {len(large_recorder)})')
+            line = f"{label:<58} {budget if budget is not None else '-':>6} {len(recorder):>6} {len(large_recorder):>6}"
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(line))
+                for problem in problems:
+                    self.stdout.write(f'    {problem}')
+            else:
+                self.stdout.write(line)
+
+        if failures:
+            raise CommandError(f'{failures} of {len(small)} views are over budget')
+        self.stdout.write(self.style.SUCCESS(f'All {len(small)} views within budget at scales {scales}'))
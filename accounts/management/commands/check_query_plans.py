@@ -0,0 +1,78 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.leave_balances import leave_balances_queryset
+from accounts.models import DailyUpdate, Project, Todo, TodoStats, User, WorkingHoursSummary
+from accounts.team_stats import team_members
+
+
+def view_queries():
+    """(view, description, queryset, index expected in the plan) for the hot view queries"""
+    pk = 1
+    since = datetime.date(2000, 1, 1)
+    return [
+        ('verify_email', 'token lookup',
+         User.objects.exclude(verification_token='').filter(verification_token='token'),
+         'users_verif_token_idx'),
+        ('admin_dashboard', 'recent users',
+         User.objects.order_by('-date_joined')[:10], 'users_date_joined_idx'),
+        ('admin_dashboard', 'recent projects',
+         Project.objects.order_by('-created_at')[:5], 'projects_created_idx'),
+        ('admin_dashboard', 'recent updates',
+         DailyUpdate.objects.order_by('-created_at')[:10], 'daily_upd_created_idx'),
+        ('admin_users_list', 'role filter',
+         User.objects.filter(role='PM').order_by('-date_joined'), 'users_role_joined_idx'),
+        ('admin_updates_list', 'date range page',
+         DailyUpdate.objects.filter(date__gte=since).order_by('-date', '-id')[:51], 'daily_upd_date_id_idx'),
+        ('admin_user_detail', 'employee todos',
+         Todo.objects.filter(employee_id=pk)[:10], 'todos_employee_date_idx'),
+        ('admin_user_detail', 'PM employees',
+         User.objects.filter(created_by_id=pk, role='EMPLOYEE'), 'users_created_by_role_idx'),
+        ('pm_dashboard', 'projects',
+         Project.objects.filter(created_by_id=pk).order_by('-created_at'), 'projects_pm_created_idx'),
+        ('pm_dashboard', 'employees',
+         User.objects.filter(created_by_id=pk, role='EMPLOYEE'), 'users_created_by_role_idx'),
+        ('pm_dashboard', 'hours summary',
+         WorkingHoursSummary.objects.filter(pm_id=pk), 'working_hours_summary_pm_id'),
+        ('project_team_view', 'team stats',
+         team_members(pk), 'daily_updates_employee_id'),
+        ('project_team_view', 'recent team updates',
+         DailyUpdate.objects.filter(employee__created_by_id=pk, date__gte=since).order_by('-date')[:20],
+         'daily_updates_employee_id_date'),
+        ('project_team_view', 'recent team todos',
+         Todo.objects.filter(employee__created_by_id=pk, date__gte=since).order_by('-date')[:20],
+         'todos_employee_date_idx'),
+        ('employee_dashboard', 'todos',
+         Todo.objects.filter(employee_id=pk).order_by('-date')[:10], 'todos_employee_date_idx'),
+        ('employee_dashboard', 'todo counters',
+         # bigint primary key: SQLite backs it with an autoindex, not the rowid
+         TodoStats.objects.filter(pk=pk), 'sqlite_autoindex_todo_stats_1'),
+        ('employee_dashboard', 'updates',
+         DailyUpdate.objects.filter(employee_id=pk).order_by('-date')[:10], 'daily_updates_employee_id_date'),
+        ('employee_dashboard', 'leave balances',
+         leave_balances_queryset(pk), 'leave_balances_employee_id_leave_type_3654ffb3_uniq'),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Check with EXPLAIN QUERY PLAN that each view's queries use the expected index"
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Query plan checks are written for SQLite plans only')
+
+        failures = 0
+        for view, description, queryset, index in view_queries():
+            plan = queryset.explain()
+            if index in plan:
+                self.stdout.write(f'OK    {view}: {description} -> {index}')
+            else:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'MISS  {view}: {description} (expected {index})'))
+                self.stdout.write(f'      {plan}')
+
+        if failures:
+            raise CommandError(f'{failures} queries are not using their index')
+        self.stdout.write(self.style.SUCCESS('All view queries use their indexes'))
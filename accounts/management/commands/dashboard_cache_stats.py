@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from accounts.dashboard_cache import cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show dashboard cache hit/miss counters (of every process with Redis, of this one otherwise)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them')
+
+    def handle(self, *args, **options):
+        for kind, counts in cache_stats().items():
+            total = counts['hits'] + counts['misses']
+            ratio = counts['hits'] / total if total else 0.0
+            self.stdout.write(f"{kind:<10} hits={counts['hits']:<8} misses={counts['misses']:<8} hit ratio={ratio:.1%}")
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from accounts.outbox import drain
+
+
+class Command(BaseCommand):
+    help = 'Send due emails from the outbox in batches (what the drain_email_outbox task does)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Emails per batch (default: EMAIL_OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        totals = drain(batch_size=options['batch_size'], max_batches=options['max_batches'])
+        rate = totals['sent'] / totals['seconds'] if totals['seconds'] else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {totals['sent']} emails in {totals['batches']} batches, {totals['failed']} failed "
+            f"({totals['seconds']:.2f}s, {rate:.1f} msg/s)"
+        ))
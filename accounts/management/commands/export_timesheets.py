@@ -0,0 +1,61 @@
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from accounts.timesheets import export_queryset, export_rows, iter_csv, write_xlsx
+
+
+class Command(BaseCommand):
+    help = 'Export daily updates or todos as CSV/XLSX in constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=['updates', 'todos'], default='updates')
+        parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--pm', help='Only this PM\'s team (email)')
+        parser.add_argument('--employee', help='Only this employee (email)')
+        parser.add_argument('--from', dest='date_from', help='First date, YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', help='Last date, YYYY-MM-DD')
+        parser.add_argument('--output', '-o', default='-', help='Output file (default: stdout)')
+
+    def _user(self, email, role):
+        if not email:
+            return None
+        try:
+            return User.objects.get(email=email, role=role)
+        except User.DoesNotExist:
+            raise CommandError(f'No {role} with email {email}')
+
+    def _date(self, value, option):
+        if not value:
+            return None
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f'{option} must be a date as YYYY-MM-DD, not {value!r}')
+
+    def handle(self, *args, **options):
+        queryset = export_queryset(
+            options['kind'],
+            pm=self._user(options['pm'], 'PM'),
+            employee=self._user(options['employee'], 'EMPLOYEE'),
+            date_from=self._date(options['date_from'], '--from'),
+            date_to=self._date(options['date_to'], '--to'),
+        )
+        rows = export_rows(queryset, options['kind'])
+
+        if options['format'] == 'xlsx':
+            if options['output'] == '-':
+                raise CommandError('XLSX output needs --output')
+            with open(options['output'], 'wb') as fileobj:
+                write_xlsx(rows, fileobj)
+            return
+
+        if options['output'] == '-':
+            for line in iter_csv(rows):
+                sys.stdout.write(line)
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as fileobj:
+            for line in iter_csv(rows):
+                fileobj.write(line)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from accounts.media_gc import collect_garbage, rehash_profile_images
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete profile images and avatar variants no user references any more, in batches. '
+        'With --rehash, first move images saved before content addressing to their hashed names'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Files deleted per batch (default: 500)')
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help='Keep files modified in the last SECONDS, e.g. uploads not committed yet (default: 3600)')
+        parser.add_argument('--dry-run', action='store_true', help='Only list what would be deleted')
+        parser.add_argument('--rehash', action='store_true',
+                            help='Move legacy upload names to content hashes first (deduplicates old copies)')
+
+    def handle(self, *args, **options):
+        storage = User._meta.get_field('profile_image').storage
+        if options['rehash']:
+            self.stdout.write(f'Rehashed {rehash_profile_images(storage)} profile images')
+
+        files = size = 0
+        for names, batch_size in collect_garbage(
+            storage, batch_size=options['batch_size'], min_age=options['min_age'], dry_run=options['dry_run'],
+        ):
+            files += len(names)
+            size += batch_size
+            if options['verbosity'] > 1:
+                for name in names:
+                    self.stdout.write(f'  {name}')
+            self.stdout.write(f'{"Would delete" if options["dry_run"] else "Deleted"} {len(names)} files ({batch_size} B)')
+        verb = 'Would free' if options['dry_run'] else 'Freed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {size} B in {files} unreferenced files'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from accounts.avatars import generate_variants, stale_users
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the WebP avatar variants of profile images that have none yet or were replaced '
+        '(what the generate_avatar_variants task does in batches; inline, no worker needed)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate every profile image, not only stale ones')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            users = User.objects.exclude(profile_image='').exclude(profile_image__isnull=True)
+        else:
+            users = stale_users()
+        generated = failed = 0
+        for user in users.order_by('pk').iterator():
+            written = generate_variants(user)
+            if written:
+                generated += 1
+                self.stdout.write(f"{user.email}: {', '.join(f'{size}px' for size in written)}")
+            else:
+                failed += 1
+                self.stderr.write(self.style.WARNING(f'{user.email}: could not read {user.profile_image.name}'))
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {generated} users ({failed} failed)'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.timesheets import IMPORT_BATCH_SIZE, import_daily_updates
+
+
+class Command(BaseCommand):
+    help = 'Bulk import daily updates from a CSV file (employee, date, working_hours, update_text)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+            help=f'Rows validated and written per batch (default: {IMPORT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            fileobj = open(options['path'], newline='', encoding='utf-8-sig')
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        with fileobj:
+            result = import_daily_updates(fileobj, batch_size=options['batch_size'])
+
+        for line_no, message in result.errors:
+            self.stderr.write(f'Line {line_no}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.imported} updates for {len(result.employee_ids)} employees '
+            f'({len(result.errors)} rows rejected)'
+        ))
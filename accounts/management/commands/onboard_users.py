@@ -0,0 +1,46 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from accounts.onboarding import onboard_users
+
+
+class Command(BaseCommand):
+    help = 'Bulk create employees from a CSV file (email, first_name, last_name, password)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument('--pm', required=True, help='Email of the PM (or admin) the employees belong to')
+        parser.add_argument(
+            '--verified', action='store_true',
+            help='Mark the users as verified and send no verification emails'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Processes used for password hashing (default: one per CPU)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            created_by = User.objects.get(email=options['pm'], role__in=('PM', 'ADMIN'))
+        except User.DoesNotExist:
+            raise CommandError(f"No PM or admin with email {options['pm']}")
+
+        try:
+            fileobj = open(options['path'], newline='', encoding='utf-8-sig')
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        with fileobj:
+            result = onboard_users(
+                fileobj, created_by, is_verified=options['verified'],
+                workers=options['workers'] or os.cpu_count() or 1,
+            )
+
+        for line_no, message in result.errors:
+            self.stderr.write(f'Line {line_no}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(result.created)} employees under {created_by.email} '
+            f'({len(result.errors)} rows rejected)'
+        ))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.hours import rebuild_employee_rollups, rebuild_team_rollups, recompute_employee_hours
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Regenerate working hours summaries and day/week/month rollups from DailyUpdate history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=200,
+            help='Users processed per transaction (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_pk = 0
+        processed = 0
+
+        # Walk users by primary key so each chunk is one short transaction
+        while True:
+            chunk = list(
+                User.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            )
+            if not chunk:
+                break
+
+            # Summaries and both rollup scopes of a chunk change together
+            with transaction.atomic():
+                recompute_employee_hours(chunk)
+                rebuild_employee_rollups(chunk)
+                rebuild_team_rollups(chunk)
+
+            last_pk = chunk[-1]
+            processed += len(chunk)
+            self.stdout.write(f'Rebuilt rollups for {processed} users...')
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {processed} users processed'))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.search import INDEXES, check_index, missing_triggers, optimize_index, rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the FTS5 search indexes from their tables and recreate sync triggers a table '
+        'rebuild dropped (run after migrations that alter users, todos, projects or daily_updates)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report missing triggers and indexes that differ from their tables')
+        parser.add_argument('--optimize', action='store_true', help='Also merge each index into a single b-tree')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            problems = []
+            for index in INDEXES:
+                for trigger in missing_triggers(index):
+                    problems.append(f'{index.kind}: trigger {trigger} is missing')
+                error = check_index(index)
+                if error:
+                    problems.append(f'{index.kind}: {error}')
+            for problem in problems:
+                self.stdout.write(problem)
+            if problems:
+                raise CommandError(f'{len(problems)} search index problems; run rebuild_search_index')
+            self.stdout.write(self.style.SUCCESS(f'{len(INDEXES)} search indexes in sync'))
+            return
+
+        for index in INDEXES:
+            with transaction.atomic():
+                recreated = rebuild_index(index)
+                if options['optimize']:
+                    optimize_index(index)
+            note = f" (recreated {', '.join(recreated)})" if recreated else ''
+            self.stdout.write(f'{index.kind}: rebuilt{note}')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(INDEXES)} search indexes'))
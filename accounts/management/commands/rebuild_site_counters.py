@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import SiteCounter
+from accounts.site_stats import compute_counters, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount users per role and projects into site_counters (fixes drift from bulk/raw writes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report counters that drifted')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stored = dict(SiteCounter.objects.values_list('name', 'value'))
+            counters = compute_counters() if options['check'] else rebuild_counters()
+
+        drifted = {name: value for name, value in counters.items() if stored.get(name) != value}
+        for name, value in sorted(drifted.items()):
+            self.stdout.write(f'{name}: stored {stored.get(name)}, actual {value}')
+        if options['check']:
+            self.stdout.write(self.style.SUCCESS(f'{len(drifted)} counters drifted'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(counters)} counters ({len(drifted)} had drifted)'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.leave_balances import count_used_days, recount_leave_balances
+from accounts.models import LeaveBalance
+
+
+class Command(BaseCommand):
+    help = 'Recount leave_balances from the approved leaves and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report balances that drifted')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stored = {
+                (employee_id, leave_type): days
+                for employee_id, leave_type, days in LeaveBalance.objects.values_list('employee_id', 'leave_type', 'used_days')
+            }
+            actual = count_used_days()
+            drifted = sorted(key for key in set(stored) | set(actual) if stored.get(key, 0) != actual.get(key, 0))
+            if drifted and not options['check']:
+                recount_leave_balances()
+
+        for employee_id, leave_type in drifted:
+            self.stdout.write(
+                f'employee {employee_id} {leave_type}: stored {stored.get((employee_id, leave_type), 0)} days, '
+                f'actual {actual.get((employee_id, leave_type), 0)}'
+            )
+        verb = 'drifted' if options['check'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f'{len(drifted)} balances {verb}'))
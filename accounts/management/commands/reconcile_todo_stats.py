@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import TodoStats
+from accounts.todo_stats import COUNTER_FIELDS, count_todos, recount_todo_stats
+
+
+class Command(BaseCommand):
+    help = 'Recount todo_stats from the todos table and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report employees whose counters drifted')
+
+    def handle(self, *args, **options):
+        zeros = {name: 0 for name in COUNTER_FIELDS}
+        with transaction.atomic():
+            stored = {row.pop('employee_id'): row for row in TodoStats.objects.values('employee_id', *COUNTER_FIELDS)}
+            actual = count_todos()
+            drifted = sorted(
+                employee_id for employee_id in set(stored) | set(actual)
+                if stored.get(employee_id, zeros) != actual.get(employee_id, zeros)
+            )
+            if drifted and not options['check']:
+                recount_todo_stats()
+
+        for employee_id in drifted:
+            self.stdout.write(
+                f'employee {employee_id}: stored {stored.get(employee_id, zeros)}, actual {actual.get(employee_id, zeros)}'
+            )
+        verb = 'drifted' if options['check'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f'{len(drifted)} employees {verb}'))
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.replicas import refresh_replicas, snapshot_time
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-snapshot the primary database into every read replica with the SQLite backup API '
+        '(the refresh_replicas Celery task does the same on a schedule)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', action='store_true', help="Only show each replica's age")
+        parser.add_argument('--loop', type=float, metavar='SECONDS',
+                            help='Keep refreshing every SECONDS (for deployments without Celery beat)')
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('No replicas configured (DATABASE_REPLICAS is empty)')
+        if options['status']:
+            now = time.time()
+            for alias in settings.DATABASE_REPLICAS:
+                taken_at = snapshot_time(alias)
+                age = f'{now - taken_at:.1f}s old' if taken_at is not None else 'no snapshot'
+                stale = ' (stale)' if taken_at is None or now - taken_at > settings.REPLICA_MAX_LAG else ''
+                self.stdout.write(f'{alias}: {age}{stale}, max lag {settings.REPLICA_MAX_LAG}s')
+            return
+
+        while True:
+            for alias, seconds in refresh_replicas().items():
+                self.stdout.write(f'{alias}: refreshed in {seconds:.3f}s')
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
@@ -0,0 +1,94 @@
+import datetime
+import json
+import platform
+import sqlite3
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from accounts.benchmarks import compare_results, private_cache, run_benchmarks, uncovered_routes
+from accounts.replicas import mirror_primary
+from accounts.scale import seed_scale
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway test database with seed_scale data, request every accounts route '
+        'as the right role and write p50/p95/p99 latency, query count and peak memory as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1, help='seed_scale multiplier (default: 1)')
+        parser.add_argument('--seed', type=int, default=0, help='seed_scale random seed (default: 0)')
+        parser.add_argument('--iterations', type=int, default=20, help='Measured requests per route (default: 20)')
+        parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests per route first (default: 2)')
+        parser.add_argument('--route', action='append', dest='routes', help='Only this URL name (repeatable)')
+        parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc peak-memory pass')
+        parser.add_argument(
+            '--output', default='benchmark-results.json',
+            help='JSON file to write (default: benchmark-results.json, git-ignored)'
+        )
+        parser.add_argument('--compare', help='Previous JSON results to print deltas against')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        for name in uncovered_routes():
+            self.stderr.write(self.style.WARNING(f'No benchmark for route {name!r}'))
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # Reporting views must not read a real replica of the real database
+        mirror_primary()
+        try:
+            with private_cache():
+                rows = seed_scale(scale=options['scale'], seed=options['seed'])
+                results = run_benchmarks(
+                    iterations=options['iterations'],
+                    warmup=options['warmup'],
+                    names=options['routes'],
+                    measure_memory=not options['no_memory'],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+                'scale': options['scale'],
+                'seed': options['seed'],
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'rows': rows,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'database': connection.vendor,
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w') as fileobj:
+            json.dump(report, fileobj, indent=2)
+
+        self.stdout.write(f"{'route':<58} {'status':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>7} {'peak KiB':>9}")
+        for result in results:
+            self.stdout.write(
+                f"{result['label']:<58} {result['status']:>6} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                f"{result['p99_ms']:>8.2f} {result['queries']:>7} {result['peak_kib'] or '-':>9}"
+            )
+
+        if options['compare']:
+            with open(options['compare']) as fileobj:
+                previous = json.load(fileobj)
+            self.stdout.write(f"\nAgainst {options['compare']} (scale {previous['meta']['scale']}):")
+            for label, old, new in compare_results(previous, report):
+                change = (new['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+                self.stdout.write(
+                    f"{label:<58} p50 {old['p50_ms']:>8.2f} -> {new['p50_ms']:>8.2f} ({change:+.0f}%)  "
+                    f"queries {old['queries']} -> {new['queries']}"
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}"))
@@ -0,0 +1,36 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from accounts.scale import PER_EMPLOYEE, PER_PM, PER_SCALE, SCALE_EMAIL_DOMAIN, clear_scale_data, seed_scale
+
+
+class Command(BaseCommand):
+    help = (
+        f"Generate deterministic synthetic data (@{SCALE_EMAIL_DOMAIN} users and their work). "
+        f"Per unit of scale: {PER_SCALE['admins']} admin, {PER_SCALE['pms']} PMs, "
+        f"{PER_PM['employees']} employees and {PER_PM['projects']} projects per PM, "
+        f"{PER_EMPLOYEE['todos']} todos, {PER_EMPLOYEE['update_days']} days of updates "
+        f"and {PER_EMPLOYEE['leaves']} leaves per employee"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1, help='Multiplier for every row count (default: 1)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument(
+            '--end-date', type=datetime.date.fromisoformat, default=None,
+            help='Last day of generated work, YYYY-MM-DD (default: today)'
+        )
+        parser.add_argument('--flush', action='store_true', help='Delete previously seeded data first')
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            deleted, _ = clear_scale_data()
+            self.stdout.write(f'Deleted {deleted} previously seeded rows')
+        elif User.objects.filter(email__endswith=f'@{SCALE_EMAIL_DOMAIN}').exists():
+            raise CommandError('Seeded data already exists; use --flush to replace it')
+
+        counts = seed_scale(scale=options['scale'], seed=options['seed'], end_date=options['end_date'])
+        summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Created {summary}'))
@@ -0,0 +1,75 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from accounts.sqlite_backend.base import DatabaseWrapper, connection_stats, read_pragmas
+
+
+FILE_PRAGMAS = ('page_size', 'page_count', 'freelist_count', 'wal_autocheckpoint')
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Show the SQLite connection profile (configured vs. active PRAGMAs), persistence settings and file stats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias (default: default)')
+        parser.add_argument('--check', action='store_true', help='Exit non-zero if an active PRAGMA differs from the profile')
+        parser.add_argument('--checkpoint', action='store_true', help='Run a TRUNCATE WAL checkpoint first')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not isinstance(connection, DatabaseWrapper):
+            raise CommandError(
+                f"Database {options['database']!r} uses {connection.settings_dict['ENGINE']}, "
+                "not accounts.sqlite_backend"
+            )
+        connection.ensure_connection()
+        conn = connection.connection
+        settings_dict = connection.settings_dict
+
+        if options['checkpoint']:
+            busy, log_frames, checkpointed = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+            self.stdout.write(f'Checkpoint: busy={busy} wal frames={log_frames} checkpointed={checkpointed}\n')
+
+        self.stdout.write(f"Database:           {settings_dict['NAME']}")
+        self.stdout.write(f"CONN_MAX_AGE:       {settings_dict['CONN_MAX_AGE']}")
+        self.stdout.write(f"CONN_HEALTH_CHECKS: {settings_dict['CONN_HEALTH_CHECKS']}")
+        self.stdout.write(f"transaction_mode:   {connection.transaction_mode or 'DEFERRED (default)'}\n")
+
+        active = read_pragmas(conn, connection.pragmas)
+        mismatched = []
+        self.stdout.write(f"{'pragma':<14} {'profile':>12} {'active':>12}")
+        for name, configured in connection.pragmas.items():
+            matches = str(active[name]).upper() == str(configured).upper()
+            line = f'{name:<14} {configured!s:>12} {active[name]!s:>12}'
+            if matches:
+                self.stdout.write(line)
+            else:
+                mismatched.append(name)
+                self.stdout.write(self.style.WARNING(line))
+
+        stats = read_pragmas(conn, FILE_PRAGMAS)
+        database_size = _size(settings_dict['NAME'])
+        wal_size = _size(f"{settings_dict['NAME']}-wal")
+        self.stdout.write('')
+        self.stdout.write(f"Pages:              {stats['page_count']} x {stats['page_size']} B, {stats['freelist_count']} free")
+        self.stdout.write(f"Database file:      {database_size if database_size is not None else '-'} B")
+        self.stdout.write(f"WAL file:           {wal_size if wal_size is not None else '-'} B "
+                          f"(auto-checkpoint every {stats['wal_autocheckpoint']} pages)")
+        process = connection_stats()
+        self.stdout.write(f"This process:       {process['connections_opened']} connections opened, "
+                          f"{process['health_checks_failed']} failed health checks")
+
+        if mismatched:
+            message = f"Active PRAGMAs differ from the profile: {', '.join(mismatched)}"
+            if options['check']:
+                raise CommandError(message)
+            self.stderr.write(self.style.WARNING(message))
@@ -0,0 +1,135 @@
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from accounts.replicas import mirror_primary
+from accounts.scale import seed_scale
+from accounts.stress import DEFAULT_MIX, build_jobs, parse_mix, run_stress
+
+
+JOURNAL_MODES = ('delete', 'truncate', 'persist', 'wal')
+TRANSACTION_MODES = ('deferred', 'immediate', 'exclusive')
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate the end-of-day daily update burst: many workers submitting at once against a '
+        'seeded SQLite file, for each journal mode / transaction mode combination. Reports '
+        'throughput, latency, time waiting on the write lock and error rates'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='Concurrent clients (default: 16)')
+        parser.add_argument('--requests', type=int, default=25, help='Requests per worker (default: 25)')
+        parser.add_argument('--mode', choices=('thread', 'process'), default='thread',
+                            help='Run workers as threads or forked processes (default: thread)')
+        parser.add_argument('--mix', default=','.join(f'{kind}={weight}' for kind, weight in DEFAULT_MIX.items()),
+                            help='Request kind weights, e.g. submit=8,todo=1,dashboard=1')
+        parser.add_argument('--journal-mode', nargs='+', choices=JOURNAL_MODES, default=['delete', 'wal'],
+                            help='SQLite journal modes to compare (default: delete wal)')
+        parser.add_argument('--transaction-mode', nargs='+', choices=TRANSACTION_MODES,
+                            default=['deferred', 'immediate'],
+                            help='SQLite transaction modes to compare (default: deferred immediate)')
+        parser.add_argument('--timeout', type=float, default=5,
+                            help='SQLite busy timeout in seconds (default: 5, Django\'s default)')
+        parser.add_argument('--scale', type=int, default=1, help='seed_scale multiplier (default: 1)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for data and request mix')
+        parser.add_argument('--output', help='Also write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('stress_submissions measures SQLite locking; the default database is not SQLite')
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        workdir = tempfile.mkdtemp(prefix='stress-')
+        template = os.path.join(workdir, 'template.sqlite3')
+        settings_dict = connection.settings_dict
+        saved_options = settings_dict['OPTIONS']
+        settings_dict['TEST']['NAME'] = template
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # Reporting views must not read a real replica of the real database
+        mirror_primary()
+        # As in production: no technical 500 pages (they query while rendering) and
+        # no debug-only middleware; lock errors are counted, not logged one by one
+        debug_off = override_settings(DEBUG=False)
+        debug_off.enable()
+        request_logger = logging.getLogger('django.request')
+        log_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        runs = []
+        try:
+            seed_scale(scale=options['scale'], seed=options['seed'])
+            jobs = build_jobs(options['workers'], options['requests'], mix, seed=options['seed'])
+            connections.close_all()
+
+            for journal_mode, transaction_mode in itertools.product(
+                options['journal_mode'], options['transaction_mode']
+            ):
+                # Every combination starts from the same seeded file
+                database = os.path.join(workdir, f'{journal_mode}-{transaction_mode}.sqlite3')
+                shutil.copyfile(template, database)
+                settings_dict['NAME'] = database
+                settings_dict['OPTIONS'] = {
+                    **saved_options,
+                    'timeout': options['timeout'],
+                    'transaction_mode': transaction_mode.upper(),
+                }
+                if 'pragmas' in saved_options:
+                    # accounts.sqlite_backend: its profile would override init_command
+                    settings_dict['OPTIONS']['pragmas'] = {
+                        **saved_options['pragmas'],
+                        'journal_mode': journal_mode,
+                        'busy_timeout': int(options['timeout'] * 1000),
+                    }
+                else:
+                    settings_dict['OPTIONS']['init_command'] = f'PRAGMA journal_mode={journal_mode}'
+                self.stderr.write(f'Running journal_mode={journal_mode} transaction_mode={transaction_mode} ...')
+                result = run_stress(jobs, mode=options['mode'])
+                runs.append({'journal_mode': journal_mode, 'transaction_mode': transaction_mode, **result})
+                connections.close_all()
+        finally:
+            request_logger.setLevel(log_level)
+            debug_off.disable()
+            connections.close_all()
+            settings_dict['NAME'] = template
+            settings_dict['OPTIONS'] = saved_options
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.stdout.write(
+            f"{options['workers']} {options['mode']} workers x {options['requests']} requests, "
+            f"mix {options['mix']}, busy timeout {options['timeout']}s\n"
+        )
+        self.stdout.write(
+            f"{'journal':<9} {'txn':<10} {'req/s':>7} {'errors':>7} {'submit p50':>11} {'p95':>8} {'p99':>8} "
+            f"{'wait p95':>9} {'wait max':>9}"
+        )
+        for run in runs:
+            submit = run['by_kind'].get('submit', {})
+            self.stdout.write(
+                f"{run['journal_mode']:<9} {run['transaction_mode']:<10} {run['throughput_rps']:>7} "
+                f"{run['error_rate']:>7.1%} {submit.get('p50_ms', '-'):>11} {submit.get('p95_ms', '-'):>8} "
+                f"{submit.get('p99_ms', '-'):>8} {run['write_wait_ms']['p95']:>9} {run['write_wait_ms']['max']:>9}"
+            )
+            for error, count in sorted(run['errors'].items()):
+                self.stdout.write(f'    {count}x {error}')
+
+        if options['output']:
+            with open(options['output'], 'w') as fileobj:
+                json.dump({'options': {key: options[key] for key in (
+                    'workers', 'requests', 'mode', 'mix', 'timeout', 'scale', 'seed',
+                )}, 'runs': runs}, fileobj, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(runs)} runs to {options['output']}"))
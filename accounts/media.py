@@ -0,0 +1,164 @@
+"""
+Serving MEDIA_ROOT in production.
+
+serve_media() answers from the file's stat() alone: a strong ETag (the
+content hash itself for content-addressed names), Last-Modified, and
+Cache-Control that marks hashed names immutable for a year, so a repeat
+avatar load is a cache hit or a 304. File bodies go out through
+FileResponse, which WSGI servers with wsgi.file_wrapper (gunicorn,
+uWSGI) send with os.sendfile(); single byte ranges are honoured the same
+way. With MEDIA_SENDFILE_HEADER set, the body is left to the front-end
+server (nginx X-Accel-Redirect, Apache/lighttpd X-Sendfile).
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .storage import is_hashed
+
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def media_etag(name, stat_result):
+    """Strong ETag: the digest for content-addressed names, else size and mtime"""
+    if is_hashed(name):
+        return f'"{posixpath.splitext(posixpath.basename(name))[0]}"'
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single `bytes=` range, None to send the
+    whole file (no header, several ranges, or syntax we don't know), or
+    ValueError if it can't be satisfied.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the last N bytes
+        length = int(last)
+        # Nothing to send the last bytes of an empty file from
+        if not length or not size:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+class FileRange:
+    """
+    Bytes start..end of an open file for FileResponse. It keeps fileno(),
+    so servers that sendfile() from the current offset for Content-Length
+    bytes still do; everyone else reads through read().
+    """
+
+    def __init__(self, fileobj, start, end):
+        self.fileobj = fileobj
+        self.fileobj.seek(start)
+        self.remaining = end - start + 1
+
+    def fileno(self):
+        return self.fileobj.fileno()
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fileobj.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fileobj.close()
+
+
+def _set_headers(response, headers):
+    for header, value in headers.items():
+        response[header] = value
+
+
+def _offloaded(name, fullpath, content_type):
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE_HEADER == 'X-Accel-Redirect':
+        # An `internal` nginx location aliased to MEDIA_ROOT
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+    else:
+        response['X-Sendfile'] = fullpath
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """A file under MEDIA_ROOT, with validators, caching headers and Range support"""
+    name = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, name)
+        stat_result = os.stat(fullpath)
+    except (OSError, SuspiciousFileOperation):
+        raise Http404('No such file')
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404('No such file')
+
+    etag = media_etag(name, stat_result)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat_result.st_mtime),
+        'Cache-Control': IMMUTABLE_CACHE if is_hashed(name) else f'public, max-age={settings.MEDIA_CACHE_SECONDS}',
+    }
+    # 304 for a matching If-None-Match (or If-Modified-Since without one)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat_result.st_mtime))
+    if not_modified is not None:
+        _set_headers(not_modified, headers)
+        return not_modified
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if settings.MEDIA_SENDFILE_HEADER:
+        # The front-end server does ranges itself
+        response = _offloaded(name, fullpath, content_type)
+        _set_headers(response, headers)
+        return response
+
+    size = stat_result.st_size
+    byte_range = None
+    # If-Range: only resume if the client still has this version
+    if request.headers.get('If-Range', etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            _set_headers(response, headers)
+            return response
+
+    fileobj = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(fileobj, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(fileobj, start, end), content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    _set_headers(response, headers)
+    return response
@@ -0,0 +1,120 @@
+"""
+Garbage collection of profile image blobs.
+
+With ContentAddressedStorage a blob may back several users' images (and
+their avatar variants), so nothing deletes one when a row stops using
+it. collect_garbage() walks the storage and removes files no row
+references. Files modified within `min_age` seconds are kept: an upload
+is written (or an existing blob touched) before its row commits.
+"""
+
+import posixpath
+import time
+
+from django.db.models import Q
+
+from .avatars import VARIANTS_DIR
+from .dashboard_cache import invalidate
+from .models import User
+from .storage import is_hashed
+
+
+PROFILES_DIR = 'profiles'
+VARIANT_RECHECK_CHUNK = 100
+
+
+def _walk(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for name in directories:
+        yield from _walk(storage, posixpath.join(directory, name))
+
+
+def stored_names(storage, directory=PROFILES_DIR):
+    """Every file under `directory`, recursively; nothing if it doesn't exist yet"""
+    if not storage.exists(directory):
+        return iter(())
+    return _walk(storage, directory)
+
+
+def referenced_names(users=None):
+    """Names of every profile image and avatar variant some user (of `users`, default all) points at"""
+    names = set()
+    users = User.objects.all() if users is None else users
+    rows = users.exclude(profile_image='').exclude(profile_image__isnull=True)
+    for image, variants in rows.values_list('profile_image', 'profile_image_variants').iterator():
+        names.add(image)
+        names.update((variants or {}).get('sizes', {}).values())
+    return names
+
+
+def _still_unreferenced(batch):
+    # Re-check right before deleting: a row may have been saved since the
+    # scan. Variant names only occur inside the JSON, so they are matched as
+    # text, a chunk at a time to keep the OR chain short.
+    in_use = referenced_names(User.objects.filter(profile_image__in=batch))
+    variants = [name for name in batch if name.startswith(VARIANTS_DIR + '/')]
+    for start in range(0, len(variants), VARIANT_RECHECK_CHUNK):
+        mentions = Q()
+        for name in variants[start:start + VARIANT_RECHECK_CHUNK]:
+            mentions |= Q(profile_image_variants__icontains=name)
+        in_use |= referenced_names(User.objects.filter(mentions))
+    return [name for name in batch if name not in in_use]
+
+
+def collect_garbage(storage, batch_size=500, min_age=3600, dry_run=False):
+    """
+    Delete unreferenced files under profiles/ in batches of `batch_size`.
+    Yields (names deleted or that would be, bytes) per batch.
+    """
+    referenced = referenced_names()
+    cutoff = time.time() - min_age
+    batch = []
+
+    def flush():
+        names = _still_unreferenced(batch)
+        size = sum(storage.size(name) for name in names)
+        if not dry_run:
+            for name in names:
+                storage.delete(name)
+        batch.clear()
+        return names, size
+
+    for name in stored_names(storage):
+        if name in referenced or storage.get_modified_time(name).timestamp() > cutoff:
+            continue
+        batch.append(name)
+        if len(batch) >= batch_size:
+            yield flush()
+    if batch:
+        yield flush()
+
+
+def rehash_profile_images(storage):
+    """
+    Move images stored under their upload names (before content addressing)
+    to their hashed names, so identical copies collapse into one blob.
+    The old files become garbage. Returns the number of users updated.
+    """
+    updated = 0
+    rows = User.objects.exclude(profile_image='').exclude(profile_image__isnull=True)
+    fields = ('pk', 'profile_image', 'profile_image_variants', 'created_by_id')
+    for pk, name, variants, pm_id in rows.values_list(*fields).iterator():
+        if is_hashed(name) or not storage.exists(name):
+            continue
+        with storage.open(name, 'rb') as fileobj:
+            new_name = storage.save(name, fileobj)
+        if new_name == name:
+            continue
+        if (variants or {}).get('source') == name:
+            # Same bytes, so the variants still apply
+            variants = {**variants, 'source': new_name}
+        if User.objects.filter(pk=pk, profile_image=name).update(
+            profile_image=new_name, profile_image_variants=variants,
+        ):
+            updated += 1
+            # Cached PM dashboards hold the old name
+            invalidate(pm_ids=[pm_id])
+    return updated
+
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_user_created_by_leave'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailyupdate',
+            index=models.Index(fields=['date', 'id'], name='daily_upd_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+
+def seed_rollups(apps, schema_editor):
+    # Signals only apply deltas, so the buckets have to start from the updates so far
+    DailyUpdate = apps.get_model('accounts', 'DailyUpdate')
+    HoursRollup = apps.get_model('accounts', 'HoursRollup')
+    buckets = {'DAY': F('date'), 'WEEK': TruncWeek('date'), 'MONTH': TruncMonth('date')}
+    scopes = {
+        'EMPLOYEE': ('employee_id', ('WEEK', 'MONTH')),
+        'PM': ('employee__created_by_id', ('DAY', 'WEEK', 'MONTH')),
+    }
+    for scope, (owner_field, periods) in scopes.items():
+        for period in periods:
+            rows = (
+                DailyUpdate.objects.filter(**{f'{owner_field}__isnull': False})
+                .annotate(bucket=buckets[period]).order_by()
+                .values_list(owner_field, 'bucket').annotate(total=Sum('working_hours'))
+            )
+            HoursRollup.objects.bulk_create(
+                (
+                    HoursRollup(user_id=owner_id, scope=scope, period=period, bucket=bucket, total_hours=total)
+                    for owner_id, bucket, total in rows
+                ),
+                batch_size=1000,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_daily_update_date_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HoursRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('EMPLOYEE', 'Employee'), ('PM', 'PM Team')], max_length=10)),
+                ('period', models.CharField(choices=[('DAY', 'Day'), ('WEEK', 'ISO Week'), ('MONTH', 'Month')], max_length=5)),
+                ('bucket', models.DateField(help_text='First day of the bucket (Monday for ISO weeks)')),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hours_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Hours Rollup',
+                'verbose_name_plural': 'Hours Rollups',
+                'db_table': 'hours_rollups',
+                'indexes': [models.Index(fields=['scope', 'period', 'bucket'], name='hours_rollup_bucket_idx')],
+                'unique_together': {('user', 'scope', 'period', 'bucket')},
+            },
+        ),
+        migrations.RunPython(seed_rollups, migrations.RunPython.noop),
+    ]
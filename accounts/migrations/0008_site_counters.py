@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:49
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def seed_counters(apps, schema_editor):
+    # Signals only apply deltas, so the table has to start from real counts
+    User = apps.get_model('accounts', 'User')
+    Project = apps.get_model('accounts', 'Project')
+    SiteCounter = apps.get_model('accounts', 'SiteCounter')
+    counters = User.objects.aggregate(
+        users=Count('id'),
+        **{f'users:{role}': Count('id', filter=Q(role=role)) for role in ('ADMIN', 'PM', 'EMPLOYEE')},
+    )
+    counters.update(Project.objects.aggregate(projects=Count('id')))
+    SiteCounter.objects.bulk_create([SiteCounter(name=name, value=value) for name, value in counters.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Site Counter',
+                'verbose_name_plural': 'Site Counters',
+                'db_table': 'site_counters',
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
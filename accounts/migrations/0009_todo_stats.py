@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def seed_todo_stats(apps, schema_editor):
+    # Signals only apply deltas, so every employee with todos needs a starting row
+    Todo = apps.get_model('accounts', 'Todo')
+    TodoStats = apps.get_model('accounts', 'TodoStats')
+    rows = Todo.objects.order_by().values('employee_id').annotate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='PENDING')),
+        in_progress=Count('id', filter=Q(status='IN_PROGRESS')),
+        completed=Count('id', filter=Q(status='COMPLETED')),
+    )
+    TodoStats.objects.bulk_create([TodoStats(**row) for row in rows], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_site_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TodoStats',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='todo_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('pending', models.IntegerField(default=0)),
+                ('in_progress', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Todo Stats',
+                'verbose_name_plural': 'Todo Stats',
+                'db_table': 'todo_stats',
+            },
+        ),
+        migrations.RunPython(seed_todo_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:14
+
+import accounts.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_user_profile_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='profile_image',
+            field=models.ImageField(blank=True, null=True, storage=accounts.storage.ContentAddressedStorage(), upload_to='profiles/'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+
+# FTS5 tables over the searchable text columns (external content: the
+# text lives only in the base table), kept in sync by triggers so bulk
+# inserts, queryset updates and raw deletes are indexed too.
+# Frozen here; accounts.search.INDEXES mirrors it.
+INDEXES = (
+    ('daily_updates', ('update_text',)),
+    ('todos', ('title', 'description')),
+    ('projects', ('name', 'description')),
+    ('users', ('email', 'first_name', 'last_name')),
+)
+
+
+def index_sql(table, columns):
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END",
+        # Only when indexed text changes, not on every last_login or status update
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def drop_sql(table, columns):
+    fts = f'{table}_fts'
+    return [f'DROP TRIGGER {fts}_{suffix}' for suffix in ('ai', 'ad', 'au')] + [f'DROP TABLE {fts}']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_user_profile_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunSQL(index_sql(table, columns), drop_sql(table, columns))
+        for table, columns in INDEXES
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(fields=['employee', 'end_date', 'start_date'], name='leaves_emp_end_start_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:28
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_leave_balances(apps, schema_editor):
+    # Signals only apply deltas, so approved leaves so far need a starting row
+    Leave = apps.get_model('accounts', 'Leave')
+    LeaveBalance = apps.get_model('accounts', 'LeaveBalance')
+    used = Counter()
+    leaves = Leave.objects.filter(status='APPROVED').values_list('employee_id', 'leave_type', 'start_date', 'end_date')
+    for employee_id, leave_type, start_date, end_date in leaves.iterator():
+        used[employee_id, leave_type] += (end_date - start_date).days + 1
+    LeaveBalance.objects.bulk_create(
+        [LeaveBalance(employee_id=employee_id, leave_type=leave_type, used_days=days)
+         for (employee_id, leave_type), days in used.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_leave_overlap_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveEntitlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_type', models.CharField(choices=[('SICK', 'Sick Leave'), ('CASUAL', 'Casual Leave'), ('EARNED', 'Earned Leave'), ('EMERGENCY', 'Emergency Leave')], max_length=20, unique=True)),
+                ('days', models.PositiveIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Leave Entitlement',
+                'verbose_name_plural': 'Leave Entitlements',
+                'db_table': 'leave_entitlements',
+                'ordering': ['leave_type'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaveBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_type', models.CharField(choices=[('SICK', 'Sick Leave'), ('CASUAL', 'Casual Leave'), ('EARNED', 'Earned Leave'), ('EMERGENCY', 'Emergency Leave')], max_length=20)),
+                ('used_days', models.IntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balances', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Leave Balance',
+                'verbose_name_plural': 'Leave Balances',
+                'db_table': 'leave_balances',
+                'unique_together': {('employee', 'leave_type')},
+            },
+        ),
+        migrations.RunPython(seed_leave_balances, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,41 @@ from django.db import models
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 
+from .storage import ContentAddressedStorage
+
+
+class LoadedValuesMixin:
+    """
+    Remembers the field values a row was loaded (or last saved) with, so
+    signal handlers can apply deltas instead of re-reading the database.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if value is not models.DEFERRED
+        }
+        return instance
+
+    def loaded_value(self, attname, default=None):
+        """Value of `attname` as last read from / written to the database"""
+        return getattr(self, '_loaded_values', {}).get(attname, default)
+
+    def has_loaded_value(self, attname):
+        return attname in getattr(self, '_loaded_values', {})
+
+    def remember_saved_values(self):
+        """Call after a save so the next save is compared against the new state"""
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+        }
+
+
 class UserManager(BaseUserManager):
     """Custom user manager for email-based authentication"""
     
@@ -25,7 +60,7 @@ class UserManager(BaseUserManager):
         return self.create_user(email, password, **extra_fields)
 
 
-class User(AbstractUser):
+class User(LoadedValuesMixin, AbstractUser):
     """Custom User model with role-based authentication"""
     
     ROLE_CHOICES = (
@@ -37,7 +72,9 @@ class User(AbstractUser):
     username = None
     email = models.EmailField(unique=True)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='EMPLOYEE')
-    profile_image = models.ImageField(upload_to='profiles/', null=True, blank=True)
+    profile_image = models.ImageField(upload_to='profiles/', storage=ContentAddressedStorage(), null=True, blank=True)
+    # WebP avatar sizes of profile_image, written by accounts.avatars
+    profile_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_verified = models.BooleanField(default=False)
     verification_token = models.CharField(max_length=100, blank=True)
     
@@ -60,6 +97,19 @@ class User(AbstractUser):
     
     class Meta:
         db_table = 'users'
+        indexes = [
+            # PM team lookups: created_by=<pm>, role='EMPLOYEE'
+            models.Index(fields=['created_by', 'role'], name='users_created_by_role_idx'),
+            # Role-filtered user lists ordered by -date_joined
+            models.Index(fields=['role', 'date_joined'], name='users_role_joined_idx'),
+            models.Index(fields=['date_joined'], name='users_date_joined_idx'),
+            # Only unverified users carry a token; queries must exclude '' to use it
+            models.Index(
+                fields=['verification_token'],
+                name='users_verif_token_idx',
+                condition=~models.Q(verification_token=''),
+            ),
+        ]
         verbose_name = 'User'
         verbose_name_plural = 'Users'
 
@@ -86,11 +136,15 @@ class Project(models.Model):
     class Meta:
         db_table = 'projects'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_by', 'created_at'], name='projects_pm_created_idx'),
+            models.Index(fields=['created_at'], name='projects_created_idx'),
+        ]
         verbose_name = 'Project'
         verbose_name_plural = 'Projects'
 
 
-class Todo(models.Model):
+class Todo(LoadedValuesMixin, models.Model):
     """Todo model - Managed by Employee"""
     
     STATUS_CHOICES = (
@@ -119,11 +173,16 @@ class Todo(models.Model):
     class Meta:
         db_table = 'todos'
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['employee', 'status'], name='todos_employee_status_idx'),
+            # Matches the default ordering within one employee
+            models.Index(fields=['employee', 'date', 'created_at'], name='todos_employee_date_idx'),
+        ]
         verbose_name = 'Todo'
         verbose_name_plural = 'Todos'
 
 
-class DailyUpdate(models.Model):
+class DailyUpdate(LoadedValuesMixin, models.Model):
     """Daily Update model - Created by Employee with working hours"""
     
     # ✅ FIX: CASCADE delete
@@ -151,10 +210,16 @@ class DailyUpdate(models.Model):
         db_table = 'daily_updates'
         ordering = ['-date', '-created_at']
         unique_together = ['employee', 'date']  
+        indexes = [
+            # Keyset pagination / date range filters on the admin updates list
+            models.Index(fields=['date', 'id'], name='daily_upd_date_id_idx'),
+            # Recent updates feed on the admin dashboard
+            models.Index(fields=['created_at'], name='daily_upd_created_idx'),
+        ]
         verbose_name = 'Daily Update'
         verbose_name_plural = 'Daily Updates'
 
-class Leave(models.Model):
+class Leave(LoadedValuesMixin, models.Model):
     """Leave Management System"""
     
     LEAVE_TYPE_CHOICES = (
@@ -205,6 +270,12 @@ class Leave(models.Model):
     class Meta:
         db_table = 'leaves'
         ordering = ['-created_at']
+        indexes = [
+            # Leaves overlapping a date range: start_date <= <end> AND end_date >= <start>.
+            # Seeking on end_date skips all past leaves; only leaves booked beyond the
+            # range are read and discarded by the start_date check.
+            models.Index(fields=['employee', 'end_date', 'start_date'], name='leaves_emp_end_start_idx'),
+        ]
         verbose_name = 'Leave'
         verbose_name_plural = 'Leaves'
 
@@ -232,4 +303,150 @@ class WorkingHoursSummary(models.Model):
         db_table = 'working_hours_summary'
         unique_together = ['employee', 'pm']
         verbose_name = 'Working Hours Summary'
-        verbose_name_plural = 'Working Hours Summaries'
\ No newline at end of file
+        verbose_name_plural = 'Working Hours Summaries'
+
+class HoursRollup(models.Model):
+    """Hours per time bucket (day / ISO week / month) for an employee or a PM's team"""
+
+    SCOPE_CHOICES = (
+        ('EMPLOYEE', 'Employee'),
+        ('PM', 'PM Team'),
+    )
+
+    PERIOD_CHOICES = (
+        ('DAY', 'Day'),
+        ('WEEK', 'ISO Week'),
+        ('MONTH', 'Month'),
+    )
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='hours_rollups'
+    )
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    bucket = models.DateField(help_text="First day of the bucket (Monday for ISO weeks)")
+    total_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.scope} {self.user_id} {self.period} {self.bucket}: {self.total_hours}hrs"
+
+    class Meta:
+        db_table = 'hours_rollups'
+        unique_together = ['user', 'scope', 'period', 'bucket']
+        indexes = [
+            # Org-wide totals for one bucket (admin stats)
+            models.Index(fields=['scope', 'period', 'bucket'], name='hours_rollup_bucket_idx'),
+        ]
+        verbose_name = 'Hours Rollup'
+        verbose_name_plural = 'Hours Rollups'
+
+
+class EmailOutbox(models.Model):
+    """Outgoing email, written in the same transaction as the change that caused it"""
+
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    )
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.to_email} - {self.subject} ({self.status})"
+
+    class Meta:
+        db_table = 'email_outbox'
+        ordering = ['id']
+        indexes = [
+            # The drainer's "what is due" scan
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx'),
+        ]
+        verbose_name = 'Outbox Email'
+        verbose_name_plural = 'Email Outbox'
+
+
+class SiteCounter(models.Model):
+    """Named site-wide counter (users per role, projects) kept current by signals"""
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    class Meta:
+        db_table = 'site_counters'
+        verbose_name = 'Site Counter'
+        verbose_name_plural = 'Site Counters'
+
+
+class TodoStats(models.Model):
+    """Todo counts per status for one employee - maintained by signals"""
+
+    employee = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='todo_stats'
+    )
+    pending = models.IntegerField(default=0)
+    in_progress = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.employee_id}: {self.completed}/{self.total} completed"
+
+    class Meta:
+        db_table = 'todo_stats'
+        verbose_name = 'Todo Stats'
+        verbose_name_plural = 'Todo Stats'
+
+
+class LeaveEntitlement(models.Model):
+    """Leave days an employee is entitled to, per leave type"""
+
+    leave_type = models.CharField(max_length=20, choices=Leave.LEAVE_TYPE_CHOICES, unique=True)
+    days = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.get_leave_type_display()}: {self.days} days"
+
+    class Meta:
+        db_table = 'leave_entitlements'
+        ordering = ['leave_type']
+        verbose_name = 'Leave Entitlement'
+        verbose_name_plural = 'Leave Entitlements'
+
+
+class LeaveBalance(models.Model):
+    """Approved leave days taken per employee and leave type - maintained by signals"""
+
+    employee = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='leave_balances'
+    )
+    leave_type = models.CharField(max_length=20, choices=Leave.LEAVE_TYPE_CHOICES)
+    used_days = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.employee_id} {self.leave_type}: {self.used_days} days used"
+
+    class Meta:
+        db_table = 'leave_balances'
+        unique_together = ['employee', 'leave_type']
+        verbose_name = 'Leave Balance'
+        verbose_name_plural = 'Leave Balances'
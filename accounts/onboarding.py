@@ -0,0 +1,158 @@
+"""Bulk user onboarding from CSV"""
+
+import csv
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django import forms
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from .dashboard_cache import invalidate
+from .models import User
+from .outbox import queue_emails, verification_email
+from .site_stats import bump_counters, role_counter
+
+ONBOARD_COLUMNS = ('email', 'first_name', 'last_name', 'password')
+ONBOARD_BATCH_SIZE = 500
+
+
+class OnboardResult:
+    """Outcome of a bulk onboarding run: users created and per-line errors"""
+
+    def __init__(self):
+        self.created = []
+        self.errors = []
+
+    def add_error(self, line_no, message):
+        self.errors.append((line_no, message))
+
+
+def _init_hash_worker():
+    # Workers started with 'spawn' need their own settings/app registry
+    django.setup()
+
+
+def hash_passwords(passwords, workers=1):
+    """
+    make_password() for every entry, in this process or spread over a pool
+    of `workers` processes.
+
+    Password hashing is deliberately CPU-bound (PBKDF2 by default), so
+    processes rather than threads. Only the management command uses the
+    pool: web requests hash in process rather than fork workers.
+    """
+    if workers <= 1 or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=16))
+
+
+def _taken_emails(emails):
+    """The addresses in `emails` (lowercase) that already have an account, compared case-insensitively"""
+    taken = set()
+    for start in range(0, len(emails), ONBOARD_BATCH_SIZE):
+        batch = emails[start:start + ONBOARD_BATCH_SIZE]
+        taken.update(
+            User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=batch)
+            .values_list('email_lower', flat=True)
+        )
+    return taken
+
+
+def onboard_users(fileobj, created_by, role='EMPLOYEE', is_verified=False, workers=1):
+    """
+    Create users from a CSV text stream with the columns email, first_name,
+    last_name, password, all owned by `created_by`.
+
+    Rows are validated up front; the valid ones are hashed (over `workers`
+    processes), inserted with bulk_create in one transaction, and their
+    verification emails written to the outbox in that same transaction.
+    bulk_create skips the per-user post_save signal, so there is no extra
+    token UPDATE or .delay() per user. Addresses are compared with existing
+    accounts case-insensitively; one registered in the meantime rejects
+    just its row.
+    """
+    result = OnboardResult()
+    reader = csv.DictReader(fileobj)
+    missing = set(ONBOARD_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        result.add_error(1, f"Missing column(s): {', '.join(sorted(missing))}")
+        return result
+
+    rows = list(enumerate(reader, start=2))
+    # Existing accounts, one query per batch of addresses
+    taken = _taken_emails(sorted({(row.get('email') or '').strip().lower() for _, row in rows}))
+
+    users, passwords, line_nos, seen = [], [], [], set()
+    email_field = forms.EmailField()
+    for line_no, row in rows:
+        try:
+            # As create_user() stores it: only the domain is lowercased
+            email = User.objects.normalize_email(email_field.clean((row.get('email') or '').strip()))
+        except ValidationError as exc:
+            result.add_error(line_no, f"email: {' '.join(exc.messages)}")
+            continue
+        if email.lower() in taken or email.lower() in seen:
+            result.add_error(line_no, f'{email} already exists')
+            continue
+
+        user = User(
+            email=email,
+            first_name=(row.get('first_name') or '').strip()[:150],
+            last_name=(row.get('last_name') or '').strip()[:150],
+            role=role,
+            created_by=created_by,
+            is_verified=is_verified,
+            verification_token='' if is_verified else uuid.uuid4().hex,
+        )
+        password = row.get('password') or ''
+        try:
+            if not password:
+                raise ValidationError('This field is required.')
+            validate_password(password, user)
+        except ValidationError as exc:
+            result.add_error(line_no, f"password: {' '.join(exc.messages)}")
+            continue
+
+        seen.add(email.lower())
+        users.append(user)
+        passwords.append(password)
+        line_nos.append(line_no)
+
+    for user, encoded in zip(users, hash_passwords(passwords, workers)):
+        user.password = encoded
+
+    with transaction.atomic():
+        while True:
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create(users, batch_size=ONBOARD_BATCH_SIZE)
+                break
+            except IntegrityError:
+                # Registered since the check above: reject those rows and insert the rest
+                taken = _taken_emails(sorted(user.email.lower() for user in users))
+                if not taken:
+                    raise
+                kept = []
+                for line_no, user in zip(line_nos, users):
+                    if user.email.lower() in taken:
+                        result.add_error(line_no, f'{user.email} already exists')
+                    else:
+                        kept.append((line_no, user))
+                line_nos = [line_no for line_no, _ in kept]
+                users = [user for _, user in kept]
+
+        bump_counters({'users': len(users), role_counter(role): len(users)})
+        emails = [verification_email(user.email, user.verification_token) for user in users if not user.is_verified]
+        if emails:
+            queue_emails(emails)
+        invalidate(pm_ids=[created_by.pk])
+
+    result.created = users
+    return result
+
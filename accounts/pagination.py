@@ -0,0 +1,61 @@
+"""Keyset (cursor) pagination on (date, id) for date-ordered listings"""
+
+import datetime
+from collections import namedtuple
+
+from django.db.models import Q
+
+
+KeysetPage = namedtuple('KeysetPage', ['object_list', 'older_cursor', 'newer_cursor'])
+
+
+def encode_cursor(obj):
+    """Cursor for a row: '<iso date>_<pk>'"""
+    return f'{obj.date.isoformat()}_{obj.pk}'
+
+
+def decode_cursor(value):
+    """Parse a cursor back to (date, pk); returns None for anything malformed"""
+    if not value:
+        return None
+    try:
+        date_part, pk_part = value.split('_', 1)
+        return datetime.date.fromisoformat(date_part), int(pk_part)
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_page(queryset, before=None, after=None, per_page=50):
+    """
+    Return one page of `queryset` ordered newest first by (date, id).
+
+    `before` walks towards older rows, `after` walks back towards newer ones.
+    Only per_page + 1 rows are ever fetched, so the cost of a page does not
+    depend on how deep into the history it is (unlike OFFSET).
+    """
+    after = decode_cursor(after)
+    before = decode_cursor(before)
+
+    if after:
+        date, pk = after
+        rows = list(
+            queryset.filter(Q(date__gt=date) | Q(date=date, id__gt=pk))
+            .order_by('date', 'id')[:per_page + 1]
+        )
+        has_newer = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_older = True
+    else:
+        if before:
+            date, pk = before
+            queryset = queryset.filter(Q(date__lt=date) | Q(date=date, id__lt=pk))
+        rows = list(queryset.order_by('-date', '-id')[:per_page + 1])
+        has_older = len(rows) > per_page
+        rows = rows[:per_page]
+        has_newer = before is not None
+
+    return KeysetPage(
+        object_list=rows,
+        older_cursor=encode_cursor(rows[-1]) if rows and has_older else None,
+        newer_cursor=encode_cursor(rows[0]) if rows and has_newer else None,
+    )
@@ -0,0 +1,121 @@
+"""
+Set-based deletion of a user and everything under them.
+
+Deleting a user cascades through created_by to everyone they created
+(a PM's employees, an admin's PMs and their employees), and from each of
+those to their projects, todos, daily updates, leaves and derived rows.
+Model.delete() does that row by row, firing post_delete receivers that
+recompute hours summaries for data that is about to vanish. purge_user()
+issues one statement per dependent table for the whole subtree instead,
+without signals, and then does the receivers' bookkeeping once.
+"""
+
+import logging
+
+from django.db import models, router, transaction
+from django.db.models import Q
+
+from .dashboard_cache import invalidate
+from .hours import rebuild_team_rollups
+from .models import DailyUpdate, Leave, Project, Todo, User
+from .site_stats import bump_counters, role_counter
+
+
+logger = logging.getLogger(__name__)
+
+# Safety net against a created_by cycle; real trees are admin -> PM -> employee
+MAX_DEPTH = 10
+
+
+def subtree_condition(user):
+    """Q matching `user` and everyone they created, transitively"""
+    condition = Q(pk=user.pk)
+    lookup = 'created_by'
+    for _ in range(MAX_DEPTH):
+        if not User.objects.filter(**{lookup: user.pk}).exists():
+            break
+        condition |= Q(**{lookup: user.pk})
+        lookup = f'created_by__{lookup}'
+    return condition
+
+
+def _steps(subtree):
+    """
+    (label, queryset, field to null or None to delete) for every table with
+    a foreign key to User, read from the model metadata so new relations are covered.
+    The created_by tree itself is the `subtree` query; users go last.
+    """
+    steps = []
+    for relation in User._meta.related_objects:
+        model = relation.related_model
+        if model is User:
+            continue
+        queryset = model._base_manager.filter(**{f'{relation.field.name}__in': subtree})
+        label = f'{model._meta.db_table}.{relation.field.column}'
+        if relation.on_delete is models.CASCADE:
+            steps.append((label, queryset, None))
+        elif relation.on_delete is models.SET_NULL:
+            steps.append((label, queryset, relation.field.name))
+        else:
+            raise NotImplementedError(f'purge_user does not handle on_delete={relation.on_delete.__name__} ({label})')
+    for field in User._meta.many_to_many:
+        through = field.remote_field.through
+        steps.append((
+            through._meta.db_table,
+            through._base_manager.filter(**{f'{field.m2m_field_name()}__in': subtree}),
+            None,
+        ))
+    # SET NULL first: those rows may also be in a table deleted below
+    steps.sort(key=lambda step: step[2] is None)
+    steps.append((User._meta.db_table, User._base_manager.filter(pk__in=subtree), None))
+    return steps
+
+
+def purge_size(user):
+    """Rows of bulk data (updates, todos, leaves) a purge of `user` would delete"""
+    subtree = User.objects.filter(subtree_condition(user)).values('pk')
+    return sum(
+        model.objects.filter(employee__in=subtree).count()
+        for model in (DailyUpdate, Todo, Leave)
+    )
+
+
+def purge_user(user, progress=None):
+    """
+    Delete `user` and their subtree in one transaction; returns
+    {table or table.column: rows affected}. `progress(done, total, label)`
+    is called after every statement.
+    """
+    condition = subtree_condition(user)
+    subtree = User.objects.filter(condition).values('pk')
+
+    with transaction.atomic():
+        users = list(User.objects.filter(condition).values_list('pk', 'role', 'created_by_id'))
+        user_ids = {pk for pk, _, _ in users}
+        # Managers outside the subtree whose team rollups include someone in it
+        outside_pm_ids = {pm_id for _, _, pm_id in users if pm_id is not None} - user_ids
+        project_count = Project.objects.filter(created_by__in=subtree).count()
+
+        steps = _steps(subtree)
+        affected = {}
+        for done, (label, queryset, null_field) in enumerate(steps, start=1):
+            if null_field is not None:
+                affected[label] = queryset.update(**{null_field: None})
+            else:
+                # _raw_delete: a single DELETE ... WHERE, no collector and no signals
+                affected[label] = queryset._raw_delete(router.db_for_write(queryset.model))
+            if progress is not None:
+                progress(done, len(steps), label)
+
+        # What the per-row post_delete receivers would have done
+        deltas = {'users': -len(users), 'projects': -project_count}
+        for _, role, _ in users:
+            counter = role_counter(role)
+            deltas[counter] = deltas.get(counter, 0) - 1
+        bump_counters(deltas)
+        if outside_pm_ids:
+            rebuild_team_rollups(outside_pm_ids)
+        invalidate(employee_ids=user_ids, pm_ids=user_ids | outside_pm_ids)
+
+    logger.info('Purged user %s: %s', user.pk, affected)
+    return affected
@@ -0,0 +1,174 @@
+"""Per-request SQL budgets and repeated-query (N+1) detection"""
+
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+# Most queries a GET of each URL name may run, counted on a cold dashboard
+# cache and including the session and auth lookups. These must not grow
+# with the amount of data: check_query_budgets requests every route at two
+# data scales and fails if a count changes.
+QUERY_BUDGETS = {
+    'login': 0,
+    'verify_email': 1,
+    'logout': 4,
+    'dashboard': 7,
+    'admin_users_list': 3,
+    'admin_user_detail': 5,
+    'admin_user_update': 3,
+    'admin_user_delete': 3,
+    'admin_purge_status': 2,
+    'pm_create': 2,
+    'admin_create_employee': 2,
+    'admin_projects_list': 3,
+    'admin_updates_list': 5,
+    'admin_import_updates': 2,
+    'admin_stats': 6,
+    'timesheet_export': 3,
+    'project_create': 2,
+    'project_update': 3,
+    'project_delete': 3,
+    'project_team_view': 7,
+    'employee_create': 2,
+    'employee_bulk_onboard': 2,
+    'employee_update': 3,
+    'employee_delete': 3,
+    'pm_team_view': 3,
+    'team_calendar': 4,
+    'leave_requests': 5,
+    'todo_create': 2,
+    'todo_update': 3,
+    'todo_delete': 3,
+    'daily_update_create': 2,
+    'daily_update_update': 3,
+    'daily_update_delete': 3,
+    'profile_update': 2,
+    # Session, user, one ranked query per index, one in_bulk per index with hits
+    'search': 10,
+    # Django admin changelists (admin:<name>)
+    'accounts_user_changelist': 5,
+    'accounts_project_changelist': 7,
+    'accounts_todo_changelist': 7,
+    'accounts_dailyupdate_changelist': 7,
+    'accounts_leave_changelist': 7,
+    'accounts_leaveentitlement_changelist': 5,
+    'accounts_workinghourssummary_changelist': 6,
+    'accounts_emailoutbox_changelist': 5,
+}
+
+# The same query shape this many times in one request is reported as N+1
+REPEAT_THRESHOLD = 3
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LISTS = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more queries than its budget, or repeated a query shape"""
+
+
+def query_shape(sql):
+    """SQL with literals and IN-list lengths removed, so per-row queries compare equal"""
+    sql = _STRINGS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    return _PLACEHOLDER_LISTS.sub('(...)', sql)
+
+
+class QueryRecorder:
+    """
+    Records the SQL sent on every database connection while active.
+
+    Uses execute wrappers rather than connection.queries, so it works
+    with DEBUG off and doesn't depend on the debug cursor.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, threshold=REPEAT_THRESHOLD):
+        """[(shape, count)] for shapes run at least `threshold` times, most repeated first"""
+        counts = Counter(query_shape(sql) for sql in self.queries)
+        return [(shape, count) for shape, count in counts.most_common() if count >= threshold]
+
+
+def budget_problems(recorder, budget, threshold=REPEAT_THRESHOLD):
+    """Human-readable list of what is wrong with a recorded request (empty if nothing)"""
+    problems = []
+    if budget is not None and len(recorder) > budget:
+        problems.append(f'{len(recorder)} queries, budget is {budget}')
+    for shape, count in recorder.repeated(threshold):
+        problems.append(f'{count}x {shape[:200]}')
+    return problems
+
+
+@contextmanager
+def assert_query_budget(budget, threshold=REPEAT_THRESHOLD):
+    """
+    Fail (QueryBudgetExceeded) if the block runs more than `budget` queries
+    or repeats a query shape `threshold` times:
+
+        with assert_query_budget(QUERY_BUDGETS['admin_users_list']):
+            client.get(reverse('admin_users_list'))
+    """
+    with QueryRecorder() as recorder:
+        yield recorder
+    problems = budget_problems(recorder, budget, threshold)
+    if problems:
+        raise QueryBudgetExceeded('; '.join(problems))
+
+
+class QueryBudgetMiddleware:
+    """
+    Development only: counts each request's queries, adds an X-Query-Count
+    header and logs a warning when the view is over its QUERY_BUDGETS entry
+    or repeats a query shape. With QUERY_BUDGET_RAISE on, it raises
+    QueryBudgetExceeded instead (useful when running a test suite).
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        # Streaming responses query while being consumed; only the view is counted
+        match = request.resolver_match
+        url_name = match.url_name if match else None
+        # Budgets are for page loads; form posts only get the N+1 check
+        budget = QUERY_BUDGETS.get(url_name) if request.method in ('GET', 'HEAD') else None
+        problems = budget_problems(recorder, budget)
+        response['X-Query-Count'] = str(len(recorder))
+        if problems:
+            message = f"{request.method} {request.path} ({url_name or 'unnamed'}): " + '; '.join(problems)
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning('Query budget: %s', message)
+        return response
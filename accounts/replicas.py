@@ -0,0 +1,197 @@
+"""
+Read replicas for reporting views.
+
+Each replica (settings.DATABASE_REPLICAS) is a whole-file snapshot of the
+primary taken with SQLite's online backup API and swapped in atomically
+(refresh_replica). The snapshot time is the replica file's mtime, so
+checking staleness costs a stat(), not a query.
+
+Nothing reads from a replica unless a view opts in with @reporting_view,
+and even then only when a replica is fresh (younger than
+REPLICA_MAX_LAG seconds) and was taken after the user's last write, so
+dashboards and anything right after a submission always see the primary.
+"""
+
+import functools
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+logger = logging.getLogger(__name__)
+
+# Set by ReadYourWritesMiddleware after a request that may have written
+LAST_WRITE_COOKIE = 'last_write'
+
+_state = threading.local()
+
+
+class ReplicaRouter:
+    """Reads go to the replica chosen for the current reporting view (if any); writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        return getattr(_state, 'alias', None) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema with the data, from the backup
+        return db not in settings.DATABASE_REPLICAS
+
+
+@contextmanager
+def reading_from(alias):
+    """Route reads in this block (this thread only) to `alias`; None means the primary"""
+    previous = getattr(_state, 'alias', None)
+    _state.alias = alias
+    try:
+        yield
+    finally:
+        _state.alias = previous
+
+
+def _path(alias):
+    return str(connections[alias].settings_dict['NAME'])
+
+
+def snapshot_time(alias):
+    """When the replica's snapshot was taken (epoch seconds), or None if there is none"""
+    try:
+        stat = os.stat(_path(alias))
+    except OSError:
+        return None
+    # Opening a missing replica creates an empty file; that is not a snapshot
+    return stat.st_mtime if stat.st_size else None
+
+
+def replica_for(last_write=0.0):
+    """
+    A random fresh replica whose snapshot is newer than `last_write`,
+    or None to read from the primary.
+    """
+    oldest = time.time() - settings.REPLICA_MAX_LAG
+    fresh = [
+        alias for alias in settings.DATABASE_REPLICAS
+        if (taken_at := snapshot_time(alias)) is not None and taken_at >= max(oldest, last_write)
+    ]
+    return random.choice(fresh) if fresh else None
+
+
+def _last_write(request):
+    try:
+        return float(request.COOKIES.get(LAST_WRITE_COOKIE, 0))
+    except ValueError:
+        return 0.0
+
+
+def _stream_from(alias, content):
+    # Streaming responses run their queries after the view has returned
+    iterator = iter(content)
+    while True:
+        with reading_from(alias):
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+
+
+def reporting_view(view_func):
+    """Decorator for read-only report views: serve their reads from a fresh replica if there is one"""
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+        alias = replica_for(_last_write(request))
+        if alias is None:
+            return view_func(request, *args, **kwargs)
+        with reading_from(alias):
+            response = view_func(request, *args, **kwargs)
+        if response.streaming:
+            response.streaming_content = _stream_from(alias, response.streaming_content)
+        return response
+    return wrapper
+
+
+class ReadYourWritesMiddleware:
+    """
+    Remember (in a cookie) when this browser last sent a request that may
+    have written, so reporting views skip replicas older than that. The
+    cookie lives REPLICA_MAX_LAG seconds: after that every fresh replica
+    is newer anyway.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE') and response.status_code < 400:
+            response.set_cookie(
+                LAST_WRITE_COOKIE, f'{time.time():.3f}', max_age=settings.REPLICA_MAX_LAG,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+def refresh_replica(alias):
+    """
+    Snapshot the primary into `alias`: back up into a temporary file next
+    to the replica, then rename it over the replica. Readers keep the old
+    file open until their connection's health check notices the new one.
+    Returns the snapshot time.
+    """
+    primary = connections[DEFAULT_DB_ALIAS].settings_dict
+    target = _path(alias)
+    temporary = f'{target}.{os.getpid()}.tmp'
+    taken_at = time.time()
+    source = sqlite3.connect(primary['NAME'], timeout=primary['OPTIONS'].get('timeout', 5))
+    try:
+        copy = sqlite3.connect(temporary)
+        try:
+            # One step: the copy is a single consistent snapshot. On a WAL
+            # primary this is just a long read and doesn't block writers.
+            source.backup(copy)
+            # Replicas are never written; a rollback journal leaves no -wal
+            # file behind to be mistaken for the next snapshot's
+            copy.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            copy.close()
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    finally:
+        source.close()
+    os.utime(temporary, (taken_at, taken_at))
+    os.replace(temporary, target)
+    return taken_at
+
+
+def refresh_replicas():
+    """Refresh every replica; {alias: seconds the backup took}"""
+    durations = {}
+    for alias in settings.DATABASE_REPLICAS:
+        started = time.time()
+        refresh_replica(alias)
+        durations[alias] = round(time.time() - started, 3)
+        logger.info('Refreshed replica %s in %.3fs', alias, durations[alias])
+    return durations
+
+
+def mirror_primary():
+    """Point every replica at the primary's settings, e.g. after creating a test database"""
+    for alias in settings.DATABASE_REPLICAS:
+        connections[alias].creation.set_as_test_mirror(connections[DEFAULT_DB_ALIAS].settings_dict)
@@ -0,0 +1,178 @@
+"""Deterministic synthetic data at a configurable scale (benchmarks, load tests)"""
+
+import datetime
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .hours import recompute_hours
+from .leave_balances import recount_leave_balances
+from .models import DailyUpdate, Leave, Project, Todo, User
+from .site_stats import rebuild_counters
+from .todo_stats import recount_todo_stats
+
+
+SCALE_EMAIL_DOMAIN = 'scale.test'
+SCALE_PASSWORD = 'scale-pass-123'
+BATCH_SIZE = 500
+
+# Rows per unit of scale; scale=10 means ten times as many PMs (and so
+# employees, todos, updates and leaves).
+PER_SCALE = {
+    'admins': 1,
+    'pms': 10,
+}
+PER_PM = {
+    'employees': 10,
+    'projects': 3,
+}
+PER_EMPLOYEE = {
+    'todos': 20,
+    'update_days': 30,
+    'leaves': 2,
+}
+
+
+def scale_email(kind, *numbers):
+    return f"{kind}{'-'.join(str(number) for number in numbers)}@{SCALE_EMAIL_DOMAIN}"
+
+
+def clear_scale_data():
+    """Delete everything seed_scale created (its users cascade to the rest)"""
+    return User.objects.filter(email__endswith=f'@{SCALE_EMAIL_DOMAIN}').delete()
+
+
+def seed_scale(scale=1, seed=0, end_date=None, password=SCALE_PASSWORD):
+    """
+    Create admins -> PMs -> employees (created_by chain) with projects,
+    todos, daily updates and leaves. The same (scale, seed, end_date)
+    always produces the same rows. Returns {model: rows created}.
+
+    Everything is inserted with bulk_create, so no signals run; the
+    derived tables (hours summaries/rollups, site and todo counters) are
+    rebuilt at the end instead.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or timezone.localdate()
+    # One hash for every user: hashing is the slowest part of creating users
+    encoded_password = make_password(password)
+    joined = timezone.make_aware(datetime.datetime.combine(end_date - datetime.timedelta(days=365), datetime.time(9)))
+    counts = {}
+
+    def user(email, role, created_by=None, index=0):
+        return User(
+            email=email,
+            password=encoded_password,
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            role=role,
+            created_by=created_by,
+            is_staff=role == 'ADMIN',
+            is_superuser=role == 'ADMIN',
+            is_verified=True,
+            date_joined=joined + datetime.timedelta(minutes=index),
+        )
+
+    with transaction.atomic():
+        admins = User.objects.bulk_create(
+            [user(scale_email('admin', i), 'ADMIN', index=i) for i in range(PER_SCALE['admins'] * scale)],
+            batch_size=BATCH_SIZE,
+        )
+        pms = User.objects.bulk_create(
+            [
+                user(scale_email('pm', i), 'PM', admins[i % len(admins)], index=i)
+                for i in range(PER_SCALE['pms'] * scale)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        employees = User.objects.bulk_create(
+            [
+                user(scale_email('employee', p, e), 'EMPLOYEE', pm, index=p * PER_PM['employees'] + e)
+                for p, pm in enumerate(pms)
+                for e in range(PER_PM['employees'])
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        counts['users'] = len(admins) + len(pms) + len(employees)
+
+        counts['projects'] = len(Project.objects.bulk_create(
+            [
+                Project(name=f'{rng.choice(PROJECT_WORDS)} {p}-{i}', description=rng.choice(SENTENCES), created_by=pm)
+                for p, pm in enumerate(pms)
+                for i in range(PER_PM['projects'])
+            ],
+            batch_size=BATCH_SIZE,
+        ))
+
+        todos, updates, leaves = [], [], []
+        for employee in employees:
+            for i in range(PER_EMPLOYEE['todos']):
+                todos.append(Todo(
+                    employee=employee,
+                    title=f'{rng.choice(PROJECT_WORDS)} task {i}',
+                    description=rng.choice(SENTENCES),
+                    status=rng.choice(('PENDING', 'IN_PROGRESS', 'COMPLETED', 'COMPLETED')),
+                    date=end_date - datetime.timedelta(days=rng.randrange(PER_EMPLOYEE['update_days'])),
+                ))
+            for day in range(PER_EMPLOYEE['update_days']):
+                date = end_date - datetime.timedelta(days=day)
+                if date.weekday() >= 5:
+                    continue
+                updates.append(DailyUpdate(
+                    employee=employee,
+                    date=date,
+                    update_text=rng.choice(SENTENCES),
+                    working_hours=Decimal(rng.choice(('4', '6', '7.5', '8', '8', '8', '9'))),
+                ))
+            for i in range(PER_EMPLOYEE['leaves']):
+                start = end_date + datetime.timedelta(days=rng.randrange(-60, 60))
+                status = rng.choice(('PENDING', 'APPROVED', 'REJECTED'))
+                leaves.append(Leave(
+                    employee=employee,
+                    leave_type=rng.choice(('SICK', 'CASUAL', 'EARNED', 'EMERGENCY')),
+                    start_date=start,
+                    end_date=start + datetime.timedelta(days=rng.randrange(3)),
+                    reason=rng.choice(SENTENCES),
+                    status=status,
+                    approved_by_id=employee.created_by_id if status != 'PENDING' else None,
+                ))
+
+        counts['todos'] = len(Todo.objects.bulk_create(todos, batch_size=BATCH_SIZE))
+        counts['daily_updates'] = len(DailyUpdate.objects.bulk_create(updates, batch_size=BATCH_SIZE))
+        counts['leaves'] = len(Leave.objects.bulk_create(leaves, batch_size=BATCH_SIZE))
+
+        employee_ids = [employee.pk for employee in employees]
+        for start in range(0, len(employee_ids), BATCH_SIZE):
+            recompute_hours(employee_ids[start:start + BATCH_SIZE])
+        recount_todo_stats(employee_ids)
+        recount_leave_balances(employee_ids)
+        rebuild_counters()
+
+    return counts
+
+
+FIRST_NAMES = (
+    'Aarav', 'Priya', 'Rohan', 'Ananya', 'Vikram', 'Sneha', 'Arjun', 'Kavya', 'Rahul', 'Isha',
+    'Maya', 'Liam', 'Noah', 'Emma', 'Olivia', 'Lucas', 'Sofia', 'Mateo', 'Chen', 'Yuki',
+)
+LAST_NAMES = (
+    'Patel', 'Sharma', 'Mehta', 'Iyer', 'Reddy', 'Gupta', 'Shah', 'Nair', 'Rao', 'Joshi',
+    'Smith', 'Garcia', 'Kim', 'Nguyen', 'Silva', 'Khan', 'Müller', 'Rossi', 'Tanaka', 'Cohen',
+)
+PROJECT_WORDS = (
+    'Billing', 'Onboarding', 'Payroll', 'Reporting', 'Search', 'Mobile', 'Dashboard', 'Inventory',
+    'Checkout', 'Analytics', 'Migration', 'Support',
+)
+SENTENCES = (
+    'Fixed validation on the signup form and added error messages.',
+    'Reviewed pull requests and paired on the reporting export.',
+    'Investigated slow queries on the dashboard and added an index.',
+    'Wrote migration for the new status field and backfilled data.',
+    'Met with the client to go through the sprint demo.',
+    'Refactored the notification service and cleaned up old tasks.',
+    'Updated documentation for the deployment checklist.',
+    'Triaged bug reports from QA and fixed two regressions.',
+)
@@ -0,0 +1,220 @@
+"""
+Full-text search over daily updates, todos, projects and users.
+
+Each searchable table has an FTS5 index, <table>_fts, created by
+migration 0012 and kept in sync by triggers on the base table (so bulk
+imports, queryset updates and purge's raw deletes are covered without
+signals). Django rebuilds a SQLite table to alter its columns, which
+drops that table's triggers: run `rebuild_search_index` after such a
+migration (`--check` reports missing triggers).
+
+User input never reaches FTS5 query syntax directly: fts_query() turns
+it into quoted phrases, the last one a prefix, so `alice@exa` finds
+alice@example.com and a stray quote or `NEAR(` is just text.
+"""
+
+import re
+from collections import namedtuple
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import DailyUpdate, Project, Todo, User
+
+
+# `weights`: bm25() weight per column, in column order
+SearchIndex = namedtuple('SearchIndex', ['kind', 'model', 'columns', 'weights'])
+
+INDEXES = (
+    SearchIndex('updates', DailyUpdate, ('update_text',), (1.0,)),
+    SearchIndex('todos', Todo, ('title', 'description'), (4.0, 1.0)),
+    SearchIndex('projects', Project, ('name', 'description'), (4.0, 1.0)),
+    SearchIndex('users', User, ('email', 'first_name', 'last_name'), (2.0, 1.0, 1.0)),
+)
+
+RESULTS_PER_KIND = 20
+SNIPPET_TOKENS = 16
+# Around matched terms in snippet(); can't occur in stored text
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+SearchHit = namedtuple('SearchHit', ['obj', 'snippet', 'rank'])
+
+
+def fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def fts_query(text):
+    """
+    FTS5 MATCH expression for free text: every word must occur; a word
+    that tokenizes to several tokens (an email) is a phrase; the last
+    word matches as a prefix. Empty string if there is nothing to match.
+    """
+    phrases = []
+    for word in text.split():
+        tokens = re.findall(r'\w+', word)
+        if tokens:
+            phrases.append('"%s"' % ' '.join(tokens))
+    if not phrases:
+        return ''
+    phrases[-1] += '*'
+    return ' '.join(phrases)
+
+
+def matching_ids(model, query):
+    """Subquery of the primary keys of `model` rows matching an fts_query()"""
+    table = fts_table(model)
+    return RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [query])
+
+
+def _scope(kind, user):
+    """(SQL condition on the base table `t`, params) limiting `kind` to what `user` may see"""
+    if user.role == 'ADMIN':
+        return '1', []
+    if user.role == 'PM':
+        team = 'SELECT id FROM users WHERE created_by_id = %s'
+        return {
+            'updates': (f't.employee_id IN ({team})', [user.pk]),
+            'todos': (f't.employee_id IN ({team})', [user.pk]),
+            'projects': ('t.created_by_id = %s', [user.pk]),
+            'users': ('(t.created_by_id = %s OR t.id = %s)', [user.pk, user.pk]),
+        }[kind]
+    if user.role == 'EMPLOYEE':
+        return {
+            'updates': ('t.employee_id = %s', [user.pk]),
+            'todos': ('t.employee_id = %s', [user.pk]),
+            # Their PM's projects
+            'projects': ('t.created_by_id = %s', [user.created_by_id]),
+            'users': ('t.id = %s', [user.pk]),
+        }[kind]
+    return '0', []
+
+
+def _highlight(snippet):
+    return mark_safe(escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def search_index(index, user, query, limit=RESULTS_PER_KIND):
+    """Best `limit` hits of one index that `user` may see, best first"""
+    model = index.model
+    table = fts_table(model)
+    condition, params = _scope(index.kind, user)
+    weights = ', '.join(str(weight) for weight in index.weights)
+    sql = (
+        f"SELECT {table}.rowid, snippet({table}, -1, '{_MARK_START}', '{_MARK_END}', '…', {SNIPPET_TOKENS}), "
+        f"bm25({table}, {weights}) AS rank "
+        f"FROM {table} JOIN {model._meta.db_table} t ON t.id = {table}.rowid "
+        f"WHERE {table} MATCH %s AND {condition} ORDER BY rank LIMIT %s"
+    )
+    with connections[router.db_for_read(model)].cursor() as cursor:
+        cursor.execute(sql, [query, *params, limit])
+        rows = cursor.fetchall()
+    if not rows:
+        return []
+    queryset = model.objects.all()
+    if model is not User:
+        related = 'employee' if model in (DailyUpdate, Todo) else 'created_by'
+        queryset = queryset.select_related(related)
+    objects = queryset.in_bulk([pk for pk, _, _ in rows])
+    return [
+        SearchHit(objects[pk], _highlight(snippet), rank)
+        for pk, snippet, rank in rows if pk in objects
+    ]
+
+
+def search(user, text, limit=RESULTS_PER_KIND):
+    """{kind: [SearchHit, ...]} for every index, scoped to what `user` may see"""
+    query = fts_query(text)
+    if not query:
+        return {}
+    return {index.kind: search_index(index, user, query, limit) for index in INDEXES}
+
+
+def trigger_sql(index):
+    """CREATE TRIGGER statements syncing an index with its table (as in migration 0012)"""
+    base = index.model._meta.db_table
+    table = fts_table(index.model)
+    names = ', '.join(index.columns)
+    new = ', '.join(f'new.{column}' for column in index.columns)
+    old = ', '.join(f'old.{column}' for column in index.columns)
+    return {
+        f'{table}_ai': (
+            f"CREATE TRIGGER {table}_ai AFTER INSERT ON {base} BEGIN "
+            f"INSERT INTO {table}(rowid, {names}) VALUES (new.id, {new}); END"
+        ),
+        f'{table}_ad': (
+            f"CREATE TRIGGER {table}_ad AFTER DELETE ON {base} BEGIN "
+            f"INSERT INTO {table}({table}, rowid, {names}) VALUES ('delete', old.id, {old}); END"
+        ),
+        f'{table}_au': (
+            f"CREATE TRIGGER {table}_au AFTER UPDATE OF {names} ON {base} BEGIN "
+            f"INSERT INTO {table}({table}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {table}(rowid, {names}) VALUES (new.id, {new}); END"
+        ),
+    }
+
+
+def missing_triggers(index, using='default'):
+    """Names of the index's sync triggers that don't exist (e.g. dropped by a table rebuild)"""
+    expected = trigger_sql(index)
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN (%s)" % ', '.join(['%s'] * len(expected)),
+            list(expected),
+        )
+        present = {name for name, in cursor.fetchall()}
+    return sorted(set(expected) - present)
+
+
+def rebuild_index(index, using='default'):
+    """Recreate missing triggers and rebuild the index from its table; returns the triggers recreated"""
+    table = fts_table(index.model)
+    missing = missing_triggers(index, using)
+    with connections[using].cursor() as cursor:
+        for name in missing:
+            cursor.execute(trigger_sql(index)[name])
+        cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+    return missing
+
+
+def check_index(index, using='default'):
+    """Error message if the index doesn't match its table's rows, else None"""
+    table = fts_table(index.model)
+    try:
+        with connections[using].cursor() as cursor:
+            # rank = 1: also compare against the content table
+            cursor.execute(f"INSERT INTO {table}({table}, rank) VALUES ('integrity-check', 1)")
+    except connections[using].Database.DatabaseError as exc:
+        return str(exc)
+    return None
+
+
+def optimize_index(index, using='default'):
+    """Merge the index's b-trees into one (faster queries after heavy writes)"""
+    table = fts_table(index.model)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+
+
+class FullTextSearchMixin:
+    """
+    ModelAdmin mixin: the changelist search box queries the FTS5 index
+    instead of icontains over search_fields (which still has to be set
+    for the box to show). `fts_related` names foreign keys to other
+    indexed models whose matches count too, e.g. ('employee',) finds an
+    employee's updates by their email.
+    """
+    fts_related = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        query = fts_query(search_term)
+        if not query:
+            return queryset, False
+        condition = Q(pk__in=matching_ids(self.model, query))
+        for name in self.fts_related:
+            related_model = self.model._meta.get_field(name).related_model
+            condition |= Q(**{f'{name}__in': matching_ids(related_model, query)})
+        return queryset.filter(condition), False
@@ -1,64 +1,217 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.db.models import Sum
-from django.utils import timezone
+import logging
 import uuid
-from .models import DailyUpdate, WorkingHoursSummary, User
-from .tasks import send_verification_email
+from .models import DailyUpdate, Leave, LeaveEntitlement, Project, Todo, User
+from .dashboard_cache import invalidate
+from .hours import apply_hours_delta, move_employee_hours, pm_id_for, recompute_hours
+from .leave_balances import leave_changed, recount_leave_balances
+from .outbox import queue_emails, verification_email
+from .site_stats import bump_counters, role_counter
+from .todo_stats import recount_todo_stats, todo_added, todo_moved, todo_removed
+
+
+logger = logging.getLogger(__name__)
+
+
+def _pm_id(instance, employee_id):
+    """PM of `employee_id`, without a query when the update's employee is already cached"""
+    if employee_id == instance.employee_id and DailyUpdate.employee.is_cached(instance):
+        return instance.employee.created_by_id
+    return pm_id_for(employee_id)
+
+
+# Dashboard cache. These receivers are connected before the hours ones
+# below, so loaded_value() still returns the pre-save values here.
+
+@receiver(post_save, sender=Todo)
+@receiver(post_delete, sender=Todo)
+def invalidate_dashboard_for_todo(sender, instance, **kwargs):
+    invalidate(employee_ids=[instance.employee_id])
 
 
 @receiver(post_save, sender=DailyUpdate)
 @receiver(post_delete, sender=DailyUpdate)
-def update_working_hours_summary(sender, instance, **kwargs):
-    """Update PM's working hours summary"""
-    try:
-        employee = instance.employee
-        
-        if not employee.created_by:
-            print(f"No PM assigned for {employee.email}")
-            return
-        
-        pm = employee.created_by
-        total_hours_data = DailyUpdate.objects.filter(
-            employee=employee
-        ).aggregate(total=Sum('working_hours'))
-        
-        total_hours = total_hours_data['total'] or 0
-        summary, created = WorkingHoursSummary.objects.get_or_create(
-            pm=pm,
-            employee=employee
+def invalidate_dashboards_for_update(sender, instance, **kwargs):
+    """The employee's dashboard and their PM's (hours summary and team hours)"""
+    employee_ids = {instance.employee_id, instance.loaded_value('employee_id', instance.employee_id)}
+    invalidate(employee_ids=employee_ids, pm_ids={_pm_id(instance, pk) for pk in employee_ids})
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_dashboard_for_team_member(sender, instance, update_fields=None, **kwargs):
+    """A PM's dashboard lists their employees"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    if 'EMPLOYEE' in (instance.role, instance.loaded_value('role', instance.role)):
+        invalidate(pm_ids={instance.created_by_id, instance.loaded_value('created_by_id', instance.created_by_id)})
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_dashboard_for_project(sender, instance, **kwargs):
+    invalidate(pm_ids=[instance.created_by_id])
+
+
+# Site counters (admin dashboard)
+
+@receiver(post_save, sender=User)
+def count_user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        bump_counters({'users': 1, role_counter(instance.role): 1})
+    elif update_fields is None or 'role' in update_fields:
+        old_role = instance.loaded_value('role', instance.role)
+        if old_role != instance.role:
+            bump_counters({role_counter(old_role): -1, role_counter(instance.role): 1})
+
+
+@receiver(post_delete, sender=User)
+def count_user_deleted(sender, instance, **kwargs):
+    bump_counters({'users': -1, role_counter(instance.loaded_value('role', instance.role)): -1})
+
+
+@receiver(post_save, sender=Project)
+def count_project_created(sender, instance, created, **kwargs):
+    if created:
+        bump_counters({'projects': 1})
+
+
+@receiver(post_delete, sender=Project)
+def count_project_deleted(sender, instance, **kwargs):
+    bump_counters({'projects': -1})
+
+
+# Todo counters
+
+@receiver(post_save, sender=Todo)
+def count_todo_saved(sender, instance, created, **kwargs):
+    """Apply a create, status change or reassignment to the todo_stats counters"""
+    if created:
+        todo_added(instance.employee_id, instance.status)
+    elif not (instance.has_loaded_value('employee_id') and instance.has_loaded_value('status')):
+        recount_todo_stats([instance.employee_id])
+    else:
+        old_employee_id = instance.loaded_value('employee_id')
+        old_status = instance.loaded_value('status')
+        if old_employee_id != instance.employee_id:
+            todo_removed(old_employee_id, old_status)
+            todo_added(instance.employee_id, instance.status)
+        elif old_status != instance.status:
+            todo_moved(instance.employee_id, old_status, instance.status)
+    instance.remember_saved_values()
+
+
+@receiver(post_delete, sender=Todo)
+def count_todo_deleted(sender, instance, **kwargs):
+    todo_removed(
+        instance.loaded_value('employee_id', instance.employee_id),
+        instance.loaded_value('status', instance.status),
+    )
+
+
+# Leave balance ledger
+
+_LEAVE_FIELDS = ('employee_id', 'leave_type', 'status', 'start_date', 'end_date')
+
+
+def _leave_state(employee_id, leave_type, status, start_date, end_date):
+    """What leave_changed() needs: (employee_id, leave_type, status, days)"""
+    return employee_id, leave_type, status, (end_date - start_date).days + 1
+
+
+@receiver(post_save, sender=Leave)
+def count_leave_saved(sender, instance, created, **kwargs):
+    """Apply an approval, un-approval or edit of an approved leave to the ledger"""
+    new = _leave_state(*(getattr(instance, name) for name in _LEAVE_FIELDS))
+    employee_ids = {instance.employee_id}
+    if created:
+        leave_changed(None, new)
+    elif not all(instance.has_loaded_value(name) for name in _LEAVE_FIELDS):
+        # Saved from an instance we never saw loaded; the old employee is unknown too
+        recount_leave_balances([instance.employee_id])
+    else:
+        old = _leave_state(*(instance.loaded_value(name) for name in _LEAVE_FIELDS))
+        leave_changed(old, new)
+        employee_ids.add(old[0])
+    invalidate(employee_ids=employee_ids)
+    instance.remember_saved_values()
+
+
+@receiver(post_delete, sender=Leave)
+def count_leave_deleted(sender, instance, **kwargs):
+    old = _leave_state(*(instance.loaded_value(name, getattr(instance, name)) for name in _LEAVE_FIELDS))
+    leave_changed(old, None)
+    invalidate(employee_ids=[old[0]])
+
+
+@receiver(post_save, sender=LeaveEntitlement)
+@receiver(post_delete, sender=LeaveEntitlement)
+def invalidate_dashboards_for_entitlement(sender, instance, **kwargs):
+    """Every employee dashboard shows the entitlements"""
+    invalidate(employee_ids=User.objects.filter(role='EMPLOYEE').values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=DailyUpdate)
+def update_working_hours_summary(sender, instance, created, **kwargs):
+    """Apply the old -> new hours delta to the PM's summary and the hours rollups"""
+    if created:
+        apply_hours_delta(
+            instance.employee_id, _pm_id(instance, instance.employee_id), instance.date, instance.working_hours
         )
-        
-        summary.total_hours = total_hours
-        summary.last_updated = timezone.now()
-        summary.save()
-        
-        print(f"Updated hours for {employee.email}: {total_hours}h (PM: {pm.email})")
-        
-    except Exception as e:
-        print(f"Signal Error: {str(e)}")
+    elif not all(instance.has_loaded_value(name) for name in ('employee_id', 'date', 'working_hours')):
+        # Saved from an instance we never saw loaded; fall back to a full recount
+        recompute_hours([instance.employee_id])
+    else:
+        old_employee_id = instance.loaded_value('employee_id')
+        old_date = instance.loaded_value('date')
+        old_hours = instance.loaded_value('working_hours')
+        pm_id = _pm_id(instance, instance.employee_id)
+        if (old_employee_id, old_date) == (instance.employee_id, instance.date):
+            apply_hours_delta(instance.employee_id, pm_id, instance.date, instance.working_hours - old_hours)
+        else:
+            apply_hours_delta(old_employee_id, _pm_id(instance, old_employee_id), old_date, -old_hours)
+            apply_hours_delta(instance.employee_id, pm_id, instance.date, instance.working_hours)
+
+    instance.remember_saved_values()
+
+
+@receiver(post_delete, sender=DailyUpdate)
+def remove_working_hours_from_summary(sender, instance, **kwargs):
+    """Take a deleted update's hours back out of the summary and rollups"""
+    employee_id = instance.loaded_value('employee_id', instance.employee_id)
+    apply_hours_delta(
+        employee_id,
+        _pm_id(instance, employee_id),
+        instance.loaded_value('date', instance.date),
+        -instance.loaded_value('working_hours', instance.working_hours),
+    )
+
+
+@receiver(post_save, sender=User)
+def move_hours_summary_on_pm_change(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the summary and team rollups keyed to the employee's current PM"""
+    if update_fields is not None and 'created_by' not in update_fields:
+        return
+    if not created and instance.has_loaded_value('created_by_id'):
+        old_pm_id = instance.loaded_value('created_by_id')
+        if old_pm_id != instance.created_by_id:
+            move_employee_hours(instance.pk, old_pm_id, instance.created_by_id)
+    instance.remember_saved_values()
 
 
 @receiver(post_save, sender=User)
 def send_verification_email_signal(sender, instance, created, **kwargs):
-    """Send verification email (only if not pre-verified)"""
-    
+    """Queue the verification email (only if not pre-verified)"""
     if created and not instance.is_superuser and not instance.is_verified:
-        try:
-            if not instance.verification_token:
-                token = uuid.uuid4().hex
-                User.objects.filter(pk=instance.pk).update(verification_token=token)
-                
-                send_verification_email.delay(
-                    user_email=instance.email,
-                    verification_token=token,
-                    user_id=instance.id
-                )
-                
-                print(f"📧 Verification email queued for {instance.email}")
-                
-        except Exception as e:
-            print(f"Email Signal Error: {str(e)}")
-    
+        if not instance.verification_token:
+            token = uuid.uuid4().hex
+            User.objects.filter(pk=instance.pk).update(verification_token=token)
+            # Outbox row commits (or rolls back) with the user. No try/except:
+            # a failure here must abort the creation, not leave a user who was
+            # silently rolled back behind a "created successfully" message.
+            queue_emails([verification_email(instance.email, token)])
+            logger.info('Verification email queued for %s', instance.email)
+
     elif created and instance.is_verified:
-        print(f"User {instance.email} created with pre-verified status (no email sent)")
\ No newline at end of file
+        logger.info('User %s created with pre-verified status (no email sent)', instance.email)
@@ -0,0 +1,60 @@
+"""Headline counters for the admin pages, kept in the site_counters table"""
+
+from django.db.models import Count, Q
+
+from .models import Project, SiteCounter, User
+from .sql import upsert_increment
+
+
+def role_counter(role):
+    return f'users:{role}'
+
+
+def compute_counters():
+    """
+    Count everything from the base tables: one conditional-aggregation
+    query per table. Used to seed and reconcile site_counters.
+    """
+    roles = [role for role, _ in User.ROLE_CHOICES]
+    users = User.objects.aggregate(
+        users=Count('id'),
+        **{role_counter(role): Count('id', filter=Q(role=role)) for role in roles},
+    )
+    projects = Project.objects.aggregate(projects=Count('id'))
+    return {**users, **projects}
+
+
+def rebuild_counters():
+    """Overwrite site_counters with fresh counts; returns them"""
+    counters = compute_counters()
+    upsert_increment(
+        SiteCounter,
+        [{'name': name, 'value': value} for name, value in counters.items()],
+        unique_fields=['name'],
+        increment_fields=[],
+        update_fields=['value'],
+    )
+    return counters
+
+
+def bump_counters(deltas):
+    """Add {name: delta} to the counters in one statement"""
+    rows = [{'name': name, 'value': delta} for name, delta in deltas.items() if delta]
+    upsert_increment(SiteCounter, rows, unique_fields=['name'], increment_fields=['value'])
+
+
+def site_counters():
+    """All counters in one indexed read; rebuilt from the base tables if the table is empty"""
+    counters = dict(SiteCounter.objects.values_list('name', 'value'))
+    if not counters:
+        counters = rebuild_counters()
+    return counters
+
+
+def users_by_role(counters):
+    """[{'role': ..., 'count': ...}] as admin_stats used to get from a GROUP BY"""
+    return [
+        {'role': role, 'count': counters.get(role_counter(role), 0)}
+        for role, _ in User.ROLE_CHOICES
+        if counters.get(role_counter(role))
+    ]
@@ -0,0 +1,85 @@
+"""Small raw-SQL helpers for write paths the ORM can't express in one statement"""
+
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.db.models.expressions import RawSQL
+
+
+def upsert_increment(model, rows, unique_fields, increment_fields, update_fields=(), using=DEFAULT_DB_ALIAS):
+    """
+    INSERT ... ON CONFLICT (unique_fields) DO UPDATE in a single statement.
+
+    `rows` are dicts keyed by field name or attname. On conflict the
+    `increment_fields` are added to the stored value and `update_fields`
+    are overwritten. A value may be a RawSQL expression (e.g. a delta
+    computed from a subquery), which is inlined instead of bound.
+    Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    fields = [model._meta.get_field(name) for name in rows[0]]
+
+    values_sql, params = [], []
+    for row in rows:
+        placeholders = []
+        for field in fields:
+            value = row[field.name if field.name in row else field.attname]
+            if isinstance(value, RawSQL):
+                placeholders.append(f'({value.sql})')
+                params.extend(value.params)
+            else:
+                placeholders.append('%s')
+                params.append(field.get_db_prep_save(value, connection))
+        values_sql.append(f"({', '.join(placeholders)})")
+
+    def column(name):
+        return qn(model._meta.get_field(name).column)
+
+    assignments = [
+        f'{column(name)} = {table}.{column(name)} + EXCLUDED.{column(name)}' for name in increment_fields
+    ] + [
+        f'{column(name)} = EXCLUDED.{column(name)}' for name in update_fields
+    ]
+    sql = (
+        f"INSERT INTO {table} ({', '.join(qn(field.column) for field in fields)}) "
+        f"VALUES {', '.join(values_sql)} "
+        f"ON CONFLICT ({', '.join(column(name) for name in unique_fields)}) "
+        f"DO UPDATE SET {', '.join(assignments)}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def upsert_increment_select(model, queryset, unique_fields, increment_fields, using=DEFAULT_DB_ALIAS):
+    """
+    INSERT INTO model SELECT ... ON CONFLICT (unique_fields) DO UPDATE: like
+    upsert_increment(), but the rows come from `queryset`, a values()
+    queryset (usually aggregated) whose names are `model` field names or
+    attnames, so they are never fetched. `queryset` must be filtered: SQLite
+    needs a WHERE to tell the upsert's ON from a join constraint.
+    Returns the number of rows written.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    names = [*queryset.query.values_select, *queryset.query.annotation_select]
+    select_sql, params = queryset.query.get_compiler(using).as_sql()
+
+    def column(name):
+        return qn(model._meta.get_field(name).column)
+
+    assignments = [
+        f'{column(name)} = {table}.{column(name)} + EXCLUDED.{column(name)}' for name in increment_fields
+    ]
+    sql = (
+        f"INSERT INTO {table} ({', '.join(column(name) for name in names)}) {select_sql} "
+        f"ON CONFLICT ({', '.join(column(name) for name in unique_fields)}) "
+        f"DO UPDATE SET {', '.join(assignments)}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
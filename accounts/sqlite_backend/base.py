@@ -0,0 +1,98 @@
+"""
+SQLite backend that applies a tuned PRAGMA profile to every new connection.
+
+Use as ENGINE 'accounts.sqlite_backend'. OPTIONS['pragmas'] overrides
+entries of DEFAULT_PRAGMAS (None drops one); every other option is
+passed through to django.db.backends.sqlite3 as usual.
+"""
+
+import os
+import threading
+
+from django.db.backends.sqlite3 import base
+
+
+DEFAULT_PRAGMAS = {
+    # First, so switching the journal mode below waits for the lock too
+    'busy_timeout': 5000,
+    # Readers work from the last committed snapshot: they no longer block
+    # the writer, and the writer no longer blocks them
+    'journal_mode': 'WAL',
+    # In WAL mode only a power loss (not a crash) can lose the last commits
+    'synchronous': 'NORMAL',
+    # Negative means KiB: 64 MB of page cache per connection
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# PRAGMA reads return numbers for these; the profile is written with names
+PRAGMA_NAMES = {
+    'synchronous': {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'},
+    'temp_store': {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'},
+}
+
+# Per process, since start-up
+_stats = {'connections_opened': 0, 'health_checks_failed': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def connection_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def read_pragmas(conn, names):
+    """{name: current value} from a DB-API sqlite3 connection, numbers mapped back to names"""
+    values = {}
+    for name in names:
+        value = conn.execute(f'PRAGMA {name}').fetchone()[0]
+        values[name] = PRAGMA_NAMES.get(name, {}).get(value, value)
+    return values
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        pragmas = {**DEFAULT_PRAGMAS, **kwargs.pop('pragmas', {})}
+        self.pragmas = {name: value for name, value in pragmas.items() if value is not None}
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            if name in ('journal_mode', 'mmap_size') and self.is_in_memory_db():
+                continue
+            conn.execute(f'PRAGMA {name} = {value}')
+        # Which file this connection has open, for the health check
+        self._database_inode = None if self.is_in_memory_db() else _inode(self.settings_dict['NAME'])
+        _count('connections_opened')
+        return conn
+
+    def is_usable(self):
+        """
+        With CONN_MAX_AGE connections outlive requests; a persistent
+        connection is only reused if it still answers and the database file
+        at NAME is still the one it opened (not replaced by a restore).
+        """
+        try:
+            self.connection.execute('SELECT 1')
+        except self.Database.Error:
+            usable = False
+        else:
+            usable = self.is_in_memory_db() or _inode(self.settings_dict['NAME']) == self._database_inode
+        if not usable:
+            _count('health_checks_failed')
+        return usable
+
+
+def _inode(path):
+    try:
+        return os.stat(path).st_ino
+    except OSError:
+        return None
@@ -0,0 +1,71 @@
+"""
+Content-addressed file storage for profile images.
+
+Files are named by the SHA-256 of their bytes, fanned out by the first
+two hex digits: profiles/me.jpg is stored as profiles/3f/3fa9...e1.jpg.
+Uploading the same image again (re-saving ProfileForm, two users with
+the same photo) reuses the stored file instead of adding a copy with a
+random suffix. Nothing is ever overwritten or deleted on save; files no
+row references any more are removed by the gc_media command.
+"""
+
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+HASH_NAME = 'sha256'
+
+
+def content_hash(content):
+    """Hex digest of a File, read chunk by chunk (uploads are never loaded whole)"""
+    digest = hashlib.new(HASH_NAME)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hashed_name(name, digest):
+    """Where content with `digest` uploaded as `name` is stored"""
+    directory = posixpath.dirname(name)
+    extension = posixpath.splitext(name)[1].lower()
+    return posixpath.join(directory, digest[:2], f'{digest}{extension}')
+
+
+def is_hashed(name):
+    """Whether `name` is a content-addressed name (its bytes can never change)"""
+    directory, filename = posixpath.split(name)
+    digest, extension = posixpath.splitext(filename)
+    return (
+        len(digest) == 64 and all(char in '0123456789abcdef' for char in digest)
+        and posixpath.basename(directory) == digest[:2] and extension == extension.lower()
+    )
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content hash and stores each content once"""
+
+    def get_available_name(self, name, max_length=None):
+        # A taken hashed name already holds these bytes: never pick another.
+        # Also raised from _save() when a concurrent upload of the same
+        # bytes creates the file between the check and the write.
+        if self.exists(name):
+            raise FileExistsError(name)
+        return name
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = hashed_name(name, content_hash(content))
+        try:
+            return super().save(name, content, max_length=max_length)
+        except FileExistsError:
+            # Touch it: gc_media spares recently used files, so a blob that was
+            # unreferenced until this upload isn't collected before the row commits
+            os.utime(self.path(name))
+            return name
@@ -0,0 +1,213 @@
+"""End-of-day write burst: many employees submitting at once against one SQLite file"""
+
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.core.signals import got_request_exception
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .benchmarks import percentile
+from .models import Todo, User
+from .scale import SCALE_EMAIL_DOMAIN, SENTENCES
+
+
+# What one simulated request does, and the status it should get back
+KINDS = {
+    'submit': 302,     # daily_update_create POST (insert, or upsert on a resubmit)
+    'todo': 302,       # todo_update POST moving a todo to another status
+    'dashboard': 200,  # employee dashboard GET (a reader holding the lock up in rollback journal mode)
+}
+DEFAULT_MIX = {'submit': 8, 'todo': 1, 'dashboard': 1}
+
+# Statements that take (or wait for) the write lock, including BEGIN IMMEDIATE/EXCLUSIVE
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'BEGIN')
+
+_request_error = threading.local()
+
+
+def parse_mix(text):
+    """'submit=8,todo=1' -> {'submit': 8, 'todo': 1}"""
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in KINDS:
+            raise ValueError(f"Unknown request kind {kind!r}; use {', '.join(KINDS)}")
+        mix[kind] = int(weight or 1)
+    if not any(mix.values()):
+        raise ValueError('The mix needs at least one non-zero weight')
+    return mix
+
+
+def build_jobs(workers, requests_per_worker, mix, seed=0):
+    """
+    Per-worker request lists against the seed_scale employees. Sessions
+    are created here, up front, so logging in isn't part of the burst.
+    """
+    rng = random.Random(seed)
+    employees = list(
+        User.objects.filter(email__endswith=f'@{SCALE_EMAIL_DOMAIN}', role='EMPLOYEE').order_by('pk')
+    )
+    if not employees:
+        raise ValueError('No seed_scale employees found; run seed_scale first')
+    todos = {}
+    for todo in Todo.objects.filter(employee__in=employees).order_by('pk'):
+        todos.setdefault(todo.employee_id, []).append(todo)
+    sessions = {}
+    for employee in employees:
+        client = Client()
+        client.force_login(employee)
+        sessions[employee.pk] = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    kinds, weights = zip(*mix.items())
+    today = timezone.localdate().isoformat()
+    jobs = []
+    for _ in range(workers):
+        worker_jobs = []
+        for _ in range(requests_per_worker):
+            employee = rng.choice(employees)
+            kind = rng.choices(kinds, weights)[0]
+            job = {'kind': kind, 'session': sessions[employee.pk]}
+            if kind == 'submit':
+                job['url'] = reverse('daily_update_create')
+                job['data'] = {
+                    'date': today,
+                    'update_text': rng.choice(SENTENCES),
+                    'working_hours': rng.choice(('6', '7.5', '8', '8.5')),
+                }
+            elif kind == 'todo' and todos.get(employee.pk):
+                todo = rng.choice(todos[employee.pk])
+                job['url'] = reverse('todo_update', args=[todo.pk])
+                job['data'] = {
+                    'title': todo.title,
+                    'description': todo.description,
+                    'status': rng.choice(('PENDING', 'IN_PROGRESS', 'COMPLETED')),
+                    'date': todo.date.isoformat(),
+                }
+            else:
+                job['kind'] = 'dashboard'
+                job['url'] = reverse('dashboard')
+            worker_jobs.append(job)
+        jobs.append(worker_jobs)
+    return jobs
+
+
+class _WriteTimer:
+    """Execute wrapper adding up the time spent in lock-taking statements"""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(WRITE_PREFIXES):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+def _remember_error(sender, **kwargs):
+    # Receivers run in the thread that raised, so this can't pick up another worker's error
+    _request_error.value = sys.exc_info()[1]
+
+
+def _classify(job, status, error):
+    if error is not None:
+        if 'database is locked' in str(error):
+            return 'database is locked'
+        return type(error).__name__
+    if status != KINDS[job['kind']]:
+        return f'HTTP {status}'
+    return None
+
+
+def run_worker(jobs, start_at):
+    """Run one worker's jobs from `start_at` (time.time()); [(kind, seconds, write wait seconds, error)]"""
+    client = Client(raise_request_exception=False)
+    timer = _WriteTimer()
+    samples = []
+    time.sleep(max(0.0, start_at - time.time()))
+    try:
+        with connection.execute_wrapper(timer):
+            for job in jobs:
+                client.cookies[settings.SESSION_COOKIE_NAME] = job['session']
+                _request_error.value = None
+                timer.seconds = 0.0
+                started = time.perf_counter()
+                if 'data' in job:
+                    response = client.post(job['url'], job['data'])
+                else:
+                    response = client.get(job['url'])
+                elapsed = time.perf_counter() - started
+                error = _classify(job, response.status_code, _request_error.value)
+                samples.append((job['kind'], elapsed, timer.seconds, error))
+    finally:
+        connections.close_all()
+    return samples
+
+
+def run_stress(jobs, mode='thread'):
+    """
+    Fire every worker's jobs at once, in threads or forked processes, and
+    summarise throughput, latency per kind, write-lock wait and errors.
+    """
+    got_request_exception.connect(_remember_error, dispatch_uid='stress-remember-error')
+    # Forked children must not share the parent's SQLite handles
+    connections.close_all()
+    start_at = time.time() + 0.5
+    try:
+        if mode == 'process':
+            executor = ProcessPoolExecutor(max_workers=len(jobs), mp_context=get_context('fork'))
+        else:
+            executor = ThreadPoolExecutor(max_workers=len(jobs))
+        with executor:
+            futures = [executor.submit(run_worker, worker_jobs, start_at) for worker_jobs in jobs]
+            samples = [sample for future in futures for sample in future.result()]
+    finally:
+        got_request_exception.disconnect(dispatch_uid='stress-remember-error')
+    return summarize(samples, time.time() - start_at)
+
+
+def summarize(samples, elapsed):
+    ok = [sample for sample in samples if sample[3] is None]
+    errors = {}
+    for sample in samples:
+        if sample[3] is not None:
+            errors[sample[3]] = errors.get(sample[3], 0) + 1
+    waits = [sample[2] * 1000 for sample in samples]
+    by_kind = {}
+    for kind in KINDS:
+        timings = [sample[1] * 1000 for sample in samples if sample[0] == kind]
+        if timings:
+            by_kind[kind] = {
+                'requests': len(timings),
+                'errors': sum(1 for sample in samples if sample[0] == kind and sample[3] is not None),
+                'p50_ms': round(percentile(timings, 50), 2),
+                'p95_ms': round(percentile(timings, 95), 2),
+                'p99_ms': round(percentile(timings, 99), 2),
+                'max_ms': round(max(timings), 2),
+            }
+    return {
+        'requests': len(samples),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(ok) / elapsed, 1) if elapsed else None,
+        'error_rate': round(len(samples) and (len(samples) - len(ok)) / len(samples), 4),
+        'errors': errors,
+        'write_wait_ms': {
+            'total': round(sum(waits), 1),
+            'p50': round(percentile(waits, 50), 2),
+            'p95': round(percentile(waits, 95), 2),
+            'max': round(max(waits), 2),
+        } if waits else None,
+        'by_kind': by_kind,
+    }
@@ -1,30 +1,52 @@
 from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
-from django.urls import reverse
+
+from . import replicas
+from .avatars import generate_stale_variants
+from .models import User
+from .outbox import VERIFICATION_SUBJECT, drain, verification_message
+from .purge import purge_user
+
 
 @shared_task
 def send_verification_email(user_email, verification_token, user_id):
-    verification_link = f"http://localhost:8000{reverse('verify_email', args=[verification_token])}"
-    
-    subject = 'Verify Your Email - Employee Management System'
-    message = f"""
-    Welcome to Employee Management System!
-    
-    Please verify your email by clicking the link below:
-    {verification_link}
-    
-    If you didn't create this account, please ignore this email.
-    
-    Thanks,
-    Employee Management Team
-    """
-    
     send_mail(
-        subject,
-        message,
+        VERIFICATION_SUBJECT,
+        verification_message(verification_token),
         settings.DEFAULT_FROM_EMAIL,
         [user_email],
         fail_silently=False,
     )
-    return f"Verification email sent to {user_email}"
\ No newline at end of file
+    return f"Verification email sent to {user_email}"
+
+
+@shared_task
+def drain_email_outbox(batch_size=None, max_batches=None):
+    """Send due outbox emails in batches (also scheduled via CELERY_BEAT_SCHEDULE)"""
+    return drain(batch_size=batch_size, max_batches=max_batches)
+
+
+@shared_task
+def refresh_replicas():
+    """Re-snapshot the primary into every read replica (scheduled via CELERY_BEAT_SCHEDULE)"""
+    return replicas.refresh_replicas()
+
+
+@shared_task(bind=True)
+def purge_user_task(self, user_id):
+    """Delete a user and their subtree, reporting progress as the PROGRESS state"""
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return {}
+
+    def report(done, total, step):
+        self.update_state(state='PROGRESS', meta={'done': done, 'total': total, 'step': step})
+
+    return purge_user(user, progress=report)
+
+
+@shared_task
+def generate_avatar_variants(batch_size=None):
+    """Write the WebP avatar sizes of new or replaced profile images (scheduled via CELERY_BEAT_SCHEDULE)"""
+    return generate_stale_variants(batch_size)
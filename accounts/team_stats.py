@@ -0,0 +1,74 @@
+"""Per-employee work stats without join fan-out"""
+
+from django.db.models import DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .hours import bucket_start
+from .models import DailyUpdate, HoursRollup, User
+
+
+HOURS_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+STAT_NAMES = (
+    'total_hours', 'total_todos', 'completed_todos', 'pending_todos', 'hours_this_week', 'hours_this_month',
+)
+
+
+def _per_employee(queryset, aggregate, output_field):
+    """
+    Scalar subquery aggregating `queryset` for the outer employee row.
+
+    Each metric gets its own subquery so joining several child tables
+    never multiplies rows; every subquery is an index range scan on
+    employee_id.
+    """
+    subquery = (
+        queryset.filter(employee=OuterRef('pk'))
+        .order_by()
+        .values('employee')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+    return Coalesce(Subquery(subquery, output_field=output_field), Value(0), output_field=output_field)
+
+
+def _rollup(period, date):
+    """This employee's hours rollup row for the bucket containing `date`"""
+    subquery = HoursRollup.objects.filter(
+        user=OuterRef('pk'), scope='EMPLOYEE', period=period, bucket=bucket_start(period, date),
+    ).values('total_hours')[:1]
+    return Coalesce(Subquery(subquery, output_field=HOURS_FIELD), Value(0), output_field=HOURS_FIELD)
+
+
+def _todo_counter(column):
+    # todo_stats is one row per employee, so this LEFT JOIN on its primary key can't fan out
+    return Coalesce(F(f'todo_stats__{column}'), Value(0), output_field=IntegerField())
+
+
+def with_team_stats(queryset, date=None):
+    """
+    Annotate a User queryset with STAT_NAMES. Evaluating it is one query;
+    rows with no updates or todos get 0, not None.
+    """
+    date = date or timezone.localdate()
+    return queryset.annotate(
+        total_hours=_per_employee(DailyUpdate.objects.all(), Sum('working_hours'), HOURS_FIELD),
+        total_todos=_todo_counter('total'),
+        completed_todos=_todo_counter('completed'),
+        pending_todos=_todo_counter('pending'),
+        hours_this_week=_rollup('WEEK', date),
+        hours_this_month=_rollup('MONTH', date),
+    )
+
+
+def team_members(pm, date=None):
+    """A PM's employees with their stats, by first name"""
+    return with_team_stats(User.objects.filter(created_by=pm, role='EMPLOYEE'), date).order_by('first_name')
+
+
+def team_totals(members):
+    """Sum the annotated stats over already-evaluated members (no extra query)"""
+    totals = {name: sum(getattr(member, name) for member in members) for name in STAT_NAMES}
+    totals['total_employees'] = len(members)
+    return totals
@@ -0,0 +1,33 @@
+from django import template
+from django.utils.html import format_html
+
+from accounts.avatars import current_variants
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar(user, size, css_class='rounded-circle', alt=None):
+    """
+    <img> of the user's profile image shown at `size` CSS px, e.g.
+    {% avatar emp 50 'rounded-circle me-3' %}. Offers every WebP variant in
+    srcset so the browser fetches the smallest that is sharp enough; the
+    original until the variants exist.
+    """
+    if alt is None:
+        alt = user.get_full_name() or user.email
+    variants = current_variants(user)
+    if not variants:
+        return format_html(
+            '<img src="{}" alt="{}" class="{} object-fit-cover" width="{}" height="{}" loading="lazy">',
+            user.profile_image.url, alt, css_class, size, size,
+        )
+    storage = user.profile_image.storage
+    widths = sorted(variants)
+    src = next((width for width in widths if width >= size), widths[-1])
+    srcset = ', '.join(f'{storage.url(variants[width])} {width}w' for width in widths)
+    return format_html(
+        '<img src="{}" srcset="{}" sizes="{}px" alt="{}" class="{} object-fit-cover" width="{}" height="{}" loading="lazy">',
+        storage.url(variants[src]), srcset, size, alt, css_class, size, size,
+    )
@@ -1,3 +1,832 @@
-from django.test import TestCase
+import datetime
+import io
+import logging
+import os
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Permission
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import router, transaction
+from django.db.models import Q, Sum
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .avatars import current_variants, generate_stale_variants, generate_variants, stale_users
+from .benchmarks import benchmark_fixtures, budget_requests, fetch_url, private_cache, task_results_in_memory
+from .dashboard_cache import cache_key, cache_stats, employee_dashboard_context, reset_cache_stats
+from .hours import rebuild_employee_rollups, rebuild_team_rollups, recompute_hours
+from .leave_approvals import set_leave_status
+from .leave_balances import count_used_days, leave_days
+from .management.commands.check_query_plans import view_queries
+from .media import parse_range
+from .media_gc import _still_unreferenced, collect_garbage, stored_names
+from .models import (
+    DailyUpdate, EmailOutbox, HoursRollup, Leave, LeaveBalance, Project, SiteCounter, Todo, TodoStats, User,
+    WorkingHoursSummary,
+)
+from .onboarding import _taken_emails, onboard_users
+from .outbox import claim_batch, drain, send_batch
+from .purge import purge_user
+from .querybudget import QUERY_BUDGETS, assert_query_budget
+from .replicas import LAST_WRITE_COOKIE, ReadYourWritesMiddleware, reading_from, reporting_view
+from .scale import clear_scale_data, seed_scale
+from .search import INDEXES, check_index, search
+from .site_stats import compute_counters, site_counters
+from .sql import upsert_increment, upsert_increment_select
+from .storage import ContentAddressedStorage
+from .timesheets import import_daily_updates, iter_csv, submit_daily_update, write_xlsx
+from .todo_stats import COUNTER_FIELDS, count_todos
+
+
+@private_cache()
+class AccountsTestCase(TestCase):
+    """Tests clear and fill the cache: never the shared one a dev server is using"""
+
+
+def make_user(email, role='EMPLOYEE', created_by=None):
+    return User.objects.create_user(email, 'x', role=role, created_by=created_by, is_verified=True)
+
+
+class QueryBudgetTests(AccountsTestCase):
+    """Every route and admin changelist stays within QUERY_BUDGETS, at any data size"""
+
+    scales = (1, 10)
+
+    def test_routes_within_budget(self):
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        self.addCleanup(request_logger.setLevel, level)
+        self.enterContext(task_results_in_memory())
+
+        counts = {}
+        client = Client()
+        for scale in self.scales:
+            clear_scale_data()
+            seed_scale(scale=scale, seed=0)
+            counts[scale] = {}
+            for label, name, url, user in budget_requests(benchmark_fixtures()):
+                with self.subTest(scale=scale, route=label):
+                    self.assertIn(name, QUERY_BUDGETS)
+                    client.logout()
+                    if user is not None:
+                        client.force_login(user)
+                    cache.clear()
+                    with assert_query_budget(QUERY_BUDGETS[name]) as recorder:
+                        fetch_url(client, url)
+                    counts[scale][label] = len(recorder)
+
+        small, large = (counts[scale] for scale in self.scales)
+        for label, count in small.items():
+            with self.subTest(route=label):
+                self.assertEqual(large.get(label), count, 'query count grows with data')
+
+
+class QueryPlanTests(AccountsTestCase):
+    def test_view_queries_use_their_indexes(self):
+        for view, description, queryset, index in view_queries():
+            with self.subTest(view=view, query=description):
+                self.assertIn(index, queryset.explain())
+
+
+class HoursBookkeepingTests(AccountsTestCase):
+    """Signal and upsert deltas leave the summaries and rollups as a full recount would"""
+
+    def setUp(self):
+        self.pm = make_user('pm@example.com', role='PM')
+        self.other_pm = make_user('pm2@example.com', role='PM')
+        self.alice = make_user('alice@example.com', created_by=self.pm)
+        self.bob = make_user('bob@example.com', created_by=self.pm)
+
+    def state(self):
+        summaries = {
+            (row.employee_id, row.pm_id): row.total_hours
+            for row in WorkingHoursSummary.objects.exclude(total_hours=0)
+        }
+        rollups = {
+            (row.user_id, row.scope, row.period, row.bucket): row.total_hours
+            for row in HoursRollup.objects.exclude(total_hours=0)
+        }
+        return summaries, rollups
+
+    def assertMatchesRecount(self):
+        incremental = self.state()
+        recompute_hours(User.objects.filter(role='EMPLOYEE').values_list('pk', flat=True))
+        rebuild_team_rollups(User.objects.filter(role='PM').values_list('pk', flat=True))
+        self.assertEqual(incremental, self.state())
+
+    def test_saves_and_deletes(self):
+        day = datetime.date(2030, 1, 30)
+        first = DailyUpdate.objects.create(employee=self.alice, date=day, update_text='a', working_hours=Decimal('8'))
+        DailyUpdate.objects.create(employee=self.bob, date=day, update_text='b', working_hours=Decimal('6.5'))
+        second = DailyUpdate.objects.create(
+            employee=self.alice, date=day + datetime.timedelta(days=1), update_text='c', working_hours=Decimal('4'),
+        )
+        self.assertMatchesRecount()
+
+        first.working_hours = Decimal('7.25')
+        first.save()
+        # Into the next week and month
+        second.date = day + datetime.timedelta(days=7)
+        second.save()
+        self.assertMatchesRecount()
+
+        DailyUpdate.objects.get(pk=first.pk).delete()
+        self.assertMatchesRecount()
+
+    def test_employee_changes_pm(self):
+        DailyUpdate.objects.create(
+            employee=self.alice, date=datetime.date(2030, 3, 3), update_text='a', working_hours=Decimal('8'),
+        )
+        self.alice.created_by = self.other_pm
+        self.alice.save()
+        self.assertMatchesRecount()
+        self.assertEqual(WorkingHoursSummary.objects.get(employee=self.alice).pm_id, self.other_pm.pk)
+
+    def test_submit_daily_update(self):
+        day = datetime.date(2030, 5, 4)
+        _, created = submit_daily_update(self.alice, day, 'first', Decimal('5'))
+        self.assertTrue(created)
+        _, created = submit_daily_update(self.alice, day, 'again', Decimal('7.5'))
+        self.assertFalse(created)
+        self.assertEqual(DailyUpdate.objects.get(employee=self.alice, date=day).working_hours, Decimal('7.5'))
+        self.assertMatchesRecount()
+
+    def test_submit_daily_update_without_summary_row(self):
+        DailyUpdate.objects.create(
+            employee=self.alice, date=datetime.date(2030, 5, 1), update_text='a', working_hours=Decimal('8'),
+        )
+        WorkingHoursSummary.objects.filter(employee=self.alice).delete()
+        submit_daily_update(self.alice, datetime.date(2030, 5, 2), 'b', Decimal('3'))
+        self.assertEqual(WorkingHoursSummary.objects.get(employee=self.alice).total_hours, Decimal('11'))
+        self.assertMatchesRecount()
+
+    def test_rebuild_rollups_chunk_is_atomic(self):
+        DailyUpdate.objects.create(
+            employee=self.alice, date=datetime.date(2030, 5, 1), update_text='a', working_hours=Decimal('8'),
+        )
+        WorkingHoursSummary.objects.filter(employee=self.alice).update(total_hours=Decimal('99'))
+        HoursRollup.objects.all().delete()
+        with mock.patch(
+            'accounts.management.commands.rebuild_rollups.rebuild_team_rollups', side_effect=RuntimeError,
+        ), self.assertRaises(RuntimeError):
+            call_command('rebuild_rollups', stdout=io.StringIO())
+        self.assertEqual(WorkingHoursSummary.objects.get(employee=self.alice).total_hours, Decimal('99'))
+        self.assertFalse(HoursRollup.objects.exists())
+
+        call_command('rebuild_rollups', stdout=io.StringIO())
+        self.assertEqual(WorkingHoursSummary.objects.get(employee=self.alice).total_hours, Decimal('8'))
+        self.assertMatchesRecount()
+
+
+class DashboardInvalidationTests(AccountsTestCase):
+    def setUp(self):
+        self.pm = make_user('pm@example.com', role='PM')
+        self.other_pm = make_user('pm2@example.com', role='PM')
+        self.alice = make_user('alice@example.com', created_by=self.pm)
+        self.bob = make_user('bob@example.com', created_by=self.other_pm)
+        self.keys = {
+            (kind, user.pk): cache_key(kind, user.pk)
+            for kind in ('employee', 'pm') for user in (self.pm, self.other_pm, self.alice, self.bob)
+        }
+
+    def dropped_after_commit(self, write):
+        """{(kind, user id)} of the dashboards dropped once `write` commits (and not before)"""
+        cache.set_many(dict.fromkeys(self.keys.values(), 'cached'))
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+            self.assertEqual(len(cache.get_many(self.keys.values())), len(self.keys))
+        kept = cache.get_many(self.keys.values())
+        return {owner for owner, key in self.keys.items() if key not in kept}
+
+    def test_todo(self):
+        self.assertEqual(
+            self.dropped_after_commit(lambda: Todo.objects.create(employee=self.alice, title='t')),
+            {('employee', self.alice.pk)},
+        )
+
+    def test_daily_update(self):
+        def write():
+            DailyUpdate.objects.create(
+                employee=self.alice, date=datetime.date(2030, 1, 1), update_text='u', working_hours=Decimal('1'),
+            )
+        self.assertEqual(self.dropped_after_commit(write), {('employee', self.alice.pk), ('pm', self.pm.pk)})
+
+    def test_user_moves_team(self):
+        def write():
+            self.alice.created_by = self.other_pm
+            self.alice.save()
+        self.assertEqual(self.dropped_after_commit(write), {('pm', self.pm.pk), ('pm', self.other_pm.pk)})
+
+    def test_leave(self):
+        def write():
+            Leave.objects.create(
+                employee=self.bob, leave_type='SICK', start_date=datetime.date(2030, 1, 1),
+                end_date=datetime.date(2030, 1, 2), reason='r', status='APPROVED',
+            )
+        self.assertEqual(self.dropped_after_commit(write), {('employee', self.bob.pk)})
+
+
+class DashboardCacheStatsTests(AccountsTestCase):
+    def test_counted_in_process_off_redis(self):
+        employee = make_user('e@example.com')
+        reset_cache_stats()
+        for _ in range(3):
+            employee_dashboard_context(employee.pk)
+        self.assertEqual(cache_stats()['employee'], {'hits': 2, 'misses': 1})
+        # Nothing but the dashboard itself went to the cache
+        self.assertEqual(cache.get_many([cache_key('employee', employee.pk), 'dashboard:stats:employee:hits']).keys(),
+                         {cache_key('employee', employee.pk)})
+
+
+class ExportTests(AccountsTestCase):
+    rows = [['Update', 'Hours'], ['=HYPERLINK("http://x")', Decimal('8')], ['-1+2', Decimal('1')], ['ok\x07', None]]
+
+    def test_csv_cells_are_not_formulas(self):
+        self.assertEqual(''.join(iter_csv(self.rows)).splitlines(), [
+            'Update,Hours', '"\'=HYPERLINK(""http://x"")",8', "'-1+2,1", 'ok\x07,',
+        ])
+
+    def test_xlsx_cells_are_plain_text(self):
+        from openpyxl import load_workbook
+
+        fileobj = io.BytesIO()
+        write_xlsx(self.rows, fileobj)
+        fileobj.seek(0)
+        sheet = load_workbook(fileobj).active
+        self.assertEqual(
+            [cell.value for cell in sheet['A']], ['Update', '\'=HYPERLINK("http://x")', "'-1+2", 'ok'],
+        )
+
+    def test_command_rejects_bad_dates(self):
+        with self.assertRaisesMessage(CommandError, '--from'):
+            call_command('export_timesheets', '--from', '2030-13-01')
+
+
+class ImportTests(AccountsTestCase):
+    def setUp(self):
+        self.pm = make_user('pm@example.com', role='PM')
+        self.alice = make_user('alice@example.com', created_by=self.pm)
+
+    def test_batches_written_before_an_error_are_recomputed(self):
+        def lines():
+            yield 'employee,date,working_hours,update_text\n'
+            yield 'alice@example.com,2030-02-01,6,first\n'
+            raise UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'invalid start byte')
+
+        with self.assertRaises(UnicodeDecodeError):
+            import_daily_updates(lines(), batch_size=1)
+        self.assertEqual(WorkingHoursSummary.objects.get(employee=self.alice).total_hours, Decimal('6'))
+
+    def test_upload_that_is_not_utf8(self):
+        admin = make_user('admin@example.com', role='ADMIN')
+        self.client.force_login(admin)
+        for url_name, extra in (('admin_import_updates', {}), ('employee_bulk_onboard', {'pm': self.pm.pk})):
+            with self.subTest(url_name):
+                upload = SimpleUploadedFile('rows.csv', b'email,first_name\n\xff\xfe,x\n', content_type='text/csv')
+                response = self.client.post(reverse(url_name), {'file': upload, **extra})
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('not UTF-8', ' '.join(response.context['form'].errors['file']))
+
+
+class RangeTests(SimpleTestCase):
+    def test_parse_range(self):
+        for header, size, expected in (
+            (None, 10, None), ('bytes=2-4', 10, (2, 4)), ('bytes=5-', 10, (5, 9)), ('bytes=-3', 10, (7, 9)),
+            ('bytes=-30', 10, (0, 9)), ('bytes=0-0,2-3', 10, None),
+        ):
+            with self.subTest(header):
+                self.assertEqual(parse_range(header, size), expected)
+
+    def test_unsatisfiable(self):
+        for header, size in (('bytes=10-', 10), ('bytes=4-2', 10), ('bytes=-0', 10), ('bytes=-5', 0), ('bytes=0-', 0)):
+            with self.subTest(header, size=size), self.assertRaises(ValueError):
+                parse_range(header, size)
+
+
+class MediaGarbageTests(AccountsTestCase):
+    def setUp(self):
+        self.storage = ContentAddressedStorage(location=self.enterContext(tempfile.TemporaryDirectory()))
+
+    def test_same_bytes_stored_once(self):
+        first = self.storage.save('profiles/a.jpg', ContentFile(b'photo'))
+        self.assertEqual(self.storage.save('profiles/b.JPG', ContentFile(b'photo')), first)
+        self.assertEqual(list(stored_names(self.storage)), [first])
+
+    def test_concurrent_save_of_the_same_bytes(self):
+        first = self.storage.save('profiles/a.jpg', ContentFile(b'photo'))
+        # The other upload writes the file after this one found it missing
+        with mock.patch.object(self.storage, 'exists', side_effect=[False, True]):
+            self.assertEqual(self.storage.save('profiles/b.jpg', ContentFile(b'photo')), first)
+        self.assertEqual(list(stored_names(self.storage)), [first])
+
+    def test_collect_garbage_spares_recent_files(self):
+        old, recent, used = (self.storage.save('profiles/x.jpg', ContentFile(data)) for data in (b'1', b'2', b'3'))
+        user = make_user('e@example.com')
+        User.objects.filter(pk=user.pk).update(profile_image=used)
+        day_ago = time.time() - 86400
+        for name in (old, used):
+            os.utime(self.storage.path(name), (day_ago, day_ago))
+
+        self.assertEqual([names for names, _ in collect_garbage(self.storage, min_age=3600)], [[old]])
+        self.assertEqual([names for names, _ in collect_garbage(self.storage, min_age=0)], [[recent]])
+        self.assertEqual(list(stored_names(self.storage)), [used])
+
+    def test_recheck_sees_images_and_variants(self):
+        image, variant = 'profiles/aa/aa01.jpg', 'profiles/variants/bb/bb02.webp'
+        user = make_user('e@example.com')
+        User.objects.filter(pk=user.pk).update(
+            profile_image=image, profile_image_variants={'source': image, 'sizes': {'48': variant}},
+        )
+        batch = [image, variant, 'profiles/cc/cc03.jpg', 'profiles/variants/dd/dd04.webp']
+        self.assertEqual(_still_unreferenced(batch), batch[2:])
+
+
+def image_file(width, height, color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, format='PNG')
+    return ContentFile(buffer.getvalue())
+
+
+class AvatarTests(AccountsTestCase):
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        self.user = make_user('e@example.com')
+
+    def upload(self, content, name='me.png'):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile_image.save(name, content)
+        self.user.refresh_from_db()
+
+    def render(self):
+        return Template('{% load avatars %}{% avatar user 50 %}').render(Context({'user': self.user}))
+
+    def test_sizes_without_upscaling(self):
+        for (width, height), expected in (((600, 800), [48, 128, 512]), ((300, 200), [48, 128, 200])):
+            with self.subTest(width=width, height=height):
+                self.upload(image_file(width, height, color=(width % 256, 0, 0)))
+                written = generate_variants(self.user)
+                self.assertEqual(sorted(written), expected)
+                for size, name in written.items():
+                    with self.user.profile_image.storage.open(name) as fileobj, Image.open(fileobj) as variant:
+                        self.assertEqual((variant.format, variant.size), ('WEBP', (size, size)))
+                self.user.refresh_from_db()
+                self.assertEqual(current_variants(self.user), written)
+
+    def test_save_leaves_the_variants_to_the_scheduled_run(self):
+        self.upload(image_file(100, 100))
+        self.assertEqual(list(stale_users()), [self.user])
+        self.assertEqual(generate_stale_variants(), 1)
+        self.assertFalse(stale_users().exists())
+        # A replaced image is stale again
+        self.upload(image_file(100, 100, color='blue'), name='new.png')
+        self.assertEqual(list(stale_users()), [self.user])
+
+    def test_unreadable_image_is_not_retried(self):
+        self.upload(ContentFile(b'not an image'), name='broken.png')
+        with self.assertLogs('accounts.avatars', 'ERROR'):
+            self.assertEqual(generate_stale_variants(), 0)
+        self.assertFalse(stale_users().exists())
+        self.user.refresh_from_db()
+        self.assertEqual(current_variants(self.user), {})
+
+    def test_tag_serves_the_original_until_the_variants_match(self):
+        self.upload(image_file(100, 100))
+        original = self.user.profile_image.url
+        self.assertIn(f'src="{original}"', self.render())
+        self.assertNotIn('srcset', self.render())
+
+        generate_variants(self.user)
+        self.user.refresh_from_db()
+        html = self.render()
+        self.assertIn('srcset', html)
+        self.assertNotIn(original, html)
+
+        # Variants of the previous image are not used for the new one
+        self.upload(image_file(100, 100, color='blue'), name='new.png')
+        self.assertIn(f'src="{self.user.profile_image.url}"', self.render())
+        self.assertNotIn('srcset', self.render())
+
+
+class OutboxTests(AccountsTestCase):
+    def setUp(self):
+        # The outbox's clock; ahead of the real one that stamps new rows, so they are due
+        self.now = timezone.now() + datetime.timedelta(minutes=1)
+        self.enterContext(mock.patch('django.utils.timezone.now', side_effect=lambda: self.now))
+
+    def queue(self, count):
+        for i in range(count):
+            User.objects.create_user(f'new{i}@example.com', 'x')
+        return list(EmailOutbox.objects.values_list('pk', flat=True))
+
+    def down(self):
+        return mock.Mock(**{'open.side_effect': OSError('connection refused')})
+
+    def test_rolled_back_user_leaves_no_email(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            User.objects.create_user('new@example.com', 'x')
+            raise RuntimeError
+        self.assertFalse(EmailOutbox.objects.exists())
+        self.assertEqual(len(self.queue(1)), 1)
+
+    def test_claimed_emails_are_leased(self):
+        ids = self.queue(3)
+        self.assertEqual([email.pk for email in claim_batch(2)], ids[:2])
+        self.assertEqual([email.pk for email in claim_batch(10)], ids[2:])
+        self.assertEqual(claim_batch(10), [])
+
+    @override_settings(EMAIL_OUTBOX_LEASE_SECONDS=600)
+    def test_reclaimed_after_a_crashed_worker(self):
+        ids = self.queue(2)
+        crashed = claim_batch(10)
+        self.now += datetime.timedelta(seconds=599)
+        self.assertEqual(claim_batch(10), [])
+        self.now += datetime.timedelta(seconds=1)
+        reclaimed = claim_batch(10)
+        self.assertEqual([email.pk for email in reclaimed], ids)
+        self.assertNotEqual(reclaimed[0].claim_token, crashed[0].claim_token)
+        self.assertEqual(send_batch(reclaimed), (2, 0))
+        self.assertEqual(set(EmailOutbox.objects.values_list('status', flat=True)), {'SENT'})
+
+    @override_settings(EMAIL_OUTBOX_RETRY_BASE_SECONDS=60, EMAIL_OUTBOX_MAX_ATTEMPTS=3)
+    def test_backoff_then_give_up(self):
+        [pk] = self.queue(1)
+        for attempts, delay in ((1, 60), (2, 120)):
+            self.assertEqual(send_batch(claim_batch(10), self.down()), (0, 1))
+            email = EmailOutbox.objects.get(pk=pk)
+            self.assertEqual((email.status, email.attempts, email.claim_token), ('PENDING', attempts, ''))
+            self.assertEqual(email.next_attempt_at, self.now + datetime.timedelta(seconds=delay))
+            self.assertIn('connection refused', email.last_error)
+            # Not due until the backoff has passed
+            self.assertEqual(claim_batch(10), [])
+            self.now += datetime.timedelta(seconds=delay)
+        with self.assertLogs('accounts.outbox', 'ERROR'):
+            send_batch(claim_batch(10), self.down())
+        email = EmailOutbox.objects.get(pk=pk)
+        self.assertEqual((email.status, email.attempts), ('FAILED', 3))
+        self.now += datetime.timedelta(days=1)
+        self.assertEqual(claim_batch(10), [])
+
+    def test_drain(self):
+        self.queue(5)
+        self.assertEqual(drain(batch_size=2, connection=self.down())['batches'], 1)
+        self.now += datetime.timedelta(days=1)
+        totals = drain(batch_size=2)
+        self.assertEqual((totals['batches'], totals['sent'], totals['failed']), (3, 5, 0))
+        self.assertEqual(len(mail.outbox), 5)
+
+
+class OnboardingTests(AccountsTestCase):
+    def setUp(self):
+        self.pm = make_user('pm@example.com', role='PM')
+        make_user('Carol@Example.com')
+
+    def onboard(self, *emails):
+        rows = ''.join(f'{email},First,Last,Long-enough-pw-{i}\n' for i, email in enumerate(emails))
+        return onboard_users(io.StringIO('email,first_name,last_name,password\n' + rows), self.pm, is_verified=True)
+
+    def test_existing_addresses_match_case_insensitively(self):
+        result = self.onboard('carol@example.com', 'Dave@Example.COM', 'dave@example.com')
+        self.assertEqual([user.email for user in result.created], ['Dave@example.com'])
+        self.assertEqual([line_no for line_no, _ in result.errors], [2, 4])
+
+    def test_address_registered_during_the_upload(self):
+        # The up-front check misses an account created after it ran
+        registered = _taken_emails(['carol@example.com'])
+        with mock.patch('accounts.onboarding._taken_emails', side_effect=[set(), registered]):
+            result = self.onboard('Carol@Example.com', 'erin@example.com')
+        self.assertEqual([user.email for user in result.created], ['erin@example.com'])
+        self.assertEqual(result.errors, [(2, 'Carol@example.com already exists')])
+        self.assertTrue(User.objects.filter(email='erin@example.com').exists())
+
+
+class TodoStatsTests(AccountsTestCase):
+    def test_counters_follow_todos(self):
+        pm = make_user('pm@example.com', role='PM')
+        alice = make_user('alice@example.com', created_by=pm)
+        bob = make_user('bob@example.com', created_by=pm)
+        todos = [Todo.objects.create(employee=alice, title=f'todo {i}') for i in range(4)]
+        todos[0].status = 'COMPLETED'
+        todos[0].save()
+        todos[1].status = 'IN_PROGRESS'
+        todos[1].employee = bob
+        todos[1].save()
+        todos[2].delete()
+
+        stored = {
+            row.pop('employee_id'): row
+            for row in TodoStats.objects.exclude(total=0).values('employee_id', *COUNTER_FIELDS)
+        }
+        self.assertEqual(stored, count_todos())
+
+
+class SiteCounterTests(AccountsTestCase):
+    def test_counters_follow_users_and_projects(self):
+        site_counters()
+        pm = make_user('pm@example.com', role='PM')
+        employee = make_user('e@example.com', created_by=pm)
+        Project.objects.create(name='p', created_by=pm)
+        employee.role = 'PM'
+        employee.save()
+        Project.objects.create(name='q', created_by=employee).delete()
+        make_user('gone@example.com').delete()
+
+        expected = compute_counters()
+        self.assertEqual({name: site_counters().get(name, 0) for name in expected}, expected)
+
+
+class TeamCalendarTests(AccountsTestCase):
+    def test_months_at_the_ends_of_the_date_range(self):
+        self.client.force_login(make_user('pm@example.com', role='PM'))
+        this_month = timezone.localdate().replace(day=1)
+        for month, shown in (
+            ('0001-01', this_month), ('9999-12', this_month),
+            ('0002-01', datetime.date(2, 1, 1)), ('9998-12', datetime.date(9998, 12, 1)),
+        ):
+            with self.subTest(month):
+                response = self.client.get(reverse('team_calendar'), {'month': month})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['month'], shown)
+
+
+class LeaveBalanceTests(AccountsTestCase):
+    def setUp(self):
+        self.pm = make_user('pm@example.com', role='PM')
+        self.alice = make_user('alice@example.com', created_by=self.pm)
+        self.bob = make_user('bob@example.com', created_by=self.pm)
+
+    def leave(self, employee, start, days, status='PENDING', leave_type='SICK'):
+        return Leave.objects.create(
+            employee=employee, leave_type=leave_type, start_date=start,
+            end_date=start + datetime.timedelta(days=days - 1), reason='r', status=status,
+        )
+
+    def assertMatchesRecount(self):
+        stored = dict(
+            ((employee_id, leave_type), days)
+            for employee_id, leave_type, days in LeaveBalance.objects.exclude(used_days=0).values_list(
+                'employee_id', 'leave_type', 'used_days'
+            )
+        )
+        self.assertEqual(stored, {key: days for key, days in count_used_days().items() if days})
+
+    def test_single_saves(self):
+        start = datetime.date(2030, 12, 30)
+        approved = self.leave(self.alice, start, 3, status='APPROVED')
+        pending = self.leave(self.alice, start, 2)
+        self.assertMatchesRecount()
+
+        pending.status = 'APPROVED'
+        pending.save()
+        approved.end_date += datetime.timedelta(days=2)
+        approved.leave_type = 'CASUAL'
+        approved.employee = self.bob
+        approved.save()
+        self.assertMatchesRecount()
+
+        Leave.objects.get(pk=pending.pk).delete()
+        self.assertMatchesRecount()
+        self.assertEqual(LeaveBalance.objects.get(employee=self.bob, leave_type='CASUAL').used_days, 5)
+
+    def test_bulk_status_changes(self):
+        start = datetime.date(2030, 6, 1)
+        leaves = [self.leave(employee, start, days) for employee in (self.alice, self.bob) for days in (1, 4)]
+        leaves.append(self.leave(self.alice, start, 2, status='APPROVED'))
+        every = Leave.objects.filter(pk__in=[leave.pk for leave in leaves])
+
+        self.assertEqual(set_leave_status(every, 'APPROVED', decided_by=self.pm), 4)
+        self.assertMatchesRecount()
+        self.assertEqual(LeaveBalance.objects.get(employee=self.alice, leave_type='SICK').used_days, 7)
+
+        self.assertEqual(set_leave_status(every.filter(employee=self.alice), 'REJECTED', decided_by=self.pm), 3)
+        self.assertMatchesRecount()
+        self.assertEqual(set_leave_status(every.filter(employee=self.alice), 'REJECTED'), 0)
+
+    def admin_action(self, user, action, leaves, *codenames):
+        User.objects.filter(pk=user.pk).update(is_staff=True)
+        user.user_permissions.set(Permission.objects.filter(codename__in=codenames))
+        self.client.force_login(user)
+        self.client.post(
+            reverse('admin:accounts_leave_changelist'),
+            {'action': action, '_selected_action': [leave.pk for leave in leaves]},
+        )
+        return dict(Leave.objects.filter(pk__in=[leave.pk for leave in leaves]).values_list('pk', 'status'))
+
+    def test_admin_actions_only_decide_the_users_team(self):
+        start = datetime.date(2030, 6, 1)
+        other_pm = make_user('pm2@example.com', role='PM')
+        own = self.leave(self.alice, start, 1)
+        other = self.leave(make_user('c@example.com', created_by=other_pm), start, 1)
+        self.assertEqual(
+            self.admin_action(self.pm, 'approve', [own, other], 'view_leave', 'change_leave'),
+            {own.pk: 'APPROVED', other.pk: 'PENDING'},
+        )
+        # An employee with admin access sees their own leaves but cannot decide them
+        mine = self.leave(self.bob, start, 1)
+        for codenames in (('view_leave',), ('view_leave', 'change_leave')):
+            with self.subTest(codenames=codenames):
+                self.assertEqual(self.admin_action(self.bob, 'approve', [mine], *codenames), {mine.pk: 'PENDING'})
+
+
+class PurgeTests(AccountsTestCase):
+    def setUp(self):
+        self.admin = make_user('admin@example.com', role='ADMIN')
+        self.pm = make_user('pm@example.com', role='PM', created_by=self.admin)
+        self.other_pm = make_user('pm2@example.com', role='PM', created_by=self.admin)
+        day = datetime.date(2030, 4, 1)
+        for pm in (self.pm, self.other_pm):
+            Project.objects.create(name=f'zebra {pm.pk}', created_by=pm)
+            for number in range(2):
+                employee = make_user(f'e{number}.{pm.pk}@example.com', created_by=pm)
+                DailyUpdate.objects.create(employee=employee, date=day, update_text='zebra', working_hours=Decimal('6'))
+                Todo.objects.create(employee=employee, title='zebra', status='COMPLETED')
+                Leave.objects.create(
+                    employee=employee, leave_type='SICK', start_date=day, end_date=day, reason='r', status='APPROVED',
+                )
+
+    def rollups(self):
+        return sorted(HoursRollup.objects.exclude(total_hours=0).values_list(
+            'user_id', 'scope', 'period', 'bucket', 'total_hours',
+        ))
+
+    def test_purge_pm_subtree(self):
+        purge_user(self.pm)
+
+        self.assertFalse(User.objects.filter(Q(pk=self.pm.pk) | Q(created_by=self.pm.pk)).exists())
+        self.assertEqual(User.objects.filter(created_by=self.other_pm).count(), 2)
+        counters = compute_counters()
+        self.assertEqual({name: site_counters().get(name, 0) for name in counters}, counters)
+        self.assertEqual(
+            {row.pop('employee_id'): row for row in TodoStats.objects.values('employee_id', *COUNTER_FIELDS)},
+            count_todos(),
+        )
+        self.assertEqual(
+            {(row.employee_id, row.leave_type): row.used_days for row in LeaveBalance.objects.all()},
+            count_used_days(),
+        )
+        rollups = self.rollups()
+        everyone = list(User.objects.values_list('pk', flat=True))
+        rebuild_employee_rollups(everyone)
+        rebuild_team_rollups(everyone)
+        self.assertEqual(rollups, self.rollups())
+
+        for index in INDEXES:
+            with self.subTest(index.kind):
+                self.assertIsNone(check_index(index))
+        hits = search(self.admin, 'zebra')
+        self.assertEqual({hit.obj.employee.created_by_id for hit in hits['updates']}, {self.other_pm.pk})
+        self.assertEqual({hit.obj.created_by_id for hit in hits['projects']}, {self.other_pm.pk})
+
+    @override_settings(PURGE_INLINE_MAX_ROWS=0)
+    def test_background_purge_needs_the_task_queued(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin_user_delete', kwargs={'user_id': self.pm.pk})
+        with mock.patch('accounts.views.purge_user_task.delay', side_effect=ConnectionError('broker down')), \
+                self.assertLogs('accounts.views', 'ERROR'):
+            response = self.client.post(url)
+        self.assertRedirects(response, reverse('admin_users_list'), fetch_redirect_response=False)
+        self.assertTrue(User.objects.get(pk=self.pm.pk).is_active)
+
+        with mock.patch('accounts.views.purge_user_task.delay', return_value=mock.Mock(id='queued')) as delay:
+            response = self.client.post(url)
+        delay.assert_called_once_with(self.pm.pk)
+        self.assertRedirects(
+            response, reverse('admin_purge_status', kwargs={'task_id': 'queued'}), fetch_redirect_response=False,
+        )
+        self.assertFalse(User.objects.get(pk=self.pm.pk).is_active)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_MAX_LAG=60)
+class ReplicaTests(AccountsTestCase):
+    def setUp(self):
+        self.snapshot_age = 10
+        self.enterContext(mock.patch(
+            'accounts.replicas.snapshot_time', side_effect=lambda alias: time.time() - self.snapshot_age,
+        ))
+
+    @staticmethod
+    @reporting_view
+    def report(request):
+        return HttpResponse(f'{router.db_for_read(User)} {router.db_for_write(User)}')
+
+    def routed(self, method='get', last_write=None):
+        request = getattr(RequestFactory(), method)('/')
+        if last_write is not None:
+            request.COOKIES[LAST_WRITE_COOKIE] = f'{last_write:.3f}'
+        return self.report(request).content.decode().split()
+
+    def test_reads_from_a_fresh_replica(self):
+        self.assertEqual(self.routed(), ['replica1', 'default'])
+        self.snapshot_age = 61
+        self.assertEqual(self.routed(), ['default', 'default'])
+
+    def test_primary_after_a_write(self):
+        self.assertEqual(self.routed(last_write=time.time()), ['default', 'default'])
+        self.assertEqual(self.routed(last_write=time.time() - 30), ['replica1', 'default'])
+        self.assertEqual(self.routed('post'), ['default', 'default'])
+
+    def test_write_cookie(self):
+        middleware = ReadYourWritesMiddleware(lambda request: HttpResponse(status=request.GET.get('status', 200)))
+        factory = RequestFactory()
+        for request, expected in (
+            (factory.post('/'), True), (factory.post('/?status=400'), False), (factory.get('/'), False),
+        ):
+            with self.subTest(method=request.method, query=request.GET.urlencode()):
+                self.assertEqual(LAST_WRITE_COOKIE in middleware(request).cookies, expected)
+
+    def test_writes_never_go_to_a_replica(self):
+        with reading_from('replica1'):
+            user = make_user('e@example.com')
+            Todo.objects.create(employee=user, title='t')
+            Todo.objects.filter(employee=user).update(status='COMPLETED')
+        self.assertEqual(user._state.db, 'default')
+        self.assertEqual(Todo.objects.get(employee=user).status, 'COMPLETED')
+        self.assertFalse(router.allow_migrate('replica1', 'accounts'))
+
+
+class SearchTests(AccountsTestCase):
+    def setUp(self):
+        day = datetime.date(2030, 4, 1)
+        self.pm, other_pm = make_user('pm@example.com', role='PM'), make_user('pm2@example.com', role='PM')
+        self.alice = make_user('alice@example.com', created_by=self.pm)
+        self.bob = make_user('bob@example.com', created_by=self.pm)
+        self.carol = make_user('carol@example.com', created_by=other_pm)
+        for employee in (self.alice, self.bob, self.carol):
+            DailyUpdate.objects.create(employee=employee, date=day, update_text='zebra crossing', working_hours=1)
+            Todo.objects.create(employee=employee, title='zebra', description='stripes')
+
+    def owners(self, user, text):
+        hits = search(user, text)
+        return {kind: {hit.obj.employee_id for hit in hits[kind]} for kind in ('updates', 'todos')}
+
+    def test_scoped_to_the_users_team(self):
+        mine = {self.alice.pk}
+        self.assertEqual(self.owners(self.alice, 'zebra'), {'updates': mine, 'todos': mine})
+        team = {self.alice.pk, self.bob.pk}
+        self.assertEqual(self.owners(self.pm, 'zeb'), {'updates': team, 'todos': team})
+
+    def test_index_follows_writes(self):
+        update = DailyUpdate.objects.get(employee=self.alice)
+        update.update_text = 'okapi sighting'
+        update.save()
+        Todo.objects.filter(employee=self.alice).update(description='okapi feeding')
+        self.assertEqual(self.owners(self.alice, 'okapi'), {'updates': {self.alice.pk}, 'todos': {self.alice.pk}})
+        # The old text is gone from the index
+        self.assertEqual(self.owners(self.alice, 'crossing'), {'updates': set(), 'todos': set()})
+        self.assertEqual(self.owners(self.alice, 'stripes'), {'updates': set(), 'todos': set()})
+
+        update.delete()
+        Todo.objects.filter(employee=self.alice).delete()
+        self.assertEqual(self.owners(self.alice, 'okapi'), {'updates': set(), 'todos': set()})
+        for index in INDEXES:
+            with self.subTest(index.kind):
+                self.assertIsNone(check_index(index))
+
+
+class UpsertTests(AccountsTestCase):
+    def test_upsert_increment(self):
+        upsert_increment(SiteCounter, [{'name': 'a', 'value': 2}], unique_fields=['name'], increment_fields=['value'])
+        upsert_increment(
+            SiteCounter, [{'name': 'a', 'value': 3}, {'name': 'b', 'value': 1}],
+            unique_fields=['name'], increment_fields=['value'],
+        )
+        self.assertEqual(
+            dict(SiteCounter.objects.filter(name__in=['a', 'b']).values_list('name', 'value')), {'a': 5, 'b': 1},
+        )
+
+        upsert_increment(
+            SiteCounter, [{'name': 'a', 'value': 0}], unique_fields=['name'], increment_fields=[], update_fields=['value'],
+        )
+        self.assertEqual(SiteCounter.objects.get(name='a').value, 0)
+
+    def test_upsert_increment_select(self):
+        employee = make_user('e@example.com', created_by=make_user('pm@example.com', role='PM'))
+        for day, leave_type in ((1, 'SICK'), (5, 'SICK'), (9, 'CASUAL')):
+            start = datetime.date(2030, 1, day)
+            Leave.objects.create(
+                employee=employee, leave_type=leave_type, start_date=start,
+                end_date=start + datetime.timedelta(days=1), reason='r',
+            )
+        LeaveBalance.objects.create(employee=employee, leave_type='SICK', used_days=1)
+
+        upsert_increment_select(
+            LeaveBalance,
+            Leave.objects.filter(employee=employee).order_by()
+            .values('employee_id', 'leave_type').annotate(used_days=Sum(leave_days())),
+            unique_fields=['employee', 'leave_type'], increment_fields=['used_days'],
+        )
+        self.assertEqual(
+            dict(LeaveBalance.objects.filter(employee=employee).values_list('leave_type', 'used_days')),
+            {'SICK': 5, 'CASUAL': 2},
+        )
@@ -0,0 +1,272 @@
+"""Write and export paths for daily updates and todos (timesheets)"""
+
+import csv
+import datetime
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+
+from .dashboard_cache import invalidate
+from .forms import DailyUpdateForm
+from .hours import apply_upsert_delta, recompute_hours
+from .models import DailyUpdate, Todo, User
+
+
+def submit_daily_update(employee, date, update_text, working_hours):
+    """
+    Create or overwrite `employee`'s update for `date`.
+
+    Uses a single INSERT ... ON CONFLICT (employee_id, date) DO UPDATE backed
+    by the (employee, date) unique constraint, with the hours bookkeeping in
+    the same transaction. Returns (update_id, created). No model signals are
+    sent; the bookkeeping they would do happens here.
+    Needs SQLite 3.35+ (or PostgreSQL) for RETURNING.
+    """
+    connection = transaction.get_connection()
+    qn = connection.ops.quote_name
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+
+    sql = (
+        f"INSERT INTO {qn(DailyUpdate._meta.db_table)} "
+        f"({qn('employee_id')}, {qn('date')}, {qn('update_text')}, {qn('working_hours')}, "
+        f"{qn('created_at')}, {qn('updated_at')}) "
+        f"VALUES (%s, %s, %s, %s, %s, %s) "
+        f"ON CONFLICT ({qn('employee_id')}, {qn('date')}) DO UPDATE SET "
+        f"{qn('update_text')} = EXCLUDED.{qn('update_text')}, "
+        f"{qn('working_hours')} = EXCLUDED.{qn('working_hours')}, "
+        f"{qn('updated_at')} = EXCLUDED.{qn('updated_at')} "
+        # Only a fresh insert has created_at == updated_at
+        f"RETURNING {qn('id')}, {qn('created_at')} = {qn('updated_at')}"
+    )
+    params = [
+        employee.pk,
+        connection.ops.adapt_datefield_value(date),
+        update_text,
+        connection.ops.adapt_decimalfield_value(working_hours, 4, 2),
+        now,
+        now,
+    ]
+
+    with transaction.atomic():
+        apply_upsert_delta(employee.pk, employee.created_by_id, date, working_hours)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            update_id, created = cursor.fetchone()
+        # No signals on this path
+        invalidate(employee_ids=[employee.pk], pm_ids=[employee.created_by_id])
+
+    return update_id, bool(created)
+
+
+# --- Export -----------------------------------------------------------------
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = {
+    'updates': (
+        ('Employee', 'employee__email'),
+        ('First Name', 'employee__first_name'),
+        ('Last Name', 'employee__last_name'),
+        ('Date', 'date'),
+        ('Working Hours', 'working_hours'),
+        ('Update', 'update_text'),
+        ('Submitted At', 'created_at'),
+    ),
+    'todos': (
+        ('Employee', 'employee__email'),
+        ('First Name', 'employee__first_name'),
+        ('Last Name', 'employee__last_name'),
+        ('Date', 'date'),
+        ('Title', 'title'),
+        ('Status', 'status'),
+        ('Description', 'description'),
+        ('Created At', 'created_at'),
+    ),
+}
+
+
+def visible_to(queryset, user):
+    """Scope an employee-owned queryset the same way DailyUpdateAdmin.get_queryset does"""
+    if user.is_superuser or user.role == 'ADMIN':
+        return queryset
+    if user.role == 'EMPLOYEE':
+        return queryset.filter(employee=user)
+    if user.role == 'PM':
+        return queryset.filter(employee__created_by=user)
+    return queryset.none()
+
+
+def export_queryset(kind, user=None, pm=None, employee=None, date_from=None, date_to=None):
+    """Filtered, role-scoped queryset for an export; `user=None` means unrestricted (CLI)"""
+    queryset = (DailyUpdate if kind == 'updates' else Todo).objects.all()
+    if user is not None:
+        queryset = visible_to(queryset, user)
+    if pm:
+        queryset = queryset.filter(employee__created_by=pm)
+    if employee:
+        queryset = queryset.filter(employee=employee)
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset.order_by('date', 'id')
+
+
+def export_rows(queryset, kind):
+    """Header row, then one list per record, read from the database in chunks"""
+    columns = EXPORT_COLUMNS[kind]
+    yield [title for title, _ in columns]
+    # values_list joins the employee columns in the same query (no per-row lookups)
+    # and skips model instantiation; iterator() keeps memory flat
+    rows = queryset.values_list(*(lookup for _, lookup in columns)).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield list(row)
+
+
+class _Echo:
+    """File-like object whose write() just hands the line back (see Django's streaming CSV docs)"""
+
+    def write(self, value):
+        return value
+
+
+# Spreadsheet apps run a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+
+def _as_text(value):
+    """`value`, with a leading ' on text a spreadsheet would read as a formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow([_as_text(value) for value in row])
+
+
+def write_xlsx(rows, fileobj):
+    """Write rows to `fileobj` as XLSX with openpyxl's constant-memory write-only mode"""
+    try:
+        from openpyxl import Workbook
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    except ImportError:
+        raise ImproperlyConfigured('XLSX export needs openpyxl (pip install openpyxl)')
+
+    def cell(value):
+        if isinstance(value, datetime.datetime):
+            # Excel has no timezone support
+            return timezone.localtime(value).replace(tzinfo=None)
+        if isinstance(value, str):
+            # Control characters are not allowed in the XML; openpyxl raises on them
+            return _as_text(ILLEGAL_CHARACTERS_RE.sub('', value))
+        return value
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Timesheets')
+    for row in rows:
+        sheet.append([cell(value) for value in row])
+    workbook.save(fileobj)
+
+
+# --- Import -----------------------------------------------------------------
+
+IMPORT_BATCH_SIZE = 500
+IMPORT_COLUMNS = ('employee', 'date', 'working_hours', 'update_text')
+
+
+class ImportResult:
+    """Outcome of a CSV import: rows written and per-line errors"""
+
+    def __init__(self):
+        self.imported = 0
+        self.errors = []
+        self.employee_ids = set()
+
+    def add_error(self, line_no, message):
+        self.errors.append((line_no, message))
+
+
+def import_daily_updates(fileobj, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import daily updates from a CSV text stream with the columns
+    employee (email), date, working_hours, update_text.
+
+    Rows are validated with DailyUpdateForm and written per batch with one
+    bulk_create(update_conflicts=True); an existing (employee, date) row is
+    overwritten. bulk_create sends no post_save signals, so the per-row hours
+    bookkeeping is skipped and summaries/rollups are recomputed once per
+    affected employee at the end, even when a later batch raises (e.g. on
+    bytes that are not UTF-8). Bad rows are reported, not fatal.
+    """
+    result = ImportResult()
+    reader = csv.DictReader(fileobj)
+    missing = set(IMPORT_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        result.add_error(1, f"Missing column(s): {', '.join(sorted(missing))}")
+        return result
+
+    try:
+        batch = []
+        for line_no, row in enumerate(reader, start=2):
+            batch.append((line_no, row))
+            if len(batch) >= batch_size:
+                _import_batch(batch, result)
+                batch = []
+        if batch:
+            _import_batch(batch, result)
+    finally:
+        # Batches commit one by one: bring every one already written up to date
+        _recompute_imported(result.employee_ids, batch_size)
+    return result
+
+
+def _recompute_imported(employee_ids, batch_size):
+    employee_ids = sorted(employee_ids)
+    for start in range(0, len(employee_ids), batch_size):
+        chunk = employee_ids[start:start + batch_size]
+        recompute_hours(chunk)
+        invalidate(
+            employee_ids=chunk,
+            pm_ids=set(User.objects.filter(pk__in=chunk).values_list('created_by_id', flat=True)),
+        )
+
+
+def _import_batch(batch, result):
+    # One query resolves every employee email in the batch
+    emails = {(row.get('employee') or '').strip() for _, row in batch}
+    employees = dict(
+        User.objects.filter(email__in=emails, role='EMPLOYEE').values_list('email', 'pk')
+    )
+
+    updates = {}
+    for line_no, row in batch:
+        employee_id = employees.get((row.get('employee') or '').strip())
+        if employee_id is None:
+            result.add_error(line_no, f"Unknown employee '{row.get('employee')}'")
+            continue
+        form = DailyUpdateForm(data={name: row.get(name) for name in ('date', 'working_hours', 'update_text')})
+        if not form.is_valid():
+            result.add_error(line_no, '; '.join(
+                f'{field}: {error}' for field, errors in form.errors.items() for error in errors
+            ))
+            continue
+        update = form.save(commit=False)
+        update.employee_id = employee_id
+        # A later line for the same day wins, as it would row by row
+        updates[(employee_id, update.date)] = update
+
+    if not updates:
+        return
+    with transaction.atomic():
+        DailyUpdate.objects.bulk_create(
+            updates.values(),
+            update_conflicts=True,
+            unique_fields=['employee', 'date'],
+            update_fields=['update_text', 'working_hours', 'updated_at'],
+        )
+    result.imported += len(updates)
+    result.employee_ids.update(employee_id for employee_id, _ in updates)
@@ -0,0 +1,83 @@
+"""Per-employee todo counters (todo_stats) and their bookkeeping"""
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+
+from .models import Todo, TodoStats, User
+from .sql import upsert_increment
+
+
+# Todo.status -> TodoStats column
+STATUS_COLUMNS = {
+    'PENDING': 'pending',
+    'IN_PROGRESS': 'in_progress',
+    'COMPLETED': 'completed',
+}
+COUNTER_FIELDS = ('pending', 'in_progress', 'completed', 'total')
+
+
+def todo_added(employee_id, status):
+    """One more todo in `status`; creates the counter row on the employee's first todo"""
+    row = {name: 0 for name in COUNTER_FIELDS}
+    row.update({'employee_id': employee_id, STATUS_COLUMNS[status]: 1, 'total': 1})
+    upsert_increment(TodoStats, [row], unique_fields=['employee'], increment_fields=COUNTER_FIELDS)
+
+
+def todo_removed(employee_id, status):
+    # Never creates a row: the employee may be getting deleted in this transaction
+    TodoStats.objects.filter(employee_id=employee_id).update(
+        **{STATUS_COLUMNS[status]: F(STATUS_COLUMNS[status]) - 1, 'total': F('total') - 1}
+    )
+
+
+def todo_moved(employee_id, old_status, new_status):
+    """A status transition within one employee's todos"""
+    updated = TodoStats.objects.filter(employee_id=employee_id).update(**{
+        STATUS_COLUMNS[old_status]: F(STATUS_COLUMNS[old_status]) - 1,
+        STATUS_COLUMNS[new_status]: F(STATUS_COLUMNS[new_status]) + 1,
+    })
+    if not updated:
+        # No counter row yet (e.g. todos created by a bulk path); count from scratch
+        recount_todo_stats([employee_id])
+
+
+def count_todos(employee_ids=None):
+    """{employee_id: {counter: n}} straight from the todos table, one grouped query"""
+    queryset = Todo.objects.all()
+    if employee_ids is not None:
+        queryset = queryset.filter(employee_id__in=employee_ids)
+    rows = queryset.order_by().values('employee_id').annotate(
+        total=Count('id'),
+        **{column: Count('id', filter=Q(status=status)) for status, column in STATUS_COLUMNS.items()},
+    )
+    return {row['employee_id']: {name: row[name] for name in COUNTER_FIELDS} for row in rows}
+
+
+def recount_todo_stats(employee_ids=None):
+    """
+    Overwrite the counters from the todos table (all employees when None).
+    Returns {employee_id: counts} for the rows written.
+    """
+    counts = count_todos(employee_ids)
+    if employee_ids is not None:
+        # Employees whose last todo is gone get zeros, not a stale row
+        for employee_id in User.objects.filter(pk__in=employee_ids).values_list('pk', flat=True):
+            counts.setdefault(employee_id, {name: 0 for name in COUNTER_FIELDS})
+    rows = [{'employee_id': employee_id, **values} for employee_id, values in counts.items()]
+    with transaction.atomic():
+        if employee_ids is None:
+            TodoStats.objects.filter(~Exists(Todo.objects.filter(employee=OuterRef('pk')))).update(
+                **{name: 0 for name in COUNTER_FIELDS}
+            )
+        for start in range(0, len(rows), 500):
+            upsert_increment(
+                TodoStats, rows[start:start + 500], unique_fields=['employee'],
+                increment_fields=[], update_fields=COUNTER_FIELDS,
+            )
+    return counts
+
+
+def todo_counts(employee_id):
+    """Counters for one employee by primary key; zeros if they have never had a todo"""
+    values = TodoStats.objects.filter(pk=employee_id).values(*COUNTER_FIELDS).first()
+    return values or {name: 0 for name in COUNTER_FIELDS}
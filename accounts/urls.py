@@ -13,20 +13,26 @@ urlpatterns = [
     path('user/<int:user_id>/', views.admin_user_detail, name='admin_user_detail'),
     path('user/<int:user_id>/update/', views.admin_user_update, name='admin_user_update'),
     path('user/<int:user_id>/delete/', views.admin_user_delete, name='admin_user_delete'),
+    path('user/delete/<str:task_id>/', views.admin_purge_status, name='admin_purge_status'),
     path('pm/create/', views.pm_create, name='pm_create'),
     path('create-employee/', views.admin_create_employee, name='admin_create_employee'),
     path('projects/', views.admin_projects_list, name='admin_projects_list'),
     path('updates/', views.admin_updates_list, name='admin_updates_list'),
+    path('updates/import/', views.admin_import_updates, name='admin_import_updates'),
     path('stats/', views.admin_stats, name='admin_stats'),
+    path('export/timesheets/', views.timesheet_export, name='timesheet_export'),
     
     path('project/create/', views.project_create, name='project_create'),
     path('project/<int:pk>/update/', views.project_update, name='project_update'),
     path('project/<int:pk>/delete/', views.project_delete, name='project_delete'),
     path('project/<int:project_id>/team/', views.project_team_view, name='project_team_view'),
     path('employee/create/', views.employee_create, name='employee_create'),
+    path('employee/onboard/', views.employee_bulk_onboard, name='employee_bulk_onboard'),
     path('employee/<int:pk>/update/', views.employee_update, name='employee_update'),
     path('employee/<int:pk>/delete/', views.employee_delete, name='employee_delete'),
     path('team/', views.pm_team_view, name='pm_team_view'),
+    path('team/calendar/', views.team_calendar, name='team_calendar'),
+    path('team/leaves/', views.leave_requests, name='leave_requests'),
     
     path('todo/create/', views.todo_create, name='todo_create'),
     path('todo/<int:pk>/update/', views.todo_update, name='todo_update'),
@@ -36,4 +42,5 @@ urlpatterns = [
     path('update/<int:pk>/delete/', views.daily_update_delete, name='daily_update_delete'),
     
     path('profile/update/', views.profile_update, name='profile_update'),
+    path('search/', views.search, name='search'),
 ]
@@ -1,15 +1,45 @@
+import datetime
+import io
+import logging
+import tempfile
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import FileResponse, StreamingHttpResponse
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Sum, Count, Q
-from .models import User, Project, Todo, DailyUpdate, WorkingHoursSummary, Leave
+from .models import User, Project, Todo, DailyUpdate, HoursRollup
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 from .forms import (
     LoginForm, UserCreationForm, ProjectForm, 
-    TodoForm, DailyUpdateForm, ProfileForm
+    TodoForm, DailyUpdateForm, ProfileForm, DailyUpdateFilterForm, TimesheetExportForm,
+    DailyUpdateImportForm, BulkOnboardForm, LeaveDecisionForm
 )
+from .availability import month_bounds, overlapping_leaves, team_days, team_employees
+from .dashboard_cache import employee_dashboard_context, pm_dashboard_context
+from .hours import bucket_start, period_totals
+from .leave_approvals import set_leave_status
+from .leave_balances import remaining_days
+from .onboarding import onboard_users
+from .pagination import keyset_page
+from .purge import purge_size, purge_user
+from .replicas import reporting_view
+from .search import search as search_index
+from .site_stats import role_counter, site_counters, users_by_role
+from .tasks import purge_user_task
+from .team_stats import team_members, team_totals, with_team_stats
+from .timesheets import (
+    export_queryset, export_rows, import_daily_updates, iter_csv, submit_daily_update, write_xlsx
+)
+
+
+UPDATES_PER_PAGE = 50
+IMPORT_ERRORS_SHOWN = 100
+ONBOARD_ERRORS_SHOWN = 100
+
+logger = logging.getLogger(__name__)
 
 
 def login_view(request):
@@ -35,7 +65,8 @@ def login_view(request):
     return render(request, 'login.html', {'form': form})
 
 def verify_email(request, token):
-    user = get_object_or_404(User, verification_token=token)
+    # The exclude() lets SQLite use the partial index on non-empty tokens
+    user = get_object_or_404(User.objects.exclude(verification_token=''), verification_token=token)
     user.is_verified = True
     user.verification_token = ''
     user.save()
@@ -76,13 +107,14 @@ def admin_required(view_func):
 @admin_required
 def admin_dashboard(request):
     """Main admin dashboard"""
+    counters = site_counters()
     context = {
-        'total_users': User.objects.count(),
-        'total_pms': User.objects.filter(role='PM').count(),
-        'total_employees': User.objects.filter(role='EMPLOYEE').count(),
-        'total_projects': Project.objects.count(),
-        'recent_users': User.objects.all().order_by('-date_joined')[:10],
-        'recent_projects': Project.objects.all().order_by('-created_at')[:5],
+        'total_users': counters.get('users', 0),
+        'total_pms': counters.get(role_counter('PM'), 0),
+        'total_employees': counters.get(role_counter('EMPLOYEE'), 0),
+        'total_projects': counters.get('projects', 0),
+        'recent_users': User.objects.select_related('created_by').order_by('-date_joined')[:10],
+        'recent_projects': Project.objects.select_related('created_by').order_by('-created_at')[:5],
         'recent_updates': DailyUpdate.objects.all().order_by('-created_at')[:10],
     }
     return render(request, 'admin_dashboard.html', context) 
@@ -92,7 +124,7 @@ def admin_dashboard(request):
 @admin_required
 def admin_users_list(request):
     """List all users"""
-    users = User.objects.all().order_by('-date_joined')
+    users = User.objects.select_related('created_by').order_by('-date_joined')
     
     role_filter = request.GET.get('role')
     if role_filter:
@@ -109,7 +141,8 @@ def admin_users_list(request):
 @admin_required
 def admin_user_detail(request, user_id):
     """View user details"""
-    user_obj = get_object_or_404(User, id=user_id)
+    # Stats come along with the user row; they are all 0 for non-employees
+    user_obj = get_object_or_404(with_team_stats(User.objects.select_related('created_by')), id=user_id)
     
     context = {
         'user_obj': user_obj,
@@ -118,13 +151,12 @@ def admin_user_detail(request, user_id):
     if user_obj.role == 'EMPLOYEE':
         context['todos'] = Todo.objects.filter(employee=user_obj)[:10]
         context['updates'] = DailyUpdate.objects.filter(employee=user_obj)[:10]
-        context['total_hours'] = DailyUpdate.objects.filter(employee=user_obj).aggregate(
-            total=Sum('working_hours')
-        )['total'] or 0
+        context['total_hours'] = user_obj.total_hours
     
     elif user_obj.role == 'PM':
         context['projects'] = Project.objects.filter(created_by=user_obj)
-        context['employees'] = User.objects.filter(created_by=user_obj, role='EMPLOYEE')
+        context['employees'] = list(team_members(user_obj))
+        context['team_totals'] = team_totals(context['employees'])
     
     return render(request, 'accounts/admin_user_detail.html', context)
 
@@ -132,7 +164,7 @@ def admin_user_detail(request, user_id):
 @login_required
 @admin_required
 def admin_user_delete(request, user_id):
-    """Delete a user"""
+    """Delete a user and everyone/everything under them (large subtrees in the background)"""
     user_obj = get_object_or_404(User, id=user_id)
     
     if user_obj.is_superuser:
@@ -141,12 +173,44 @@ def admin_user_delete(request, user_id):
     
     if request.method == 'POST':
         email = user_obj.email
-        user_obj.delete()
-        messages.success(request, f'User {email} deleted successfully')
+        try:
+            if purge_size(user_obj) > settings.PURGE_INLINE_MAX_ROWS:
+                # Locked out right away; the rows go in a Celery job. The lock-out
+                # commits first so no write lock is held while the broker is called.
+                User.objects.filter(pk=user_obj.pk).update(is_active=False)
+                try:
+                    task = purge_user_task.delay(user_obj.pk)
+                except Exception:
+                    User.objects.filter(pk=user_obj.pk).update(is_active=user_obj.is_active)
+                    raise
+                messages.info(request, f'Deleting {email} and their data in the background')
+                return redirect('admin_purge_status', task_id=task.id)
+            purge_user(user_obj)
+            messages.success(request, f'User {email} deleted successfully')
+        except Exception as e:
+            logger.exception('Deleting user %s failed', user_obj.pk)
+            messages.error(request, f'Error: {str(e)}')
         return redirect('admin_users_list')
     
     return render(request, 'accounts/admin_user_delete.html', {'user_obj': user_obj})
 
+
+@login_required
+@admin_required
+def admin_purge_status(request, task_id):
+    """Progress of a background user deletion"""
+    result = purge_user_task.AsyncResult(task_id)
+    info = result.info if isinstance(result.info, dict) else {}
+    context = {
+        'task_id': task_id,
+        'state': result.state,
+        'done': info.get('done', 0),
+        'total': info.get('total', 0),
+        'step': info.get('step', ''),
+        'error': str(result.info) if result.state == 'FAILURE' else '',
+    }
+    return render(request, 'accounts/admin_purge_status.html', context)
+
 @login_required
 @admin_required
 def admin_user_update(request, user_id):
@@ -190,7 +254,9 @@ def pm_create(request):
             else:
                 user.is_verified = False
             
-            user.save()
+            # The verification email is queued in the outbox in the same transaction
+            with transaction.atomic():
+                user.save()
             
             if user.is_verified:
                 messages.success(request, f'PM {user.email} created successfully (Email already verified)')
@@ -223,7 +289,8 @@ def admin_create_employee(request):
             else:
                 user.is_verified = False
             
-            user.save()
+            with transaction.atomic():
+                user.save()
             
             if user.is_verified:
                 messages.success(request, f'Employee {user.email} created successfully (Email already verified)')
@@ -259,7 +326,8 @@ def employee_create(request):
             else:
                 user.is_verified = False
             
-            user.save()
+            with transaction.atomic():
+                user.save()
             
             if user.is_verified:
                 messages.success(request, f'Employee {user.email} created successfully (Email already verified)')
@@ -275,41 +343,186 @@ def employee_create(request):
         'title': 'Create Employee'
     })
 
+
+@login_required
+def employee_bulk_onboard(request):
+    """Onboard a team of employees from an uploaded CSV"""
+    if request.user.role not in ('ADMIN', 'PM') and not request.user.is_superuser:
+        messages.error(request, 'Access denied')
+        return redirect('dashboard')
+
+    result = None
+    if request.method == 'POST':
+        form = BulkOnboardForm(request.POST, request.FILES, user=request.user)
+        if form.is_valid():
+            fileobj = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                # Every row is read before the first user is created
+                result = onboard_users(
+                    fileobj,
+                    created_by=form.cleaned_data.get('pm') or request.user,
+                    is_verified=form.cleaned_data['is_verified'],
+                )
+            except UnicodeDecodeError:
+                form.add_error('file', 'The file is not UTF-8 encoded text. No employees were created.')
+        if result is not None:
+            if result.created:
+                if form.cleaned_data['is_verified']:
+                    messages.success(request, f'{len(result.created)} employees created (Email already verified)')
+                else:
+                    messages.success(request, f'{len(result.created)} employees created. Verification emails sent.')
+            if result.errors:
+                messages.warning(request, f'{len(result.errors)} rows were rejected')
+    else:
+        form = BulkOnboardForm(user=request.user)
+
+    return render(request, 'accounts/bulk_onboard.html', {
+        'form': form,
+        'result': result,
+        'errors': result.errors[:ONBOARD_ERRORS_SHOWN] if result else [],
+    })
+
 @login_required
 @admin_required
 def admin_projects_list(request):
     """List all projects"""
-    projects = Project.objects.all().order_by('-created_at')
+    projects = Project.objects.select_related('created_by').order_by('-created_at')
     return render(request, 'admin_projects_list.html', {'projects': projects})
 
 @login_required
 @admin_required
+@reporting_view
 def admin_updates_list(request):
-    """List all daily updates"""
-    updates = DailyUpdate.objects.all().order_by('-date')
-    
-    employee_id = request.GET.get('employee')
-    if employee_id:
-        updates = updates.filter(employee_id=employee_id)
-    
+    """List all daily updates (keyset paginated, newest first)"""
+    filter_form = DailyUpdateFilterForm(request.GET or None)
+    updates = DailyUpdate.objects.all()
+
+    if filter_form.is_valid():
+        if filter_form.cleaned_data['employee']:
+            updates = updates.filter(employee=filter_form.cleaned_data['employee'])
+        if filter_form.cleaned_data['date_from']:
+            updates = updates.filter(date__gte=filter_form.cleaned_data['date_from'])
+        if filter_form.cleaned_data['date_to']:
+            updates = updates.filter(date__lte=filter_form.cleaned_data['date_to'])
+
+    # Footer totals for the whole filtered range in one aggregate
+    totals = updates.aggregate(total_updates=Count('id'), total_hours=Sum('working_hours'))
+
+    page = keyset_page(
+        updates.select_related('employee').only(
+            'date', 'update_text', 'working_hours', 'created_at',
+            'employee__email', 'employee__first_name', 'employee__last_name',
+        ),
+        before=request.GET.get('before'),
+        after=request.GET.get('after'),
+        per_page=UPDATES_PER_PAGE,
+    )
+
+    filter_params = request.GET.copy()
+    filter_params.pop('before', None)
+    filter_params.pop('after', None)
+
     context = {
-        'updates': updates,
-        'employees': User.objects.filter(role='EMPLOYEE'),
+        'updates': page.object_list,
+        'older_cursor': page.older_cursor,
+        'newer_cursor': page.newer_cursor,
+        'filter_form': filter_form,
+        'filter_query': filter_params.urlencode(),
+        'total_updates': totals['total_updates'],
+        'total_hours': totals['total_hours'] or 0,
     }
     return render(request, 'admin_updates_list.html', context)
 
 @login_required
 @admin_required
+def admin_import_updates(request):
+    """Backfill daily updates from an uploaded CSV"""
+    result = None
+    if request.method == 'POST':
+        form = DailyUpdateImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            # Parse straight off the uploaded file instead of reading it into memory
+            fileobj = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                result = import_daily_updates(fileobj)
+            except UnicodeDecodeError:
+                form.add_error('file', (
+                    'The file is not UTF-8 encoded text. '
+                    'Batches read before the invalid bytes may already have been imported.'
+                ))
+        if result is not None:
+            if result.imported:
+                messages.success(request, f'Imported {result.imported} daily updates')
+            if result.errors:
+                messages.warning(request, f'{len(result.errors)} rows were rejected')
+    else:
+        form = DailyUpdateImportForm()
+
+    return render(request, 'accounts/import_updates.html', {
+        'form': form,
+        'result': result,
+        'errors': result.errors[:IMPORT_ERRORS_SHOWN] if result else [],
+    })
+
+
+@login_required
+@admin_required
+@reporting_view
 def admin_stats(request):
     """Show detailed statistics"""
+    today = timezone.localdate()
+    period_hours = dict(
+        HoursRollup.objects.filter(scope='EMPLOYEE').filter(
+            Q(period='WEEK', bucket=bucket_start('WEEK', today)) |
+            Q(period='MONTH', bucket=bucket_start('MONTH', today))
+        ).values_list('period').annotate(total=Sum('total_hours'))
+    )
     context = {
-        'users_by_role': User.objects.values('role').annotate(count=Count('id')),
+        'users_by_role': users_by_role(site_counters()),
         'projects_by_pm': Project.objects.values('created_by__email').annotate(count=Count('id')),
-        'total_working_hours': DailyUpdate.objects.aggregate(total=Sum('working_hours'))['total'] or 0,
+        # Monthly rollups: one row per employee-month instead of one per update
+        'total_working_hours': HoursRollup.objects.filter(scope='EMPLOYEE', period='MONTH').aggregate(
+            total=Sum('total_hours')
+        )['total'] or 0,
+        'hours_this_week': period_hours.get('WEEK') or 0,
+        'hours_this_month': period_hours.get('MONTH') or 0,
     }
     return render(request, 'accounts/admin_stats.html', context)
 
 
+@login_required
+@reporting_view
+def timesheet_export(request):
+    """Stream daily updates / todos as CSV or XLSX (admins: everyone, PMs: their team)"""
+    if request.user.role not in ('ADMIN', 'PM'):
+        messages.error(request, 'Access denied')
+        return redirect('dashboard')
+
+    form = TimesheetExportForm(request.GET or None, user=request.user)
+    if not form.is_valid():
+        return render(request, 'accounts/timesheet_export.html', {'form': form})
+
+    data = form.cleaned_data
+    queryset = export_queryset(
+        data['kind'], user=request.user, pm=data.get('pm'), employee=data['employee'],
+        date_from=data['date_from'], date_to=data['date_to'],
+    )
+    rows = export_rows(queryset, data['kind'])
+    filename = f"{data['kind']}-{timezone.localdate():%Y%m%d}"
+
+    if data['format'] == 'xlsx':
+        # XLSX is a zip archive and can't be sent before it is complete; openpyxl's
+        # write-only mode still builds it in constant memory, spooled to disk
+        spool = tempfile.TemporaryFile()
+        write_xlsx(rows, spool)
+        spool.seek(0)
+        return FileResponse(spool, as_attachment=True, filename=f'{filename}.xlsx')
+
+    response = StreamingHttpResponse(iter_csv(rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
 @login_required
 def pm_dashboard(request):
     """PM specific dashboard"""
@@ -317,13 +530,7 @@ def pm_dashboard(request):
         messages.error(request, 'Access denied')
         return redirect('dashboard')
     
-    context = {
-        'projects': Project.objects.filter(created_by=request.user).order_by('-created_at'),
-        'employees': User.objects.filter(created_by=request.user, role='EMPLOYEE'),
-        'hours_summary': WorkingHoursSummary.objects.filter(pm=request.user),
-        'total_projects': Project.objects.filter(created_by=request.user).count(),
-        'total_employees': User.objects.filter(created_by=request.user, role='EMPLOYEE').count(),
-    }
+    context = pm_dashboard_context(request.user.pk)
     return render(request, 'pm_dashboard.html', context)
 
 @login_required
@@ -380,23 +587,17 @@ def project_delete(request, pk):
 
 @login_required
 @admin_required
+@reporting_view
 def project_team_view(request, project_id):
     """View project details with team members and their work"""
-    project = get_object_or_404(Project, id=project_id)
+    project = get_object_or_404(Project.objects.select_related('created_by'), id=project_id)
     
     # Get PM who created this project
     pm = project.created_by
     
-    # Get all employees under this PM
-    employees = User.objects.filter(
-        created_by=pm,
-        role='EMPLOYEE'
-    ).annotate(
-        total_hours=Sum('daily_updates__working_hours'),
-        total_todos=Count('todos'),
-        completed_todos=Count('todos', filter=Q(todos__status='COMPLETED')),
-        pending_todos=Count('todos', filter=Q(todos__status='PENDING'))
-    ).order_by('first_name')
+    # Employees under this PM with their stats: one query, one subquery per metric
+    employees = list(team_members(pm))
+    totals = team_totals(employees)
     
     # Get recent work by employees (last 30 days)
     from datetime import timedelta
@@ -416,10 +617,11 @@ def project_team_view(request, project_id):
         'project': project,
         'pm': pm,
         'employees': employees,
+        'team_hours': period_totals([pm.pk], 'PM')[pm.pk],
         'recent_updates': recent_updates,
         'recent_todos': recent_todos,
-        'total_employees': employees.count(),
-        'total_hours': employees.aggregate(total=Sum('total_hours'))['total'] or 0,
+        'total_employees': totals['total_employees'],
+        'total_hours': totals['total_hours'],
     }
     
     return render(request, 'accounts/project_team_view.html', context)
@@ -458,13 +660,8 @@ def employee_delete(request, pk):
         email = employee.email
         
         try:
-            with transaction.atomic():
-                Leave.objects.filter(approved_by=employee).update(approved_by=None)
-                employee.leaves.all().delete()
-                employee.todos.all().delete()
-                employee.daily_updates.all().delete()
-                WorkingHoursSummary.objects.filter(employee=employee).delete()
-                employee.delete()
+            # One statement per table, no per-row signals
+            purge_user(employee)
             
             messages.success(request, f'Employee {email} deleted successfully')
             
@@ -486,13 +683,57 @@ def pm_team_view(request):
         messages.error(request, 'Access denied')
         return redirect('dashboard')
     
-    employees = User.objects.filter(created_by=request.user, role='EMPLOYEE').annotate(
-        total_hours=Sum('dailyupdate__working_hours'),
-        total_todos=Count('todo'),
-        completed_todos=Count('todo', filter=Q(todo__status='COMPLETED'))
-    )
-    
-    return render(request, 'pm_team_view.html', {'employees': employees})
+    employees = list(team_members(request.user))
+    return render(request, 'pm_team_view.html', {
+        'employees': employees,
+        'totals': team_totals(employees),
+    })
+
+
+@login_required
+@reporting_view
+def team_calendar(request):
+    """Who on the team is off on each day of a month (admins: all employees)"""
+    if request.user.role not in ('ADMIN', 'PM'):
+        messages.error(request, 'Access denied')
+        return redirect('dashboard')
+
+    start, end = month_bounds(request.GET.get('month'), timezone.localdate())
+    employees = team_employees(request.user)
+    days = list(team_days(overlapping_leaves(employees, start, end), start, end))
+    return render(request, 'accounts/team_calendar.html', {
+        'days': days,
+        'month': start,
+        # month_bounds() keeps these two within datetime.date's range
+        'previous_month': (start - datetime.timedelta(days=1)).replace(day=1),
+        'next_month': end + datetime.timedelta(days=1),
+        'team_size': employees.count(),
+        'peak_off': max(len(day.off) for day in days),
+        'today': timezone.localdate(),
+    })
+
+
+@login_required
+def leave_requests(request):
+    """Pending leave requests of the team (admins: everyone), approved or rejected in bulk"""
+    if request.user.role not in ('ADMIN', 'PM'):
+        messages.error(request, 'Access denied')
+        return redirect('dashboard')
+
+    form = LeaveDecisionForm(request.POST or None, user=request.user)
+    if request.method == 'POST' and form.is_valid():
+        status = form.cleaned_data['status']
+        count = set_leave_status(form.cleaned_data['leaves'], status, decided_by=request.user)
+        messages.success(request, f'{count} leave request{"s" if count != 1 else ""} {status.lower()}')
+        return redirect('leave_requests')
+
+    pending = list(form.fields['leaves'].queryset.select_related('employee').order_by('start_date', 'pk'))
+    remaining = remaining_days({leave.employee_id for leave in pending})
+    rows = []
+    for leave in pending:
+        left = remaining.get((leave.employee_id, leave.leave_type))
+        rows.append((leave, left, None if left is None else left - leave.total_days))
+    return render(request, 'accounts/leave_requests.html', {'form': form, 'rows': rows})
 
 
 @login_required
@@ -502,15 +743,7 @@ def employee_dashboard(request):
         messages.error(request, 'Access denied')
         return redirect('dashboard')
     
-    context = {
-        'todos': Todo.objects.filter(employee=request.user).order_by('-date')[:10],
-        'updates': DailyUpdate.objects.filter(employee=request.user).order_by('-date')[:10],
-        'total_hours': DailyUpdate.objects.filter(employee=request.user).aggregate(
-            total=Sum('working_hours')
-        )['total'] or 0,
-        'pending_todos': Todo.objects.filter(employee=request.user, status='PENDING').count(),
-        'completed_todos': Todo.objects.filter(employee=request.user, status='COMPLETED').count(),
-    }
+    context = employee_dashboard_context(request.user.pk)
     return render(request, 'employee_dashboard.html', context)
 
 
@@ -547,7 +780,8 @@ def todo_update(request, pk):
 
 @login_required
 def todo_delete(request, pk):
-    todo = get_object_or_404(Todo, pk=pk, employee=request.user)
+    # confirm_delete shows str(todo), which reads employee.email
+    todo = get_object_or_404(Todo.objects.select_related('employee'), pk=pk, employee=request.user)
     if request.method == 'POST':
         todo.delete()
         messages.success(request, 'Todo deleted')
@@ -568,12 +802,8 @@ def daily_update_create(request):
             update_text = form.cleaned_data['update_text']  
             working_hours = form.cleaned_data['working_hours']
             
-            # ✅ Use update_or_create to avoid duplicate error
-            update, created = DailyUpdate.objects.update_or_create(
-                employee=request.user,
-                date=date,
-                defaults={'update_text': update_text,'working_hours': working_hours,}
-            )
+            # Single INSERT ... ON CONFLICT, hours bookkeeping in the same transaction
+            update_id, created = submit_daily_update(request.user, date, update_text, working_hours)
             
             # User-friendly messages
             if created:
@@ -605,7 +835,7 @@ def daily_update_update(request, pk):
 
 @login_required
 def daily_update_delete(request, pk):
-    update = get_object_or_404(DailyUpdate, pk=pk, employee=request.user)
+    update = get_object_or_404(DailyUpdate.objects.select_related('employee'), pk=pk, employee=request.user)
     
     if request.method == 'POST':
         update.delete()
@@ -629,61 +859,14 @@ def profile_update(request):
 
 
 @login_required
-@admin_required
-def admin_user_delete(request, user_id):
-    """Admin deletes any user - with proper cleanup"""
-    user_obj = get_object_or_404(User, id=user_id)
-    
-    if user_obj.is_superuser:
-        messages.error(request, 'Cannot delete superuser')
-        return redirect('admin_users_list')
-    
-    if request.method == 'POST':
-        email = user_obj.email
-        
-        try:
-            with transaction.atomic():
-                # Leaves cleanup
-                Leave.objects.filter(approved_by=user_obj).update(approved_by=None)
-                
-                if user_obj.role == 'PM':
-                    # PM ke employees
-                    employees = User.objects.filter(created_by=user_obj)
-                    
-                    for emp in employees:
-                        # Employee ke leaves jahan wo approver hai
-                        Leave.objects.filter(approved_by=emp).update(approved_by=None)
-                        
-                        # Employee ka data
-                        emp.leaves.all().delete()
-                        emp.todos.all().delete()
-                        emp.daily_updates.all().delete()
-                        WorkingHoursSummary.objects.filter(employee=emp).delete()
-                    
-                    # Employees delete
-                    employees.delete()
-                    
-                    # PM ke projects
-                    user_obj.projects.all().delete()
-                
-                elif user_obj.role == 'EMPLOYEE':
-                    # Employee ka data
-                    user_obj.leaves.all().delete()
-                    user_obj.todos.all().delete()
-                    user_obj.daily_updates.all().delete()
-                    WorkingHoursSummary.objects.filter(employee=user_obj).delete()
-                
-                # User delete
-                user_obj.delete()
-            
-            messages.success(request, f'User {email} deleted successfully')
-            
-        except Exception as e:
-            messages.error(request, f'Error: {str(e)}')
-            print(f"Admin delete error: {e}")
-            
-        return redirect('admin_users_list')
-    
-    return render(request, 'accounts/admin_user_delete.html', {
-        'user_obj': user_obj
-    })
\ No newline at end of file
+@reporting_view
+def search(request):
+    """Ranked full-text search over updates, todos, projects and people the user may see"""
+    query = request.GET.get('q', '').strip()
+    results = search_index(request.user, query) if query else {}
+    context = {
+        'query': query,
+        'results': results,
+        'total': sum(len(hits) for hits in results.values()),
+    }
+    return render(request, 'accounts/search.html', context)
@@ -10,12 +10,3 @@ app.autodiscover_tasks()
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
-
-
-### 3.4 `employee_management/__init__.py`
-
-from .celery import app as celery_app
-
-__all__ = ('celery_app',)
-
-    
\ No newline at end of file
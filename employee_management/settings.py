@@ -26,11 +26,14 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # DEBUG only (removes itself otherwise); outside sessions so their queries count
+    'accounts.querybudget.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'accounts.replicas.ReadYourWritesMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -59,13 +62,74 @@ AUTH_USER_MODEL = 'accounts.User'
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+# accounts.sqlite_backend is the stock SQLite backend plus a PRAGMA profile
+# (WAL, synchronous=NORMAL, busy timeout, cache/mmap sizes); see its
+# DEFAULT_PRAGMAS and `manage.py sqlite_profile`.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'accounts.sqlite_backend',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections (and their warm page cache) across requests
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN: a deferred transaction that has
+            # to upgrade from read to write fails at once instead of waiting
+            # out the busy timeout
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {},
+        },
     }
 }
 
+# Read replicas for reporting views (accounts.replicas): snapshots of the
+# primary taken with SQLite's backup API by the refresh_replicas task.
+# Views only read from one younger than REPLICA_MAX_LAG seconds.
+DATABASE_REPLICAS = [f'replica{number}' for number in range(1, int(os.environ.get('DB_REPLICAS', 1)) + 1)]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        'ENGINE': 'accounts.sqlite_backend',
+        'NAME': BASE_DIR / f'db.{alias}.sqlite3',
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        # Also how a connection notices that a newer snapshot replaced its file
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'pragmas': {'journal_mode': None, 'query_only': 1}},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['accounts.replicas.ReplicaRouter']
+REPLICA_MAX_LAG = int(os.environ.get('REPLICA_MAX_LAG', 60))
+REPLICA_REFRESH_SECONDS = int(os.environ.get('REPLICA_REFRESH_SECONDS', 15))
+
+# Cache (dashboard contexts). Every process (web workers, Celery, management
+# commands) must share it, or invalidations never reach the worker holding a
+# stale dashboard: files under CACHE_DIR by default, or Redis at CACHE_REDIS_URL.
+if os.environ.get('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / 'cache'),
+            # One dashboard per user plus the hit / miss counters
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 10000))},
+        }
+    }
+
+# Safety net only: dashboards are invalidated by signals when their data changes
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 15 * 60))
+
+# Deleting a user whose subtree has more rows than this (updates, todos,
+# leaves) runs as a Celery job instead of inside the request
+PURGE_INLINE_MAX_ROWS = int(os.environ.get('PURGE_INLINE_MAX_ROWS', 20000))
+
+# QueryBudgetMiddleware logs views over their query budget; this makes it raise instead
+QUERY_BUDGET_RAISE = os.environ.get('QUERY_BUDGET_RAISE', 'False') == 'True'
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -111,6 +175,15 @@ MEDIA_ROOT = BASE_DIR / 'media'
 if not MEDIA_ROOT.exists():
     MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
 
+# Media is served by accounts.media.serve_media. Content-hashed names are
+# cached as immutable; anything else for this long.
+MEDIA_CACHE_SECONDS = int(os.environ.get('MEDIA_CACHE_SECONDS', 3600))
+# 'X-Accel-Redirect' (nginx) or 'X-Sendfile' (Apache, lighttpd) hands the
+# file body to the front-end server; empty serves it with sendfile() from here
+MEDIA_SENDFILE_HEADER = os.environ.get('MEDIA_SENDFILE_HEADER', '')
+# X-Accel-Redirect target: an `internal` nginx location with `alias` MEDIA_ROOT
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -118,6 +191,16 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Email Configuration (Console backend for development/testing)
 EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@example.com')
+# For local testing without SMTP, EMAIL_BACKEND=django.core.mail.backends.filebased.EmailBackend
+# writes every message to a file under EMAIL_FILE_PATH
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', str(BASE_DIR / 'sent_emails'))
+
+# Email outbox (accounts.outbox): mail is queued in the database and sent in batches
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', 100))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 6))
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = 60
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = 6 * 60 * 60
+EMAIL_OUTBOX_LEASE_SECONDS = 10 * 60
 
 # For production with Gmail, uncomment these:
 # EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -135,6 +218,20 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'drain-email-outbox': {
+        'task': 'accounts.tasks.drain_email_outbox',
+        'schedule': 15.0,
+    },
+    'refresh-replicas': {
+        'task': 'accounts.tasks.refresh_replicas',
+        'schedule': float(REPLICA_REFRESH_SECONDS),
+    },
+    'generate-avatar-variants': {
+        'task': 'accounts.tasks.generate_avatar_variants',
+        'schedule': 30.0,
+    },
+}
 
 # Login Settings
 LOGIN_URL = 'login'